@@ -0,0 +1,661 @@
+#!/usr/bin/env python3
+"""
+Automation Engine
+Executes an element list step by step. Independent of Qt so it can run in the
+GUI's AutomationThread as well as headlessly (benchmarks, tools); progress is
+reported through plain callbacks.
+"""
+
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import TimeoutError as JobTimeout
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import cv2
+
+from frame_buffer import CaptureProducer, desktop_bounds
+from monitor_pool import MonitorPool
+from input_backend import InputBackend, create_backend
+from tracing import tracer_from_env
+from metrics import ENGINE_METRICS
+
+
+class AutomationStopped(BaseException):
+    """Raised inside the engine when a stop was requested
+
+    Derives from BaseException (like KeyboardInterrupt) so the generic
+    `except Exception` handlers around individual steps don't swallow it.
+    """
+
+
+def _ignore(*args):
+    pass
+
+
+class RealClock:
+    """Wall-clock time and waits; the simulator substitutes a virtual clock"""
+
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        """Clock for measuring step durations"""
+        return time.perf_counter()
+
+    def wait(self, event, seconds):
+        """Wait up to `seconds`, returns True if `event` got set"""
+        return event.wait(seconds)
+
+
+REAL_CLOCK = RealClock()
+
+
+def step_kind(element_type):
+    """Short machine-friendly name of an element type (used for metrics and logs)"""
+    if "Custom Area" in element_type:
+        return "custom_click"
+    if "Click" in element_type:
+        return "click"
+    if "Text Input" in element_type:
+        return "text_input"
+    if "Monitor Text" in element_type:
+        return "monitor_text"
+    if "Monitor Image" in element_type:
+        return "monitor_image"
+    return "unknown"
+
+
+class EngineResources:
+    """Input backend, capture producer, monitor workers and OCR cache of a run
+
+    Each engine creates its own by default and frees it when the run ends. Pass
+    one instance to several engines (as the scheduler does) to keep everything
+    warm between runs, so only the first run pays for starting it.
+    """
+
+    def __init__(self, input_backend=None, capture_factory=None, pool_workers=None):
+        self.input_backend = input_backend
+        self.capture_factory = capture_factory or (lambda: CaptureProducer.for_screen(interval=0))
+        self.pool_workers = pool_workers
+        self.ocr_cache = OrderedDict()
+        self.input = None
+        self.capture = None
+        self.monitor_pool = None
+        # What the monitor workers already have loaded
+        self.warm_templates = set()
+        self.warm_ocr = False
+        self.pool_warm = False
+
+    def ensure_input(self):
+        """Open the input backend on first use"""
+        if self.input is None:
+            if isinstance(self.input_backend, InputBackend):
+                self.input = self.input_backend
+            else:
+                self.input = create_backend(self.input_backend)
+        return self.input
+
+    def ensure_capture(self):
+        """Start the shared capture producer and monitor workers on first use"""
+        if self.capture is None:
+            self.capture = self.capture_factory()
+            self.capture.start()
+            self.start_pool()
+        return self.capture
+
+    def start_pool(self):
+        self.monitor_pool = MonitorPool(self.capture.ring, self.pool_workers)
+
+    def warm_up(self, template_paths, ocr, wait):
+        """Start the monitor workers and load templates/Tesseract they don't have yet
+
+        `wait` is called with each warm-up future (the engine's interruptible wait).
+        """
+        template_paths = list(template_paths)
+        try:
+            self.load_pool(template_paths, ocr, wait)
+        except (OSError, NotImplementedError, BrokenProcessPool):
+            if self.monitor_pool.workers == 0:
+                raise
+            # Worker processes only start with their first job, so this is where
+            # a platform that can't spawn them fails: match in this thread instead
+            self.monitor_pool.shutdown()
+            self.monitor_pool = MonitorPool(self.capture.ring, workers=0)
+            self.warm_templates.clear()
+            self.warm_ocr = False
+            self.pool_warm = False
+            self.load_pool(template_paths, ocr, wait)
+
+    def load_pool(self, template_paths, ocr, wait):
+        pending = [path for path in template_paths if path not in self.warm_templates]
+        ocr = ocr and not self.warm_ocr
+        if self.pool_warm and not pending and not ocr:
+            return
+        for future in self.monitor_pool.warm_up(pending, ocr):
+            wait(future)
+        self.warm_templates.update(pending)
+        self.warm_ocr = self.warm_ocr or ocr
+        self.pool_warm = True
+
+    def discard_pool(self):
+        """Kill the monitor workers (e.g. after a stop left a job running)
+
+        The next ensure_capture() starts fresh ones.
+        """
+        if self.monitor_pool:
+            self.monitor_pool.terminate()
+            self.monitor_pool.shutdown()
+            self.monitor_pool = None
+        self.warm_templates.clear()
+        self.warm_ocr = False
+        self.pool_warm = False
+        if self.capture:
+            self.start_pool()
+
+    def release_capture(self):
+        """Shut down monitor workers and free the shared frame ring"""
+        if self.monitor_pool:
+            self.monitor_pool.shutdown()
+            self.monitor_pool = None
+        if self.capture:
+            self.capture.stop()
+            self.capture = None
+        self.warm_templates.clear()
+        self.warm_ocr = False
+        self.pool_warm = False
+
+    def input_stats_message(self):
+        """Latency summary of the input backend, None if nothing was sent"""
+        if self.input:
+            stats = self.input.stats()
+            if stats['calls']:
+                return (f"⌨️ Input backend {stats['backend']}: {stats['calls']} actions, "
+                        f"avg {stats['avg_us']:.0f} µs, max {stats['max_us']:.0f} µs")
+        return None
+
+    def release_input(self):
+        if self.input:
+            self.input.close()
+            self.input = None
+
+    def close(self):
+        self.release_capture()
+        self.release_input()
+
+
+class AutomationEngine:
+    """Runs automation elements with interruptible waits and shared capture"""
+
+    # Typing is split into chunks so a stop request is noticed mid-text
+    TYPE_CHUNK = 8
+    # Poll interval while waiting for OCR/matching jobs
+    JOB_POLL = 0.02
+    # OCR results remembered by region shape, language and pixel digest
+    OCR_CACHE_SIZE = 256
+    OCR_LANG = 'eng'
+
+    def __init__(self, elements, input_backend=None, on_status=None, on_message=None,
+                 on_capture=None, on_observation=None, on_stopped=None, on_step=None,
+                 on_step_started=None, capture_factory=None, screen=None, pool_workers=None,
+                 step_delay=1.0, type_delay=0.5, tracer=None, metrics=None, resources=None,
+                 speed=1.0, clock=None):
+        self.elements = elements
+        self.on_status = on_status or _ignore
+        self.on_message = on_message or _ignore
+        self.on_capture = on_capture or _ignore
+        self.on_observation = on_observation or _ignore
+        self.on_stopped = on_stopped or _ignore
+        self.on_step = on_step or _ignore
+        self.on_step_started = on_step_started or _ignore
+        self.screen = screen
+        # Pause after every element (unless it has its own recorded "delay") and
+        # between focusing an input box and typing; speed > 1 shortens the pauses
+        self.step_delay = step_delay
+        self.type_delay = type_delay
+        if not speed > 0:
+            raise ValueError(f"speed must be positive, got {speed!r}")
+        self.speed = speed
+        self.clock = clock or REAL_CLOCK
+        # Spans per step (no-op unless tracing is enabled)
+        self.tracer = tracer or tracer_from_env()
+        self.metrics = metrics or ENGINE_METRICS
+        # Resources passed in are left running after the run for the next engine
+        self.owns_resources = resources is None
+        self.resources = resources or EngineResources(input_backend, capture_factory, pool_workers)
+        self.capture_reported = False
+        # Indexes of steps that did not succeed in the last run
+        self.failed_steps = []
+
+        self.stop_event = threading.Event()
+        self.stop_requested_at = None
+
+    @property
+    def input(self):
+        return self.resources.input
+
+    @property
+    def capture(self):
+        return self.resources.capture
+
+    @property
+    def monitor_pool(self):
+        return self.resources.monitor_pool
+
+    @property
+    def ocr_cache(self):
+        return self.resources.ocr_cache
+
+    # ------------------------------------------------------------------
+    # Interruptible primitives
+    # ------------------------------------------------------------------
+
+    def check_stop(self):
+        """Abort the current step if a stop was requested"""
+        if self.stop_event.is_set():
+            raise AutomationStopped()
+
+    def sleep(self, seconds):
+        """Sleep that wakes up immediately when a stop is requested"""
+        with self.tracer.span("wait", seconds=seconds):
+            if self.clock.wait(self.stop_event, max(0.0, seconds)):
+                raise AutomationStopped()
+
+    def wait_job(self, future):
+        """Wait for an OCR/matching job, abandoning it if a stop is requested"""
+        while True:
+            try:
+                result = future.result(timeout=self.JOB_POLL)
+                break
+            except JobTimeout:
+                # Only an alias of the builtin TimeoutError from Python 3.11 on
+                if self.stop_event.is_set():
+                    future.cancel()
+                    raise AutomationStopped()
+        # Put the worker's own timings on the trace next to the engine spans
+        if self.tracer.enabled and isinstance(result, dict):
+            for name, start, end in result.get('spans', ()):
+                self.tracer.record(name, start, end, thread=f"worker {result.get('worker')}")
+        return result
+
+    def click(self, x, y):
+        """Click through the input backend, then pause interruptibly"""
+        self.check_stop()
+        with self.tracer.span("input", action="click"):
+            self.input.click(x, y)
+        self.sleep(self.input.pause)
+
+    def type_text(self, text):
+        """Type text in small chunks, checking for a stop between chunks"""
+        for start in range(0, len(text), self.TYPE_CHUNK):
+            self.check_stop()
+            with self.tracer.span("input", action="type"):
+                self.input.type_text(text[start:start + self.TYPE_CHUNK])
+        self.sleep(self.input.pause)
+
+    def fresh_frame(self):
+        """Capture a fresh frame into the shared ring, returns its sequence number"""
+        with self.tracer.span("capture"):
+            seq = self.ensure_capture().request_frame(cancel=self.stop_event)
+        self.check_stop()
+        return seq
+
+    def ocr_text(self, seq, region):
+        """OCR a region of frame `seq`, reusing the result if the same pixels were read before"""
+        view = self.capture.ring.region(seq, *region)
+        key = None
+        # Resources without a cache (the simulator's) always ask the pool
+        if self.ocr_cache is not None and view is not None and view.size:
+            # Equal bytes in a different shape (e.g. uniform areas) are different images
+            digest = hashlib.blake2b(np.ascontiguousarray(view), digest_size=16).digest()
+            key = (view.shape, self.OCR_LANG, digest)
+            if not self.capture.ring.is_valid(seq):
+                key = None
+        if key is not None and key in self.ocr_cache:
+            self.ocr_cache.move_to_end(key)
+            self.metrics.ocr_lookup(True)
+            return self.ocr_cache[key]
+
+        self.metrics.ocr_lookup(False)
+        with self.tracer.span("ocr"):
+            text = self.wait_job(self.monitor_pool.ocr(seq, region, self.OCR_LANG))['text']
+        if key is not None:
+            self.ocr_cache[key] = text
+            if len(self.ocr_cache) > self.OCR_CACHE_SIZE:
+                self.ocr_cache.popitem(last=False)
+        return text
+
+    # ------------------------------------------------------------------
+    # Resources
+    # ------------------------------------------------------------------
+
+    def ensure_capture(self):
+        """Start the shared capture producer and monitor workers on first use"""
+        capture = self.resources.ensure_capture()
+        if not self.capture_reported:
+            self.capture_reported = True
+            self.on_capture(capture.ring.name)
+        return capture
+
+    def release_resources(self):
+        """Free capture, workers and input unless they are shared with later runs"""
+        if self.monitor_pool and self.stop_event.is_set():
+            # A stop may have abandoned a job that is still running in a worker
+            if self.owns_resources:
+                self.monitor_pool.terminate()
+            else:
+                self.resources.discard_pool()
+        if self.owns_resources:
+            message = self.resources.input_stats_message()
+            if message:
+                self.on_message(message)
+            self.resources.close()
+
+    def monitor_region(self, element):
+        """Region (x, y, width, height) watched by a monitor element"""
+        if 'width' in element and 'height' in element:
+            return element['x'], element['y'], element['width'], element['height'], False
+        # Fallback to default area around point
+        return element['x'] - 100, element['y'] - 50, 200, 100, True
+
+    def prepare(self):
+        """Load everything the run needs before the first step, returns a list of problems
+
+        Opens the input backend and (for monitor steps) the capture producer,
+        loads every template, starts the monitor workers with Tesseract warmed up
+        and checks that all positions and regions are on the desktop.
+        """
+        problems = []
+        self.resources.ensure_input()
+        if self.screen:
+            left, top, right, bottom = 0, 0, self.screen[0], self.screen[1]
+        else:
+            left, top, right, bottom = desktop_bounds()
+        desktop = f"desktop ({left}, {top})-({right}, {bottom})"
+
+        templates = {}
+        # (label, template, area width, area height) checked once the capture scale is known
+        sizes = []
+        needs_ocr = False
+        needs_capture = False
+        for i, element in enumerate(self.elements):
+            label = f"Element {i+1} ({element['type']})"
+            if "Monitor Text" in element['type'] or "Monitor Image" in element['type']:
+                needs_capture = True
+                x, y, width, height, default = self.monitor_region(element)
+                if x < left or y < top or x + width > right or y + height > bottom:
+                    problems.append(f"{label}: area ({x}, {y}) {width}x{height} is outside the {desktop}")
+                if "Monitor Text" in element['type']:
+                    needs_ocr = True
+                elif element['parameter']:
+                    path = element['parameter']
+                    if not os.path.exists(path):
+                        # Same as at run time: the step only watches the area
+                        self.on_message(f"⚠️ {label}: target image not found: {path}, "
+                                        f"only the area will be monitored")
+                        continue
+                    template = templates.get(path)
+                    if template is None:
+                        template = cv2.imread(path)
+                        if template is None:
+                            problems.append(f"{label}: could not load target image: {path}")
+                            continue
+                        templates[path] = template
+                    sizes.append((label, template, width, height))
+            else:
+                points = [(element['x'], element['y'])]
+                if "Custom Area" in element['type'] and element['parameter']:
+                    params = element['parameter'].split(',')
+                    try:
+                        points = [(int(params[0].strip()), int(params[1].strip()))]
+                    except (ValueError, IndexError):
+                        pass
+                for x, y in points:
+                    if not (left <= x < right and top <= y < bottom):
+                        problems.append(f"{label}: position ({x}, {y}) is outside the {desktop}")
+
+        if needs_capture:
+            self.ensure_capture()
+            # Templates are screenshots in physical pixels, areas are in logical ones
+            scale = self.capture.ring.scale or 1.0
+            for label, template, width, height in sizes:
+                if template.shape[0] > round(height * scale) or template.shape[1] > round(width * scale):
+                    problems.append(f"{label}: target image {template.shape[1]}x{template.shape[0]} "
+                                    f"is larger than the area {width}x{height}"
+                                    + (f" ({round(width * scale)}x{round(height * scale)} pixels)"
+                                       if scale != 1.0 else ""))
+            try:
+                self.resources.warm_up(templates.keys(), needs_ocr, self.wait_job)
+            except ImportError:
+                problems.append("OCR not available. Please install: pip install pytesseract")
+            except Exception as e:
+                problems.append(f"Monitor workers failed to start: {str(e)}")
+        return problems
+
+    # ------------------------------------------------------------------
+    # Steps
+    # ------------------------------------------------------------------
+
+    # Every run_* method returns True when the step succeeded
+
+    def run_click(self, i, element):
+        # Check if it's custom area click with parameters
+        if "Custom Area" in element['type'] and element['parameter']:
+            try:
+                # Parse custom parameters (e.g., "100,200" for x,y or "wait:2" for delay)
+                params = element['parameter'].split(',')
+                if len(params) >= 2:
+                    # Custom coordinates
+                    x = int(params[0].strip())
+                    y = int(params[1].strip())
+                    self.click(x, y)
+                    self.on_message(f"Custom click at ({x}, {y})")
+                else:
+                    # Regular click with potential delay
+                    if "wait:" in element['parameter']:
+                        wait_time = float(element['parameter'].split(':')[1])
+                        self.sleep(wait_time)
+                    self.click(element['x'], element['y'])
+                    self.on_message(f"Custom area click at ({element['x']}, {element['y']})")
+            except Exception:
+                # Fallback to regular click
+                self.click(element['x'], element['y'])
+                self.on_message(f"Clicked position ({element['x']}, {element['y']})")
+        else:
+            # Regular button click
+            self.click(element['x'], element['y'])
+            self.on_message(f"Clicked position ({element['x']}, {element['y']})")
+        return True
+
+    def run_text_input(self, i, element):
+        # Checked before clicking so an untypable character fails only this step,
+        # without half the text typed
+        missing = self.input.missing_characters(element['parameter'])
+        if missing:
+            self.on_message(f"❌ Cannot type {''.join(missing)!r}: no key on the keyboard layout "
+                            f"produces it ({self.input.name} input backend)")
+            return False
+        self.click(element['x'], element['y'])
+        self.sleep(self.type_delay / self.speed)
+        self.type_text(element['parameter'])
+        self.on_message(f"Input text: {element['parameter']}")
+        return True
+
+    def run_monitor_text(self, i, element):
+        # Text monitoring implementation
+        try:
+            # Use area dimensions if available, otherwise use default area
+            x, y, width, height, default = self.monitor_region(element)
+            if default:
+                self.on_message(f"📸 Monitoring text area (default): ({x}, {y}) {width}x{height}")
+            else:
+                self.on_message(f"📸 Monitoring text area: ({x}, {y}) {width}x{height}")
+
+            # Capture a fresh frame into the shared ring
+            seq = self.fresh_frame()
+
+            # Extract text using OCR in a monitor worker (or the cache)
+            text = self.ocr_text(seq, (x, y, width, height)).strip()
+
+            target_text = element['parameter']
+            self.on_observation({
+                "index": i, "kind": "Monitor Text", "seq": seq,
+                "region": (x, y, width, height), "time": self.clock.time(),
+                "found": target_text.lower() in text.lower(), "text": text,
+            })
+            if target_text.lower() in text.lower():
+                self.on_message(f"✅ Target text '{target_text}' found in area")
+                return True
+            self.on_message(f"❌ Target text '{target_text}' not found. Found: '{text[:50]}...'")
+
+        except ImportError:
+            self.on_message(f"⚠️ OCR not available. Please install: pip install pytesseract")
+        except Exception as e:
+            self.on_message(f"❌ Text monitoring failed: {str(e)}")
+        return False
+
+    def run_monitor_image(self, i, element):
+        # Image monitoring implementation
+        try:
+            # Use area dimensions if available, otherwise use default area
+            x, y, width, height, default = self.monitor_region(element)
+            if default:
+                self.on_message(f"📸 Monitoring image area (default): ({x}, {y}) {width}x{height}")
+            else:
+                self.on_message(f"📸 Monitoring image area: ({x}, {y}) {width}x{height}")
+
+            # Capture a fresh frame into the shared ring
+            seq = self.fresh_frame()
+
+            # If target image is provided
+            if element['parameter'] and os.path.exists(element['parameter']):
+                try:
+                    # Template matching in a monitor worker (threshold 0.8)
+                    with self.tracer.span("match"):
+                        result = self.wait_job(self.monitor_pool.match_template(
+                            seq, (x, y, width, height), element['parameter']))
+                    max_val = result['confidence']
+                    self.metrics.match_confidence(max_val)
+                    self.on_observation({
+                        "index": i, "kind": "Monitor Image", "seq": seq,
+                        "region": (x, y, width, height), "time": self.clock.time(), **result,
+                    })
+
+                    if result['found']:
+                        self.on_message(f"✅ Target image found with confidence: {max_val:.2f}")
+                        return True
+                    self.on_message(f"❌ Target image not found. Best match: {max_val:.2f}")
+                except ValueError:
+                    self.on_message(f"❌ Could not load target image: {element['parameter']}")
+            else:
+                # Just monitor area for changes
+                self.on_message(f"📸 Monitoring image area at ({x}, {y}) {width}x{height}")
+                self.on_observation({
+                    "index": i, "kind": "Monitor Image", "seq": seq,
+                    "region": (x, y, width, height), "time": self.clock.time(),
+                })
+                return True
+
+        except ImportError:
+            self.on_message(f"⚠️ OpenCV not available. Please install: pip install opencv-python")
+        except Exception as e:
+            self.on_message(f"❌ Image monitoring failed: {str(e)}")
+        return False
+
+    def execute_element(self, i, element):
+        """Execute operations based on element type, returns True on success"""
+        if "Click" in element['type']:
+            return self.run_click(i, element)
+        elif "Text Input" in element['type']:
+            return self.run_text_input(i, element)
+        elif "Monitor Text" in element['type']:
+            return self.run_monitor_text(i, element)
+        elif "Monitor Image" in element['type']:
+            return self.run_monitor_image(i, element)
+        return True
+
+    # ------------------------------------------------------------------
+    # Run control
+    # ------------------------------------------------------------------
+
+    def run(self):
+        """Execute automation, returns "completed", "stopped", "failed" or "error" """
+        status = "error"
+        # (index, type, kind, start) of the step being executed
+        current = None
+        self.metrics.run_started()
+        try:
+            self.on_status("Preparing...")
+            prepare_start = time.perf_counter()
+            with self.tracer.span("prepare"):
+                problems = self.prepare()
+            prepare_ms = (time.perf_counter() - prepare_start) * 1000
+            if problems:
+                for problem in problems:
+                    self.on_message(f"❌ {problem}")
+                self.on_message(f"🔧 Preparation failed after {prepare_ms:.0f} ms, nothing was executed")
+                self.on_status("Preparation failed")
+                status = "failed"
+                return status
+            self.on_message(f"🔧 Prepared in {prepare_ms:.0f} ms")
+
+            self.failed_steps = []
+            for i, element in enumerate(self.elements):
+                self.check_stop()
+
+                self.on_status(f"Executing element {i+1}: {element['type']}")
+                self.on_step_started(i)
+                kind = step_kind(element['type'])
+                self.metrics.step_started(i, kind)
+                step_start = self.clock.monotonic()
+                current = (i, element['type'], kind, step_start)
+                with self.tracer.span("step", index=i, type=element['type']):
+                    ok = self.execute_element(i, element)
+                    seconds = self.clock.monotonic() - step_start
+
+                    # Wait a bit (timed separately, it is not part of the step)
+                    current = None
+                    self.sleep(element.get('delay', self.step_delay) / self.speed)
+                delay = self.clock.monotonic() - step_start - seconds
+                self.finish_step(i, element['type'], kind, ok, seconds, delay)
+
+            self.on_status("Automation completed!")
+            status = "completed"
+            return status
+
+        except AutomationStopped:
+            # Acknowledge before cleaning up so the GUI hears back right away
+            latency = time.perf_counter() - self.stop_requested_at
+            self.on_status("Automation stopped")
+            self.on_stopped(latency * 1000)
+            status = "stopped"
+            return status
+        except Exception as e:
+            if current is not None:
+                # The step that raised still counts, as a failure carrying the error
+                index, element_type, kind, step_start = current
+                self.finish_step(index, element_type, kind, False,
+                                 self.clock.monotonic() - step_start, 0.0, error=str(e))
+            self.on_status(f"Execution error: {str(e)}")
+            return status
+        finally:
+            self.metrics.run_finished(status)
+            self.release_resources()
+
+    def finish_step(self, index, element_type, kind, ok, seconds, delay, error=None):
+        self.metrics.step_finished(kind, seconds, ok)
+        if not ok:
+            self.failed_steps.append(index)
+        step = {"index": index, "type": element_type, "kind": kind,
+                "ok": ok, "seconds": seconds, "delay": delay}
+        if error is not None:
+            step["error"] = error
+        self.on_step(step)
+
+    def stop(self):
+        """Request a stop (returns immediately, acknowledged through on_stopped)"""
+        if not self.stop_event.is_set():
+            self.stop_requested_at = time.perf_counter()
+        self.stop_event.set()
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Batch Runs
+Runs a workflow once per row of a CSV or JSONL data source. Step parameters can
+refer to columns as {column} (write {{ and }} for literal braces), e.g. a Text
+Input step with parameter "{email}".
+
+The source is read as a stream, one row at a time, so memory use does not grow
+with the file. Every row's outcome is appended to a results CSV, by default
+logs/batch/batch_<workflow>_<time>.csv (--log), with its own columns: time,
+data row, workflow, status, duration (ms), details, result. --jsonl also writes
+each row with its match confidences to a JSONL file. A checkpoint records the
+next row, so a crashed or stopped batch can continue with --resume, which keeps
+appending to the same results CSV.
+
+Usage:
+    python3 batch.py workflows/signup.json data/users.csv
+    python3 batch.py workflows/signup.json data/users.csv --resume
+"""
+
+import os
+import re
+import sys
+import csv
+import json
+import time
+import argparse
+import threading
+
+from automation_engine import AutomationEngine, EngineResources
+from input_backend import BACKENDS
+from run_log import BATCH_DIR, BATCH_HEADER, open_csv_log
+from workflow import load_workflow
+
+PLACEHOLDER = re.compile(r"\{\{|\}\}|\{([^{}]+)\}")
+
+
+def is_jsonl(path):
+    return path.lower().endswith((".jsonl", ".ndjson"))
+
+
+def iter_rows(path, start=1):
+    """Yield (row number, row dict) from a CSV or JSONL file, beginning at row `start`
+
+    Row numbers count data rows from 1 (the CSV header is not a row).
+    """
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if is_jsonl(path):
+            number = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                number += 1
+                if number >= start:
+                    row = json.loads(line)
+                    if not isinstance(row, dict):
+                        raise ValueError(f"{path}: row {number} is not a JSON object")
+                    yield number, row
+        else:
+            for number, row in enumerate(csv.DictReader(f), 1):
+                if number >= start:
+                    yield number, row
+
+
+def placeholders(elements):
+    """Column names referenced by the elements' parameters"""
+    names = set()
+    for element in elements:
+        for match in PLACEHOLDER.finditer(element.get('parameter', '')):
+            if match.group(1):
+                names.add(match.group(1).strip())
+    return names
+
+
+def bind(elements, row):
+    """Copy of the elements with {column} placeholders replaced by the row's values"""
+    def replace(match):
+        if match.group(1) is None:
+            return match.group(0)[0]
+        name = match.group(1).strip()
+        if name not in row:
+            raise KeyError(name)
+        value = row[name]
+        return "" if value is None else str(value)
+
+    bound = []
+    for element in elements:
+        parameter = element.get('parameter', '')
+        if '{' in parameter or '}' in parameter:
+            element = dict(element, parameter=PLACEHOLDER.sub(replace, parameter))
+        bound.append(element)
+    return bound
+
+
+class ResultsLog:
+    """Appends one line per row to a batch results CSV and optionally a JSONL file
+
+    Every line is flushed right away so the log survives a crash.
+    """
+
+    def __init__(self, path, jsonl_path=None):
+        self.path = path
+        self.file, self.writer = open_csv_log(path, BATCH_HEADER)
+        self.jsonl = open(jsonl_path, "a", encoding="utf-8") if jsonl_path else None
+
+    def write(self, record):
+        self.writer.writerow([
+            time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record["time"])),
+            record["row"],
+            record["workflow"],
+            record["status"],
+            record["duration_ms"],
+            record["details"],
+            "Success" if record["ok"] else "Failure",
+        ])
+        self.file.flush()
+        if self.jsonl:
+            self.jsonl.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.jsonl.flush()
+
+    def close(self):
+        self.file.close()
+        if self.jsonl:
+            self.jsonl.close()
+
+
+def read_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_checkpoint(path, data):
+    """Replace the checkpoint atomically so a crash never leaves half a file"""
+    temp = path + ".tmp"
+    with open(temp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(temp, path)
+
+
+class BatchRunner:
+    """Runs a workflow for every row of a data source on warm shared resources"""
+
+    def __init__(self, elements, source, log, checkpoint=None, name="batch", input_backend=None,
+                 step_delay=1.0, speed=1.0, max_failures=None, on_message=None, resources=None):
+        self.elements = elements
+        self.source = source
+        self.log = log
+        self.checkpoint = checkpoint
+        self.name = name
+        self.step_delay = step_delay
+        if not speed > 0:
+            raise ValueError(f"speed must be positive, got {speed!r}")
+        self.speed = speed
+        self.max_failures = max_failures
+        self.on_message = on_message or (lambda message: None)
+        self.owns_resources = resources is None
+        self.resources = resources or EngineResources(input_backend)
+        self.engine = None
+        self.stop_event = threading.Event()
+        self.completed = 0
+        self.failed = 0
+
+    def run(self, start=1):
+        """Run rows from `start` until the source ends, returns "completed" or "stopped" """
+        # CSV rows all have the header's columns, so check them once up front;
+        # JSONL rows may differ and fail individually instead
+        checked = is_jsonl(self.source)
+        status = "completed"
+        try:
+            for number, row in iter_rows(self.source, start):
+                if self.stop_event.is_set():
+                    status = "stopped"
+                    break
+                if not checked:
+                    checked = True
+                    missing = sorted(placeholders(self.elements) - set(row))
+                    if missing:
+                        raise ValueError(f"{self.source} has no column {', '.join(missing)}")
+                record = self.run_row(number, row)
+                if record["status"] == "stopped":
+                    status = "stopped"
+                    break
+                self.log.write(record)
+                if record["ok"]:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self.save_checkpoint(number + 1)
+                if self.max_failures is not None and self.failed >= self.max_failures:
+                    self.on_message(f"⏹️ Stopping after {self.failed} failed rows")
+                    status = "stopped"
+                    break
+        finally:
+            if self.owns_resources:
+                self.resources.close()
+        return status
+
+    def run_row(self, number, row):
+        """Run one iteration, returns its result record"""
+        start = time.perf_counter()
+        record = {"row": number, "workflow": self.name, "time": time.time()}
+        try:
+            elements = bind(self.elements, row)
+        except KeyError as e:
+            return dict(record, status="failed", ok=False, duration_ms=0.0, confidence=[],
+                        details=f"row has no column {e.args[0]}")
+
+        confidences = []
+        failures = []
+
+        def on_observation(info):
+            if "confidence" in info:
+                confidences.append(round(info["confidence"], 4))
+
+        def on_message(message):
+            if message.startswith("❌"):
+                failures.append(message[1:].strip())
+
+        self.engine = AutomationEngine(
+            elements,
+            on_message=on_message,
+            on_observation=on_observation,
+            step_delay=self.step_delay,
+            speed=self.speed,
+            resources=self.resources)
+        if self.stop_event.is_set():
+            self.engine.stop()
+        status = self.engine.run()
+        failed_steps = [i + 1 for i in self.engine.failed_steps]
+        self.engine = None
+
+        ok = status == "completed" and not failed_steps
+        if ok:
+            details = ""
+        else:
+            details = "; ".join(failures) or status
+            if failed_steps:
+                details = f"failed steps {', '.join(map(str, failed_steps))}: {details}"
+        duration = (time.perf_counter() - start) * 1000
+        self.on_message(f"{'✅' if ok else '❌'} Row {number}: {status} in {duration:.0f} ms"
+                        + (f" ({details})" if details else ""))
+        return dict(record, status=status, ok=ok, duration_ms=round(duration, 1),
+                    confidence=confidences, details=details)
+
+    def save_checkpoint(self, next_row):
+        if self.checkpoint:
+            write_checkpoint(self.checkpoint, {
+                "workflow": self.name,
+                "source": os.path.abspath(self.source),
+                "log": os.path.abspath(self.log.path),
+                "next_row": next_row,
+                "updated": time.strftime("%Y-%m-%d %H:%M:%S"),
+            })
+
+    def stop(self):
+        """Stop after the current step; the interrupted row is run again on resume"""
+        self.stop_event.set()
+        engine = self.engine
+        if engine:
+            engine.stop()
+
+
+def log_message(message):
+    timestamp = time.strftime("%H:%M:%S")
+    print(f"[{timestamp}] {message}", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a workflow once per row of a CSV/JSONL file")
+    parser.add_argument("workflow", help="workflow JSON file, parameters may use {column}")
+    parser.add_argument("data", help="CSV (with header) or JSONL data source")
+    parser.add_argument("--start-row", type=int, default=1, help="first data row to run (1-based)")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint of a previous run")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: next to the results log)")
+    parser.add_argument("--log", help="results CSV (default: logs/batch/batch_<name>_<time>.csv)")
+    parser.add_argument("--jsonl", help="also write per-row results with timings to this JSONL file")
+    parser.add_argument("--max-failures", type=int, help="stop after this many failed rows")
+    parser.add_argument("--input-backend", choices=list(BACKENDS), help="input backend for the batch")
+    parser.add_argument("--step-delay", type=float, default=1.0, help="pause after every element (seconds)")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed factor")
+    args = parser.parse_args(argv)
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    name, elements = load_workflow(args.workflow)
+    source_name = os.path.splitext(os.path.basename(args.data))[0]
+    checkpoint = args.checkpoint or os.path.join(BATCH_DIR, f"batch_{name}_{source_name}.checkpoint.json")
+    start = args.start_row
+    log_path = args.log
+    if args.resume:
+        state = read_checkpoint(checkpoint)
+        if state is None:
+            log_message(f"⚠️ No checkpoint at {checkpoint}, starting from row {start}")
+        else:
+            start = state["next_row"]
+            log_path = log_path or state.get("log")
+            log_message(f"🔁 Resuming at row {start}")
+    log_path = log_path or os.path.join(BATCH_DIR, f"batch_{name}_{time.strftime('%Y%m%d_%H%M%S')}.csv")
+
+    log = ResultsLog(log_path, args.jsonl)
+    runner = BatchRunner(elements, args.data, log, checkpoint, name, args.input_backend,
+                         args.step_delay, args.speed, args.max_failures, on_message=log_message)
+    log_message(f"📂 Running '{name}' for rows of {args.data} from row {start}")
+    result = {}
+
+    def target():
+        try:
+            result["status"] = runner.run(start)
+        except (OSError, ValueError) as e:
+            log_message(f"❌ {str(e)}")
+
+    worker = threading.Thread(target=target, daemon=True)
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(timeout=0.2)
+    except KeyboardInterrupt:
+        log_message("⏹️ Stopping, the current row will run again on --resume")
+        runner.stop()
+        worker.join()
+    finally:
+        log.close()
+    status = result.get("status", "error")
+
+    log_message(f"🏁 {status}: {runner.completed} rows succeeded, {runner.failed} failed. "
+                f"Results: {log_path}")
+    return 0 if status == "completed" and runner.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Smart Automation Benchmarks
+Headless benchmark suite for capture, template matching, OCR and step dispatch,
+run against synthetic screens (generated frames with planted templates and
+rendered text). Results are stored as JSON and two runs can be compared.
+
+Usage:
+    python3 benchmark.py run [--quick] [--output FILE] [--compare-to BASELINE]
+    python3 benchmark.py compare BASELINE CURRENT [--threshold 0.10]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import numpy as np
+import cv2
+
+from frame_buffer import CaptureProducer
+from monitor_pool import MonitorPool
+from automation_engine import AutomationEngine
+from input_backend import RecordingBackend
+from tracing import Tracer, NULL_TRACER
+
+BENCHMARK_DIR = os.path.join("logs", "benchmarks")
+SCREEN = (1920, 1080)
+
+
+# ----------------------------------------------------------------------
+# Synthetic screens
+# ----------------------------------------------------------------------
+
+def synthetic_screen(width=SCREEN[0], height=SCREEN[1], seed=0):
+    """RGB frame that looks roughly like a desktop: panels, buttons and text"""
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width, 3), 236, dtype=np.uint8)
+    for _ in range(60):
+        x, y = int(rng.integers(0, width - 40)), int(rng.integers(0, height - 20))
+        w, h = int(rng.integers(40, 300)), int(rng.integers(20, 120))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.rectangle(frame, (x, y), (x + w, y + h), color, -1)
+    for row in range(40, height, 80):
+        cv2.putText(frame, f"Item {row} Submit Cancel Login", (20, row),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (20, 20, 20), 2)
+    return frame
+
+
+def plant_template(frame, size, position, seed=1):
+    """Draw a distinctive patch into the frame and return it (RGB)"""
+    rng = np.random.default_rng(seed)
+    patch = rng.integers(0, 255, (size, size, 3), dtype=np.uint8)
+    x, y = position
+    frame[y:y + size, x:x + size] = patch
+    return patch
+
+
+def render_text(text, width, height):
+    """Black text on a white background, as OCR would see a label"""
+    frame = np.full((height, width, 3), 255, dtype=np.uint8)
+    cv2.putText(frame, text, (10, height // 2 + 10), cv2.FONT_HERSHEY_SIMPLEX,
+                1.0, (0, 0, 0), 2)
+    return frame
+
+
+# ----------------------------------------------------------------------
+# Measurement helpers
+# ----------------------------------------------------------------------
+
+def measure(fn, repeat, warmup=1):
+    """Run fn repeatedly and return per-call durations in milliseconds"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples, unit="ms", better="lower"):
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "unit": unit,
+        "better": better,
+        "median": statistics.median(ordered),
+        "p95": p95,
+        "mean": statistics.fmean(ordered),
+        "min": ordered[0],
+        "samples": len(ordered),
+    }
+
+
+def rate(count, seconds, unit):
+    return {"unit": unit, "better": "higher", "median": count / seconds, "samples": count}
+
+
+def synthetic_producer(frame):
+    producer = CaptureProducer.for_screen(interval=0, grab=lambda: frame,
+                                          size=(frame.shape[1], frame.shape[0]))
+    producer.start()
+    return producer
+
+
+# ----------------------------------------------------------------------
+# Benchmarks
+# ----------------------------------------------------------------------
+
+def bench_capture(results, quick):
+    """Frame ring write throughput and fresh-frame handoff latency"""
+    sizes = [(1280, 720), (1920, 1080)] if quick else [(1280, 720), (1920, 1080), (3840, 2160)]
+    frames = 30 if quick else 120
+    for width, height in sizes:
+        frame = synthetic_screen(width, height)
+        producer = synthetic_producer(frame)
+        try:
+            ring = producer.ring
+            start = time.perf_counter()
+            for _ in range(frames):
+                ring.write(frame)
+            results[f"capture.ring_write.{width}x{height}"] = rate(frames, time.perf_counter() - start, "frames/s")
+
+            samples = measure(producer.request_frame, frames)
+            results[f"capture.request_frame.{width}x{height}"] = summarize(samples)
+
+            # Zero-copy region read as consumers do it
+            seq = ring.latest_seq
+            samples = measure(lambda: ring.copy_region(seq, 100, 100, 400, 300), frames * 10)
+            results[f"capture.copy_region_400x300.{width}x{height}"] = summarize(samples)
+        finally:
+            producer.stop()
+
+    # Real screen capture when a display is available
+    if os.environ.get("DISPLAY") or sys.platform in ("darwin", "win32"):
+        try:
+            from frame_buffer import grab_screen
+            samples = measure(grab_screen, 5 if quick else 20)
+            results["capture.grab_screen"] = summarize(samples)
+        except Exception as e:
+            print(f"⚠️ Skipping real screen capture: {e}")
+
+
+def bench_matching(results, quick, workdir):
+    """matchTemplate latency by region and template size"""
+    frame = synthetic_screen()
+    regions = [(200, 100), (400, 300), (800, 600), SCREEN]
+    templates = [16, 32, 64] if quick else [16, 32, 64, 128]
+    repeat = 5 if quick else 20
+
+    paths = {}
+    for size in templates:
+        patch = plant_template(frame, size, (60 + size, 40 + size), seed=size)
+        path = os.path.join(workdir, f"template_{size}.png")
+        cv2.imwrite(path, cv2.cvtColor(patch, cv2.COLOR_RGB2BGR))
+        paths[size] = path
+
+    producer = synthetic_producer(frame)
+    pool = MonitorPool(producer.ring, workers=0)
+    try:
+        seq = producer.request_frame()
+        for width, height in regions:
+            for size in templates:
+                if size > width or size > height:
+                    continue
+                region = (0, 0, width, height)
+                job = lambda: pool.match_template(seq, region, paths[size]).result()
+                found = job()
+                if not found['found'] and width >= 60 + 2 * size and height >= 40 + 2 * size:
+                    print(f"⚠️ Planted {size}px template not found in {width}x{height} region")
+                results[f"match.region_{width}x{height}.template_{size}"] = summarize(measure(job, repeat))
+    finally:
+        pool.shutdown()
+        producer.stop()
+
+
+def bench_ocr(results, quick):
+    """Tesseract latency on rendered text regions"""
+    try:
+        import pytesseract
+        pytesseract.get_tesseract_version()
+    except Exception as e:
+        print(f"⚠️ Skipping OCR benchmarks: {e}")
+        return
+    repeat = 3 if quick else 10
+    for width, height in [(300, 60), (800, 200)]:
+        frame = np.full((SCREEN[1], SCREEN[0], 3), 255, dtype=np.uint8)
+        frame[:height, :width] = render_text("Login Submit 12345", width, height)
+        producer = synthetic_producer(frame)
+        pool = MonitorPool(producer.ring, workers=0)
+        try:
+            seq = producer.request_frame()
+            job = lambda: pool.ocr(seq, (0, 0, width, height)).result()
+            if "Login" not in job()['text']:
+                print(f"⚠️ OCR did not read the rendered text in {width}x{height}")
+            results[f"ocr.region_{width}x{height}"] = summarize(measure(job, repeat))
+        finally:
+            pool.shutdown()
+            producer.stop()
+
+
+def click_workflow(count):
+    elements = []
+    for i in range(count):
+        if i % 2:
+            elements.append({"type": "Input Box (Text Input)", "x": 100 + i % 500, "y": 200,
+                             "parameter": "hello"})
+        else:
+            elements.append({"type": "Button (Click)", "x": 100 + i % 500, "y": 300, "parameter": ""})
+    return elements
+
+
+def bench_dispatch(results, quick, workdir):
+    """Per-step engine overhead with a recording input backend and no delays"""
+    counts = [100, 1000] if quick else [100, 1000, 10000]
+    for count in counts:
+        # Once with tracing disabled and once enabled, to keep an eye on its overhead
+        for suffix, tracer in (("", NULL_TRACER), (".traced", Tracer("benchmark"))):
+            engine = AutomationEngine(click_workflow(count), RecordingBackend(), screen=SCREEN,
+                                      step_delay=0, type_delay=0, tracer=tracer)
+            start = time.perf_counter()
+            status = engine.run()
+            elapsed = time.perf_counter() - start
+            if status != "completed":
+                print(f"⚠️ Dispatch run with {count} steps ended with '{status}'")
+            results[f"dispatch.click_text.{count}_steps{suffix}"] = {
+                "unit": "us/step", "better": "lower", "median": elapsed / count * 1e6, "samples": count,
+            }
+
+    # Monitor Image steps end to end (capture handoff + matching in-process)
+    frame = synthetic_screen()
+    patch = plant_template(frame, 48, (700, 500), seed=7)
+    path = os.path.join(workdir, "dispatch_template.png")
+    cv2.imwrite(path, cv2.cvtColor(patch, cv2.COLOR_RGB2BGR))
+    count = 50 if quick else 200
+    elements = [{"type": "Image Area (Monitor Image)", "x": 600, "y": 400, "width": 300,
+                 "height": 250, "parameter": path} for _ in range(count)]
+    engine = AutomationEngine(
+        elements, RecordingBackend(), screen=SCREEN, step_delay=0, type_delay=0, pool_workers=0,
+        tracer=NULL_TRACER,
+        capture_factory=lambda: CaptureProducer.for_screen(interval=0, grab=lambda: frame, size=SCREEN))
+    start = time.perf_counter()
+    engine.run()
+    elapsed = time.perf_counter() - start
+    results[f"dispatch.monitor_image.{count}_steps"] = {
+        "unit": "ms/step", "better": "lower", "median": elapsed / count * 1000, "samples": count,
+    }
+
+
+SUITES = {
+    "capture": bench_capture,
+    "match": bench_matching,
+    "ocr": bench_ocr,
+    "dispatch": bench_dispatch,
+}
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+    }
+
+
+def run_benchmarks(suites, quick=False):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in suites:
+            print(f"⏱️ Running {name} benchmarks...")
+            fn = SUITES[name]
+            if name in ("match", "dispatch"):
+                fn(results, quick, workdir)
+            else:
+                fn(results, quick)
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "quick": quick,
+        "environment": environment(),
+        "benchmarks": results,
+    }
+
+
+# ----------------------------------------------------------------------
+# Comparison
+# ----------------------------------------------------------------------
+
+def compare(baseline, current, threshold=0.10):
+    """Compare two result files, returns a list of (name, old, new, change, status) rows"""
+    rows = []
+    old_results = baseline["benchmarks"]
+    new_results = current["benchmarks"]
+    for name in sorted(set(old_results) | set(new_results)):
+        old, new = old_results.get(name), new_results.get(name)
+        if old is None or new is None:
+            rows.append((name, old and old["median"], new and new["median"], None,
+                         "new" if old is None else "missing"))
+            continue
+        if not old["median"]:
+            rows.append((name, old["median"], new["median"], None, "ok"))
+            continue
+        change = (new["median"] - old["median"]) / old["median"]
+        worse = change > threshold if new.get("better", "lower") == "lower" else change < -threshold
+        better = change < -threshold if new.get("better", "lower") == "lower" else change > threshold
+        rows.append((name, old["median"], new["median"], change,
+                     "REGRESSION" if worse else "improved" if better else "ok"))
+    return rows
+
+
+def print_comparison(rows, units):
+    print(f"{'benchmark':<52} {'baseline':>12} {'current':>12} {'change':>9}  status")
+    for name, old, new, change, status in rows:
+        old_text = f"{old:.3f}" if old is not None else "-"
+        new_text = f"{new:.3f}" if new is not None else "-"
+        change_text = f"{change * 100:+.1f}%" if change is not None else ""
+        marker = "❌" if status == "REGRESSION" else "✅" if status == "improved" else "  "
+        print(f"{name:<52} {old_text:>12} {new_text:>12} {change_text:>9}  {marker} {status} "
+              f"{units.get(name, '')}")
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Smart Automation benchmark suite")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="run benchmarks and store the results as JSON")
+    run_parser.add_argument("--quick", action="store_true", help="fewer sizes and repetitions")
+    run_parser.add_argument("--suite", action="append", choices=list(SUITES),
+                            help="only run the given suite (repeatable)")
+    run_parser.add_argument("--output", help="result file (default: logs/benchmarks/benchmark_<time>.json)")
+    run_parser.add_argument("--compare-to", help="baseline result file to compare against")
+    run_parser.add_argument("--threshold", type=float, default=0.10,
+                            help="relative change counted as a regression (default 0.10)")
+
+    compare_parser = sub.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        report = run_benchmarks(args.suite or list(SUITES), quick=args.quick)
+        output = args.output
+        if not output:
+            os.makedirs(BENCHMARK_DIR, exist_ok=True)
+            output = os.path.join(BENCHMARK_DIR, f"benchmark_{time.strftime('%Y%m%d_%H%M%S')}.json")
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        for name, result in sorted(report["benchmarks"].items()):
+            print(f"{name:<52} {result['median']:>12.3f} {result['unit']}")
+        print(f"💾 Results saved to {output}")
+        if not args.compare_to:
+            return 0
+        baseline, current = load(args.compare_to), report
+    else:
+        baseline, current = load(args.baseline), load(args.current)
+
+    rows = compare(baseline, current, args.threshold)
+    units = {name: result["unit"] for name, result in current["benchmarks"].items()}
+    print_comparison(rows, units)
+    regressions = [row for row in rows if row[4] == "REGRESSION"]
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) above {args.threshold * 100:.0f}%")
+        return 1
+    print("✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+"""
+Control API
+Localhost HTTP + WebSocket API for driving a running instance (the GUI or a
+headless service) from other tools, so jobs reuse its warm capture, monitor
+workers and input backend instead of starting a new process each time.
+
+    GET  /status                    state, loaded workflow, latest status, last result
+    GET  /workflow                  the loaded elements
+    POST /workflow                  {"path": "workflows/x.json"} or {"name": ..., "elements": [...]}
+    POST /runs                      start a run; optional {"path"|"elements", "speed"}
+    POST /stop                      stop the current run
+    GET  /events?since=N&timeout=S  events after N (long poll)
+    GET  /events (WebSocket)        stream of events as JSON text messages
+
+Events are {"seq", "time", "type", ...} with type workflow_loaded, run_started,
+status, message, step, observation, stopped or run_finished.
+
+Every request needs "Authorization: Bearer <token>" (or ?token= for WebSocket
+clients that can't set headers). The token is $SMART_AUTOMATION_API_TOKEN, or a
+new random one written to ~/.smart_automation/api_token (readable only by the
+user) at every start. Because the API moves the mouse and types, it also
+refuses browser requests from other origins and POSTs that are not
+application/json, which browsers can't send cross-site without a preflight.
+
+Usage:
+    python3 control_api.py [--port 8765] [--workflow workflows/x.json]
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import base64
+import select
+import struct
+import hashlib
+import hmac
+import secrets
+import argparse
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from automation_engine import AutomationEngine, EngineResources
+from input_backend import BACKENDS
+from run_log import RunLog
+from workflow import load_workflow, validate_elements
+
+DEFAULT_PORT = 8765
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+TOKEN_FILE = os.path.join(os.path.expanduser("~"), ".smart_automation", "api_token")
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+
+def write_token(token, path=TOKEN_FILE):
+    """Save the API token where only this user can read it"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+
+
+class EventHub:
+    """Numbered event history that any number of readers can follow
+
+    Readers keep their own cursor instead of owning a queue, so a slow or
+    vanished client never holds memory; one that falls behind the history
+    simply skips ahead.
+    """
+
+    def __init__(self, history=1000):
+        self.events = deque(maxlen=history)
+        self.seq = 0
+        self.cond = threading.Condition()
+
+    def publish(self, event_type, **data):
+        with self.cond:
+            self.seq += 1
+            self.events.append({"seq": self.seq, "time": time.time(), "type": event_type, **data})
+            self.cond.notify_all()
+
+    def since(self, seq, timeout=0.0):
+        """Events newer than `seq`, waiting up to `timeout` seconds for the first one"""
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            while self.seq <= seq:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self.cond.wait(remaining)
+            return [event for event in self.events if event["seq"] > seq]
+
+
+def step_event(step):
+    """A finished step, with the element type renamed so it can't clash with the event type"""
+    data = dict(step)
+    data["element_type"] = data.pop("type")
+    return data
+
+
+def observation_event(info):
+    """The JSON-friendly part of an engine observation"""
+    keys = ("index", "kind", "region", "found", "confidence", "location", "text")
+    return {key: info[key] for key in keys if key in info}
+
+
+class EngineController:
+    """Runs workflows in this process, one at a time, on warm shared resources"""
+
+    def __init__(self, input_backend=None, step_delay=1.0, events=None, resources=None):
+        self.events = events or EventHub()
+        self.step_delay = step_delay
+        self.resources = resources or EngineResources(input_backend)
+        self.name = None
+        self.elements = []
+        self.engine = None
+        self.thread = None
+        self.run_id = 0
+        self.last_status = None
+        self.last_result = None
+        self.lock = threading.Lock()
+
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def load(self, name, elements):
+        with self.lock:
+            if self.running():
+                raise RuntimeError("a run is in progress")
+            self.name = name
+            self.elements = elements
+        self.events.publish("workflow_loaded", name=name, elements=len(elements))
+
+    def start(self, speed=1.0, workflow=None):
+        """Start a run, returns its id
+
+        `workflow` ((name, elements)) is loaded first, under the same lock, so no
+        other request can load or start in between.
+        """
+        with self.lock:
+            if self.running():
+                raise RuntimeError("a run is in progress")
+            if workflow is not None:
+                self.name, self.elements = workflow
+                self.events.publish("workflow_loaded", name=self.name, elements=len(self.elements))
+            if not self.elements:
+                raise ValueError("no workflow loaded")
+            self.run_id += 1
+            run_id = self.run_id
+            events = self.events
+
+            def on_status(status):
+                self.last_status = status
+                events.publish("status", run=run_id, status=status)
+
+            self.engine = AutomationEngine(
+                list(self.elements),
+                on_status=on_status,
+                on_message=lambda message: events.publish("message", run=run_id, message=message),
+                on_observation=lambda info: events.publish("observation", run=run_id,
+                                                           **observation_event(info)),
+                on_stopped=lambda ms: events.publish("stopped", run=run_id, latency_ms=ms),
+                on_step=lambda step: events.publish("step", run=run_id, **step_event(step)),
+                step_delay=self.step_delay,
+                speed=speed,
+                resources=self.resources)
+            self.thread = threading.Thread(target=self.run, args=(run_id, self.engine), daemon=True)
+            self.thread.start()
+        return run_id
+
+    def run(self, run_id, engine):
+        self.events.publish("run_started", run=run_id, workflow=self.name, elements=len(engine.elements))
+        run_log = RunLog(self.name).attach(engine)
+        start = time.perf_counter()
+        status = engine.run()
+        run_log.finish(status)
+        self.last_result = {"run": run_id, "workflow": self.name, "status": status,
+                            "failed_steps": [i + 1 for i in engine.failed_steps],
+                            "seconds": time.perf_counter() - start}
+        self.events.publish("run_finished", **self.last_result)
+
+    def stop(self):
+        engine = self.engine
+        if engine and self.running():
+            engine.stop()
+            return True
+        return False
+
+    def status(self):
+        return {
+            "state": "running" if self.running() else "idle",
+            "workflow": self.name,
+            "elements": len(self.elements),
+            "run": self.run_id,
+            "status": self.last_status,
+            "last_result": self.last_result,
+        }
+
+    def close(self):
+        self.stop()
+        if self.thread:
+            self.thread.join(timeout=5)
+        self.resources.close()
+
+
+# ----------------------------------------------------------------------
+# WebSocket framing (RFC 6455, just what an event stream needs)
+# ----------------------------------------------------------------------
+
+def ws_accept_key(key):
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode("ascii")).digest()).decode("ascii")
+
+
+def ws_frame(payload, opcode=0x1):
+    """A single unmasked (server to client) frame"""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+def _recv_exact(sock, count):
+    data = b""
+    while len(data) < count:
+        chunk = sock.recv(count - len(data))
+        if not chunk:
+            raise ConnectionError("client closed the connection")
+        data += chunk
+    return data
+
+
+def ws_read_frame(sock):
+    """Read one client frame, returns (opcode, payload)"""
+    first, second = _recv_exact(sock, 2)
+    opcode = first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", _recv_exact(sock, 2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", _recv_exact(sock, 8))[0]
+    mask = _recv_exact(sock, 4) if second & 0x80 else None
+    payload = _recv_exact(sock, length)
+    if mask:
+        payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+    return opcode, payload
+
+
+class ContentTypeError(ValueError):
+    """A POST without a JSON content type"""
+
+
+def parse_speed(value):
+    """Playback speed from a request body, a finite number above 0"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"speed must be a number, got {value!r}")
+    if not (math.isfinite(value) and value > 0):
+        raise ValueError(f"speed must be a finite number above 0, got {value!r}")
+    return float(value)
+
+
+def query_number(query, name, default, parse=float):
+    """A numeric query parameter, ValueError if it isn't one"""
+    text = query.get(name, [default])[0]
+    try:
+        value = parse(text)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {text!r}") from None
+    if not math.isfinite(value):
+        raise ValueError(f"{name} must be finite, got {text!r}")
+    return value
+
+
+class _ControlHandler(BaseHTTPRequestHandler):
+    # WebSocket clients insist on an HTTP/1.1 upgrade response
+    protocol_version = "HTTP/1.1"
+    controller = None
+    token = None
+
+    # Plumbing ----------------------------------------------------------
+
+    def send_json(self, code, data):
+        body = json.dumps(data, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        # A cross-site form or fetch can only send text/plain etc. without a preflight
+        content_type = (self.headers.get("Content-Type") or "").split(";", 1)[0].strip().lower()
+        if content_type != "application/json":
+            raise ContentTypeError("POST requests need Content-Type: application/json")
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        data = json.loads(self.rfile.read(length).decode("utf-8"))
+        if not isinstance(data, dict):
+            raise ValueError("request body must be a JSON object")
+        return data
+
+    def allowed(self, query):
+        # Only answer to local host names (guards against DNS rebinding)
+        host = (self.headers.get("Host") or "").rsplit(":", 1)[0].strip("[]")
+        if host not in LOCAL_HOSTS:
+            self.send_json(403, {"error": "only local requests are accepted"})
+            return False
+        # Browsers send Origin with cross-site requests and WebSocket upgrades;
+        # command-line clients don't send one
+        origin = self.headers.get("Origin")
+        if origin is not None and not self.local_origin(origin):
+            self.send_json(403, {"error": f"requests from {origin} are not accepted"})
+            return False
+        supplied = self.headers.get("Authorization") or ""
+        if supplied.startswith("Bearer "):
+            supplied = supplied[len("Bearer "):].strip()
+        supplied = supplied or query.get("token", [""])[0]
+        if not hmac.compare_digest(supplied.encode("utf-8"), self.token.encode("utf-8")):
+            self.send_json(401, {"error": "missing or wrong token"})
+            return False
+        return True
+
+    def local_origin(self, origin):
+        port = self.server.server_address[1]
+        return origin in [f"http://{host}:{port}" for host in ("127.0.0.1", "localhost", "[::1]")]
+
+    def log_message(self, format, *args):
+        pass
+
+    # Routes ------------------------------------------------------------
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if not self.allowed(query):
+            return
+        if url.path == "/status":
+            self.send_json(200, self.controller.status())
+        elif url.path == "/workflow":
+            self.send_json(200, {"name": self.controller.name, "elements": self.controller.elements})
+        elif url.path == "/events":
+            if self.headers.get("Upgrade", "").lower() == "websocket":
+                self.stream_events(query)
+            else:
+                try:
+                    since = query_number(query, "since", "0", int)
+                    timeout = min(max(query_number(query, "timeout", "0"), 0.0), 60.0)
+                except ValueError as e:
+                    self.send_json(400, {"error": str(e)})
+                    return
+                events = self.controller.events.since(since, timeout)
+                self.send_json(200, {"events": events,
+                                     "next": events[-1]["seq"] if events else since})
+        else:
+            self.send_json(404, {"error": f"unknown path {url.path}"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if not self.allowed(parse_qs(url.query)):
+            return
+        try:
+            body = self.read_json()
+            if url.path == "/workflow":
+                self.load(body)
+                self.send_json(200, self.controller.status())
+            elif url.path == "/runs":
+                workflow = self.workflow(body) if "path" in body or "elements" in body else None
+                run_id = self.controller.start(parse_speed(body.get("speed", 1.0)), workflow)
+                self.send_json(202, {"run": run_id})
+            elif url.path == "/stop":
+                self.send_json(200, {"stopping": self.controller.stop()})
+            else:
+                self.send_json(404, {"error": f"unknown path {url.path}"})
+        except ContentTypeError as e:
+            self.send_json(415, {"error": str(e)})
+        except RuntimeError as e:
+            self.send_json(409, {"error": str(e)})
+        except (ValueError, TypeError, OSError) as e:
+            self.send_json(400, {"error": str(e)})
+
+    def workflow(self, body):
+        """(name, elements) from a request body with "path" or "elements" """
+        if "path" in body:
+            return load_workflow(body["path"])
+        return body.get("name", "api"), validate_elements(body.get("elements"), "request")
+
+    def load(self, body):
+        self.controller.load(*self.workflow(body))
+
+    def stream_events(self, query):
+        """Upgrade to a WebSocket and push events until the client goes away"""
+        key = self.headers.get("Sec-WebSocket-Key")
+        if not key:
+            self.send_json(400, {"error": "missing Sec-WebSocket-Key"})
+            return
+        events = self.controller.events
+        try:
+            cursor = query_number(query, "since", str(events.seq), int)
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", ws_accept_key(key))
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+
+        sock = self.connection
+        try:
+            while True:
+                for event in events.since(cursor, timeout=0.5):
+                    cursor = event["seq"]
+                    sock.sendall(ws_frame(json.dumps(event, ensure_ascii=False, default=str).encode("utf-8")))
+                # Answer pings and notice a close without blocking the stream
+                while select.select([sock], [], [], 0)[0]:
+                    opcode, payload = ws_read_frame(sock)
+                    if opcode == 0x8:
+                        sock.sendall(ws_frame(payload[:2], opcode=0x8))
+                        return
+                    if opcode == 0x9:
+                        sock.sendall(ws_frame(payload, opcode=0xA))
+        except (ConnectionError, OSError):
+            return
+
+
+class ControlServer:
+    """Serves the control API on localhost in daemon threads"""
+
+    def __init__(self, controller, port=DEFAULT_PORT, host="127.0.0.1", token=None, token_file=TOKEN_FILE):
+        token = token or os.environ.get("SMART_AUTOMATION_API_TOKEN")
+        # Without a configured token, clients read the generated one from token_file
+        self.token_file = None
+        if not token:
+            token = secrets.token_urlsafe(24)
+            write_token(token, token_file)
+            self.token_file = token_file
+        self.token = token
+        handler = type("ControlHandler", (_ControlHandler,), {"controller": controller, "token": token})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def log_message(message):
+    timestamp = time.strftime("%H:%M:%S")
+    print(f"[{timestamp}] {message}", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the Smart Automation control API without the GUI")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="localhost port")
+    parser.add_argument("--workflow", help="workflow to load at startup")
+    parser.add_argument("--input-backend", choices=list(BACKENDS), help="input backend for all runs")
+    parser.add_argument("--step-delay", type=float, default=1.0, help="pause after every element (seconds)")
+    args = parser.parse_args(argv)
+
+    controller = EngineController(args.input_backend, args.step_delay)
+    if args.workflow:
+        controller.load(*load_workflow(args.workflow))
+    try:
+        server = ControlServer(controller, args.port).start()
+    except OSError as e:
+        log_message(f"❌ Could not listen on port {args.port}: {str(e)}")
+        return 1
+    log_message(f"🔌 Control API at {server.url}, press Ctrl+C to quit")
+    if server.token_file:
+        log_message(f"🔑 API token written to {server.token_file}")
+
+    cursor = 0
+    try:
+        while True:
+            for event in controller.events.since(cursor, timeout=1.0):
+                cursor = event["seq"]
+                if event["type"] in ("message", "run_started", "run_finished"):
+                    log_message(event.get("message") or f"{event['type']}: run {event.get('run')}")
+    except KeyboardInterrupt:
+        log_message("⏹️ Shutting down...")
+    finally:
+        server.stop()
+        controller.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
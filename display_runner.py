@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Multi-Display Runner
+Runs workflows in parallel, one worker process per X display. Each worker sets
+its own DISPLAY before anything touches the screen, so its capture producer and
+input backend only see that display, and pulls the next queued run as soon as
+it is free. Displays are started as Xvfb servers or attached by name.
+
+Usage:
+    python3 display_runner.py workflows/a.json workflows/b.json --displays 4 --repeat 10
+    python3 display_runner.py workflows/a.json --attach :1,:2 --input-backend xtest
+"""
+
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+import subprocess
+from multiprocessing import get_context
+
+from input_backend import BACKENDS
+
+X11_SOCKET_DIR = "/tmp/.X11-unix"
+
+
+def free_display_number(start=99):
+    """Lowest display number from `start` up that no X server is using"""
+    number = start
+    while (os.path.exists(f"/tmp/.X{number}-lock")
+           or os.path.exists(os.path.join(X11_SOCKET_DIR, f"X{number}"))):
+        number += 1
+    return number
+
+
+class VirtualDisplay:
+    """An X display driven by one worker, either an Xvfb we started or an existing one"""
+
+    def __init__(self, name, size=None, process=None):
+        self.name = name
+        self.size = size
+        self.process = process
+
+    @classmethod
+    def start(cls, number=None, width=1920, height=1080, depth=24, timeout=10.0):
+        """Start an Xvfb server and wait until it accepts connections"""
+        number = free_display_number() if number is None else number
+        try:
+            process = subprocess.Popen(
+                ["Xvfb", f":{number}", "-screen", "0", f"{width}x{height}x{depth}", "-nolisten", "tcp"],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except FileNotFoundError:
+            raise RuntimeError("Xvfb not found. Please install: sudo apt-get install xvfb") from None
+
+        socket_path = os.path.join(X11_SOCKET_DIR, f"X{number}")
+        deadline = time.monotonic() + timeout
+        while not os.path.exists(socket_path):
+            if process.poll() is not None:
+                raise RuntimeError(f"Xvfb :{number} exited with status {process.returncode}")
+            if time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError(f"Xvfb :{number} did not start within {timeout}s")
+            time.sleep(0.05)
+        return cls(f":{number}", (width, height), process)
+
+    @classmethod
+    def attach(cls, name, size=None):
+        """Use a display that is already running (size is looked up by the worker if None)"""
+        return cls(name, size)
+
+    def stop(self):
+        """Shut down the Xvfb server if we started it"""
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+
+def display_worker(display_name, screen, input_backend, step_delay, jobs, events, stop):
+    """Worker process: run queued workflows on one display until told to quit
+
+    Events sent back are (display, kind, run_id, payload) tuples.
+    """
+    # Must happen before pyautogui/Xlib are imported in this process
+    os.environ["DISPLAY"] = display_name
+    from automation_engine import AutomationEngine, EngineResources
+    from workflow import load_workflow
+
+    resources = EngineResources(input_backend)
+    current = {}
+
+    def watch_stop():
+        stop.wait()
+        engine = current.get("engine")
+        if engine:
+            engine.stop()
+
+    threading.Thread(target=watch_stop, daemon=True).start()
+    events.put((display_name, "ready", None, os.getpid()))
+    try:
+        while not stop.is_set():
+            item = jobs.get()
+            if item is None:
+                break
+            run_id, path = item
+            events.put((display_name, "started", run_id, path))
+            start = time.perf_counter()
+            try:
+                name, elements = load_workflow(path)
+            except (OSError, ValueError) as e:
+                events.put((display_name, "finished", run_id,
+                            {"workflow": path, "status": "failed", "seconds": 0.0, "error": str(e)}))
+                continue
+
+            engine = AutomationEngine(
+                elements,
+                on_message=lambda message, run_id=run_id: events.put((display_name, "message", run_id, message)),
+                screen=screen,
+                step_delay=step_delay,
+                resources=resources)
+            current["engine"] = engine
+            if stop.is_set():
+                engine.stop()
+            status = engine.run()
+            current.pop("engine", None)
+            events.put((display_name, "finished", run_id,
+                        {"workflow": path, "status": status, "seconds": time.perf_counter() - start}))
+    finally:
+        resources.close()
+        events.put((display_name, "exited", None, None))
+
+
+class DisplayRunner:
+    """Distributes workflow runs over several displays and aggregates their status"""
+
+    # How often the collector checks that the workers are still alive
+    LIVENESS_INTERVAL = 0.5
+
+    def __init__(self, displays, input_backend=None, step_delay=1.0, on_message=None, on_event=None,
+                 worker=display_worker):
+        self.displays = list(displays)
+        self.input_backend = input_backend
+        self.step_delay = step_delay
+        self.on_message = on_message or (lambda message: None)
+        self.on_event = on_event or (lambda event: None)
+        self.worker = worker
+        self.context = get_context("spawn")
+        self.jobs = self.context.Queue()
+        self.events = self.context.Queue()
+        self.stop_event = self.context.Event()
+        self.processes = []
+        self.workers = {}
+        # display -> (run id, workflow, start time) of the run it is executing
+        self.in_flight = {}
+        # Dead workers waiting for a second look before they count as crashed
+        self.dying = set()
+        self.collector = None
+        self.lock = threading.Lock()
+        self.done = threading.Condition(self.lock)
+        self.next_run_id = 0
+        self.pending = 0
+        self.started_at = None
+        self.results = []
+        self.status = {display.name: {"state": "starting", "pid": None, "workflow": None, "runs": 0,
+                                      "completed": 0, "failed": 0, "busy_seconds": 0.0}
+                       for display in self.displays}
+
+    def start(self):
+        self.started_at = time.monotonic()
+        for display in self.displays:
+            process = self.context.Process(
+                target=self.worker, name=f"display{display.name}",
+                args=(display.name, display.size, self.input_backend, self.step_delay,
+                      self.jobs, self.events, self.stop_event))
+            process.start()
+            self.processes.append(process)
+            self.workers[display.name] = process
+        self.collector = threading.Thread(target=self.collect, daemon=True)
+        self.collector.start()
+        return self
+
+    def submit(self, path):
+        """Queue a workflow run on whichever display is free first, returns its run id"""
+        with self.lock:
+            self.next_run_id += 1
+            run_id = self.next_run_id
+            self.pending += 1
+        self.jobs.put((run_id, path))
+        return run_id
+
+    def collect(self):
+        """Apply worker events to the per-display status (runs in a thread)"""
+        alive = len(self.processes)
+        checked = time.monotonic()
+        while alive:
+            try:
+                event = self.events.get(timeout=self.LIVENESS_INTERVAL)
+            except queue.Empty:
+                event = None
+            if event is None or time.monotonic() - checked >= self.LIVENESS_INTERVAL:
+                # A worker that crashed (segfault, OOM, Xvfb gone) never sends
+                # "finished" or "exited"
+                alive -= self.reap()
+                checked = time.monotonic()
+            if event is None:
+                continue
+            display, kind, run_id, payload = event
+            with self.lock:
+                status = self.status[display]
+                if kind == "ready":
+                    status.update(state="idle", pid=payload)
+                elif kind == "started":
+                    status.update(state="running", workflow=payload)
+                    self.in_flight[display] = (run_id, payload, time.monotonic())
+                elif kind == "finished":
+                    self.in_flight.pop(display, None)
+                    self.finish_run(display, run_id, payload)
+                elif kind == "exited" and status["state"] != "crashed":
+                    status["state"] = "exited"
+                    alive -= 1
+            if kind == "message":
+                self.on_message(f"[{display} #{run_id}] {payload}")
+            elif kind == "finished":
+                error = f" ({payload['error']})" if payload.get("error") else ""
+                self.on_message(f"[{display} #{run_id}] 🏁 {payload['workflow']}: "
+                                f"{payload['status']} in {payload['seconds']:.1f}s{error}")
+            self.on_event(event)
+        with self.lock:
+            self.done.notify_all()
+
+    def finish_run(self, display, run_id, payload):
+        """Count a finished run (called with the lock held)"""
+        status = self.status[display]
+        status["state"] = "idle"
+        status["workflow"] = None
+        status["runs"] += 1
+        status["busy_seconds"] += payload["seconds"]
+        status["completed" if payload["status"] == "completed" else "failed"] += 1
+        self.results.append({"run_id": run_id, "display": display, **payload})
+        self.pending -= 1
+        self.done.notify_all()
+
+    def reap(self):
+        """Mark workers that died without saying so, failing their current run
+
+        Returns how many were found. A dead worker's last events may still be
+        queued, so it only counts as crashed if it is still unaccounted for at
+        the next check.
+        """
+        crashed = []
+        with self.lock:
+            for display, process in self.workers.items():
+                status = self.status[display]
+                if status["state"] in ("exited", "crashed") or process.is_alive():
+                    self.dying.discard(display)
+                    continue
+                if display not in self.dying:
+                    self.dying.add(display)
+                    continue
+                self.dying.discard(display)
+                error = f"worker exited with code {process.exitcode}"
+                current = self.in_flight.pop(display, None)
+                if current:
+                    run_id, workflow, started = current
+                    self.finish_run(display, run_id, {"workflow": workflow, "status": "failed",
+                                                      "seconds": time.monotonic() - started, "error": error})
+                status["state"] = "crashed"
+                crashed.append((display, current, error))
+        for display, current, error in crashed:
+            run = f" #{current[0]} {current[1]}" if current else ""
+            self.on_message(f"[{display}{run}] 💥 {error}")
+        return len(crashed)
+
+    def wait(self, timeout=None):
+        """Wait until every submitted run finished, returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.lock:
+            while self.pending > 0 and self.collector.is_alive():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.done.wait(remaining if remaining is not None else 1.0)
+            return self.pending == 0
+
+    def summary(self):
+        """Per-display status plus totals and throughput"""
+        with self.lock:
+            displays = {name: dict(status) for name, status in self.status.items()}
+            pending = self.pending
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        runs = sum(status["runs"] for status in displays.values())
+        busy = sum(status["busy_seconds"] for status in displays.values())
+        return {
+            "displays": displays,
+            "runs": runs,
+            "completed": sum(status["completed"] for status in displays.values()),
+            "failed": sum(status["failed"] for status in displays.values()),
+            "queued": pending - sum(1 for status in displays.values() if status["state"] == "running"),
+            "elapsed_seconds": elapsed,
+            "runs_per_minute": runs / elapsed * 60 if elapsed else 0.0,
+            # Share of display time spent running workflows
+            "utilization": busy / (elapsed * len(displays)) if elapsed and displays else 0.0,
+        }
+
+    def summary_lines(self):
+        summary = self.summary()
+        lines = [f"{summary['runs']} runs ({summary['completed']} completed, {summary['failed']} failed), "
+                 f"{summary['queued']} queued, {summary['runs_per_minute']:.1f} runs/min, "
+                 f"utilization {summary['utilization']:.0%}"]
+        for name, status in summary["displays"].items():
+            current = f" {status['workflow']}" if status["workflow"] else ""
+            lines.append(f"  {name}: {status['state']}{current}, {status['runs']} runs, "
+                         f"{status['failed']} failed")
+        return lines
+
+    def stop(self, graceful=True):
+        """Let the workers finish the queue (graceful) or stop their current run right away"""
+        if not graceful:
+            self.stop_event.set()
+        for _ in self.processes:
+            self.jobs.put(None)
+        for process in self.processes:
+            process.join(timeout=None if graceful else 5)
+            if process.is_alive():
+                process.terminate()
+        if self.collector:
+            self.collector.join(timeout=5)
+
+    def close(self):
+        """Stop the workers and every Xvfb server this runner was given"""
+        self.stop(graceful=False)
+        for display in self.displays:
+            display.stop()
+
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def log_message(message):
+    timestamp = time.strftime("%H:%M:%S")
+    print(f"[{timestamp}] {message}", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run workflows in parallel on several X displays")
+    parser.add_argument("workflows", nargs="+", help="workflow JSON files")
+    parser.add_argument("--displays", type=int, default=2, help="number of Xvfb displays to start")
+    parser.add_argument("--attach", help="comma separated existing displays to use instead (e.g. :1,:2)")
+    parser.add_argument("--size", type=parse_size, default=(1920, 1080), help="Xvfb screen size, e.g. 1280x720")
+    parser.add_argument("--repeat", type=int, default=1, help="queue every workflow this many times")
+    parser.add_argument("--input-backend", choices=list(BACKENDS), help="input backend for every display")
+    parser.add_argument("--step-delay", type=float, default=1.0, help="pause after every element (seconds)")
+    parser.add_argument("--status-interval", type=float, default=10.0, help="print aggregated status every N seconds")
+    args = parser.parse_args(argv)
+
+    if args.attach:
+        displays = [VirtualDisplay.attach(name.strip()) for name in args.attach.split(",") if name.strip()]
+    else:
+        displays = []
+        try:
+            for _ in range(args.displays):
+                displays.append(VirtualDisplay.start(width=args.size[0], height=args.size[1]))
+                log_message(f"🖥️ Started Xvfb {displays[-1].name} ({args.size[0]}x{args.size[1]})")
+        except RuntimeError as e:
+            log_message(f"❌ {str(e)}")
+            for display in displays:
+                display.stop()
+            return 1
+
+    runner = DisplayRunner(displays, args.input_backend, args.step_delay, on_message=log_message).start()
+    for _ in range(args.repeat):
+        for path in args.workflows:
+            runner.submit(path)
+    log_message(f"🚀 Queued {len(args.workflows) * args.repeat} runs on {len(displays)} displays")
+
+    try:
+        while not runner.wait(timeout=args.status_interval):
+            for line in runner.summary_lines():
+                log_message(f"📈 {line}")
+    except KeyboardInterrupt:
+        log_message("⏹️ Stopping...")
+    finally:
+        runner.close()
+    for line in runner.summary_lines():
+        log_message(f"📈 {line}")
+    summary = runner.summary()
+    return 0 if summary["failed"] == 0 and summary["queued"] <= 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Shared Frame Ring Buffer
+A single capture producer writes screen frames into shared memory so monitor
+steps, worker processes and the GUI can all read the same pixels as NumPy views
+"""
+
+import sys
+import time
+import threading
+from multiprocessing import shared_memory
+import numpy as np
+
+# Header layout (int64 fields, followed by per-slot sequence/timestamp tables)
+MAGIC = 0x534D4652  # "SMFR"
+META_FIELDS = 8     # magic, slots, height, width, channels, screen_w, screen_h, latest_seq
+ALIGN = 64
+
+
+def _align(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def grab_screen():
+    """Capture the full screen as an RGB array using pyautogui"""
+    import pyautogui
+    return np.asarray(pyautogui.screenshot().convert("RGB"))
+
+
+def screen_size():
+    """Logical screen size used for element coordinates"""
+    import pyautogui
+    width, height = pyautogui.size()
+    return int(width), int(height)
+
+
+def desktop_bounds():
+    """(left, top, right, bottom) of the virtual desktop spanning every monitor
+
+    Monitors left of or above the primary one have negative coordinates. On
+    X11 the root window already spans all monitors, so it is the screen size.
+    """
+    width, height = screen_size()
+    if sys.platform == "win32":
+        import ctypes
+        metric = ctypes.windll.user32.GetSystemMetrics
+        # SM_XVIRTUALSCREEN, SM_YVIRTUALSCREEN, SM_CXVIRTUALSCREEN, SM_CYVIRTUALSCREEN
+        left, top = metric(76), metric(77)
+        return left, top, left + metric(78), top + metric(79)
+    if sys.platform == "darwin":
+        try:
+            import Quartz
+        except ImportError:
+            return 0, 0, width, height
+        left, top, right, bottom = 0, 0, width, height
+        error, displays, count = Quartz.CGGetActiveDisplayList(16, None, None)
+        for display in (displays or ())[:count]:
+            bounds = Quartz.CGDisplayBounds(display)
+            left = min(left, int(bounds.origin.x))
+            top = min(top, int(bounds.origin.y))
+            right = max(right, int(bounds.origin.x + bounds.size.width))
+            bottom = max(bottom, int(bounds.origin.y + bounds.size.height))
+        return left, top, right, bottom
+    return 0, 0, width, height
+
+
+class FrameRing:
+    """Fixed-size ring of frames in shared memory with sequence numbers
+
+    Every slot carries the sequence number of the frame it holds. The writer
+    marks a slot as -1 while copying so readers can detect torn frames, and
+    readers can call is_valid() after using a zero-copy view to make sure the
+    slot was not recycled underneath them.
+    """
+
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self.name = shm.name
+
+        meta = np.ndarray((META_FIELDS,), dtype=np.int64, buffer=shm.buf, offset=0)
+        if meta[0] != MAGIC:
+            raise ValueError(f"Shared memory '{shm.name}' is not a frame ring")
+        self._meta = meta
+        self.slots = int(meta[1])
+        self.height = int(meta[2])
+        self.width = int(meta[3])
+        self.channels = int(meta[4])
+        self.screen_width = int(meta[5])
+        self.screen_height = int(meta[6])
+
+        offset = META_FIELDS * 8
+        self._slot_seq = np.ndarray((self.slots,), dtype=np.int64, buffer=shm.buf, offset=offset)
+        offset += self.slots * 8
+        self._slot_time = np.ndarray((self.slots,), dtype=np.float64, buffer=shm.buf, offset=offset)
+        offset = _align(offset + self.slots * 8)
+        self._frames = np.ndarray((self.slots, self.height, self.width, self.channels),
+                                  dtype=np.uint8, buffer=shm.buf, offset=offset)
+
+    @staticmethod
+    def _nbytes(slots, height, width, channels):
+        header = _align(META_FIELDS * 8 + slots * 16)
+        return header + slots * height * width * channels
+
+    @classmethod
+    def create(cls, height, width, channels=3, slots=4, screen_width=None, screen_height=None, name=None):
+        """Allocate a new ring in shared memory (the creator owns and unlinks it)"""
+        size = cls._nbytes(slots, height, width, channels)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        meta = np.ndarray((META_FIELDS,), dtype=np.int64, buffer=shm.buf, offset=0)
+        meta[:] = [MAGIC, slots, height, width, channels,
+                   screen_width or width, screen_height or height, -1]
+        seqs = np.ndarray((slots,), dtype=np.int64, buffer=shm.buf, offset=META_FIELDS * 8)
+        seqs[:] = -1
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """Attach to an existing ring created by another process or thread"""
+        try:
+            # Readers must not unlink the segment when they exit
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Before Python 3.13 attaching always registers the segment with the
+            # resource tracker; spawned workers share the creator's tracker, so
+            # the registration is released when the creator unlinks the ring
+            shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, owner=False)
+
+    @property
+    def scale(self):
+        """Ratio between captured pixels and logical screen coordinates (HiDPI)"""
+        return self.width / self.screen_width if self.screen_width else 1.0
+
+    @property
+    def latest_seq(self):
+        return int(self._meta[7])
+
+    def write(self, frame, timestamp=None):
+        """Copy a frame into the next slot and publish it, returns its sequence number"""
+        seq = self.latest_seq + 1
+        slot = seq % self.slots
+        self._slot_seq[slot] = -1
+        self._frames[slot, :frame.shape[0], :frame.shape[1]] = frame[:self.height, :self.width, :self.channels]
+        self._slot_time[slot] = time.time() if timestamp is None else timestamp
+        self._slot_seq[slot] = seq
+        self._meta[7] = seq
+        return seq
+
+    def get(self, seq):
+        """Zero-copy view of frame `seq`, or None if it was overwritten or not written yet"""
+        if seq < 0:
+            return None
+        slot = seq % self.slots
+        if self._slot_seq[slot] != seq:
+            return None
+        return self._frames[slot]
+
+    def timestamp(self, seq):
+        slot = seq % self.slots
+        return float(self._slot_time[slot]) if self._slot_seq[slot] == seq else None
+
+    def is_valid(self, seq):
+        """True while frame `seq` is still held by its slot"""
+        return seq >= 0 and self._slot_seq[seq % self.slots] == seq
+
+    def read_latest(self):
+        """Return (seq, view) of the newest frame, or (-1, None) if nothing was captured yet"""
+        seq = self.latest_seq
+        return seq, self.get(seq)
+
+    def region(self, seq, x, y, width, height):
+        """Zero-copy view of a screen region (logical coordinates) of frame `seq`"""
+        frame = self.get(seq)
+        if frame is None:
+            return None
+        return crop_region(frame, (x, y, width, height), self.scale)
+
+    def copy_region(self, seq, x, y, width, height):
+        """Copy of a region that is guaranteed not to be torn by the writer"""
+        view = self.region(seq, x, y, width, height)
+        if view is None:
+            return None
+        data = view.copy()
+        return data if self.is_valid(seq) else None
+
+    def close(self):
+        # Drop our views before closing the mapping
+        self._meta = self._slot_seq = self._slot_time = self._frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # A consumer still holds a view; the mapping goes away with it
+            pass
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def crop_region(frame, region, scale=1.0):
+    """Slice a (x, y, width, height) region out of a frame, clamped to its bounds"""
+    x, y, width, height = region
+    if scale != 1.0:
+        x, y = int(round(x * scale)), int(round(y * scale))
+        width, height = int(round(width * scale)), int(round(height * scale))
+    x0, y0 = max(0, x), max(0, y)
+    x1 = min(frame.shape[1], x + width)
+    y1 = min(frame.shape[0], y + height)
+    if x1 <= x0 or y1 <= y0:
+        return frame[0:0, 0:0]
+    return frame[y0:y1, x0:x1]
+
+
+class CaptureProducer(threading.Thread):
+    """Background thread that is the only place the screen gets captured
+
+    Frames are taken every `interval` seconds (0 disables periodic capture) and
+    immediately whenever a consumer calls request_frame(). All consumers then
+    read the result from the shared ring instead of taking their own screenshot.
+    """
+
+    def __init__(self, ring, grab=grab_screen, interval=0.5):
+        super().__init__(daemon=True)
+        self.ring = ring
+        self.grab = grab
+        self.interval = interval
+        self.error = None
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._cond = threading.Condition()
+
+    @classmethod
+    def for_screen(cls, slots=4, interval=0.5, grab=grab_screen, size=None):
+        """Create a ring sized for the current screen and a producer feeding it"""
+        first = grab()
+        screen_w, screen_h = size or screen_size()
+        height, width = first.shape[:2]
+        channels = first.shape[2] if first.ndim == 3 else 1
+        ring = FrameRing.create(height, width, channels, slots=slots,
+                                screen_width=screen_w, screen_height=screen_h)
+        ring.write(first.reshape(height, width, channels))
+        return cls(ring, grab=grab, interval=interval)
+
+    def run(self):
+        while not self._stopped.is_set():
+            timeout = self.interval if self.interval > 0 else None
+            self._wake.wait(timeout)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                frame = self.grab()
+                if frame.ndim == 2:
+                    frame = frame[:, :, None]
+                self.ring.write(frame)
+                self.error = None
+            except Exception as e:
+                self.error = e
+            with self._cond:
+                self._cond.notify_all()
+
+    def request_frame(self, timeout=5.0, cancel=None):
+        """Ask for a fresh capture and wait for it, returns the new sequence number
+
+        If `cancel` (a threading.Event) gets set while waiting, returns None.
+        """
+        before = self.ring.latest_seq
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._wake.set()
+            while self.ring.latest_seq <= before:
+                if cancel is not None and cancel.is_set():
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No frame captured within {timeout}s: {self.error}")
+                # Wake up regularly to notice cancellation
+                self._cond.wait(min(remaining, 0.02) if cancel is not None else remaining)
+                if self.error is not None and self.ring.latest_seq <= before:
+                    raise RuntimeError(f"Screen capture failed: {self.error}")
+        return self.ring.latest_seq
+
+    def stop(self):
+        """Stop capturing and release the shared memory"""
+        self._stopped.set()
+        self._wake.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout=2)
+        self.ring.close()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Headless Runner
+Runs a saved workflow without the GUI, printing the execution log and
+periodically polling the engine metrics
+
+Usage:
+    python3 headless.py workflows/login.json [--metrics-port 9464] [--metrics-interval 10]
+"""
+
+import sys
+import time
+import argparse
+import threading
+
+from automation_engine import AutomationEngine
+from input_backend import BACKENDS
+from metrics import ENGINE_METRICS, MetricsServer
+from run_log import RunLog
+from tracing import Tracer
+from workflow import load_workflow
+
+
+def log_message(message):
+    """Print a log line with the same timestamp prefix as the GUI log"""
+    timestamp = time.strftime("%H:%M:%S")
+    print(f"[{timestamp}] {message}", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a Smart Automation workflow without the GUI")
+    parser.add_argument("workflow", help="workflow JSON file")
+    parser.add_argument("--input-backend", choices=list(BACKENDS), help="input backend for this run")
+    parser.add_argument("--step-delay", type=float, default=1.0, help="pause after every element (seconds)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="playback speed factor, 2 halves every pause (including recorded ones)")
+    parser.add_argument("--trace", action="store_true", help="write a trace to logs/traces")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on localhost:PORT")
+    parser.add_argument("--metrics-interval", type=float, default=0,
+                        help="print a metrics summary every N seconds while running")
+    args = parser.parse_args(argv)
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    name, elements = load_workflow(args.workflow)
+    log_message(f"📂 Loaded workflow '{name}' with {len(elements)} elements")
+
+    server = None
+    if args.metrics_port is not None:
+        server = MetricsServer(ENGINE_METRICS, port=args.metrics_port).start()
+        log_message(f"📈 Metrics available at {server.url}")
+
+    engine = AutomationEngine(
+        elements, args.input_backend,
+        on_status=lambda status: log_message(f"ℹ️ {status}"),
+        on_message=log_message,
+        on_stopped=lambda ms: log_message(f"⏹️ Automation stopped ({ms:.0f} ms)"),
+        step_delay=args.step_delay,
+        speed=args.speed,
+        tracer=Tracer(name) if args.trace else None)
+    run_log = RunLog(name).attach(engine)
+
+    result = {}
+    worker = threading.Thread(target=lambda: result.setdefault("status", engine.run()), daemon=True)
+    worker.start()
+    try:
+        last_report = time.monotonic()
+        while worker.is_alive():
+            # Short joins keep Ctrl+C responsive
+            worker.join(timeout=0.2)
+            if args.metrics_interval and time.monotonic() - last_report >= args.metrics_interval:
+                log_message(f"📈 {ENGINE_METRICS.summary_line()}")
+                last_report = time.monotonic()
+    except KeyboardInterrupt:
+        engine.stop()
+        worker.join()
+    run_log.finish(result.get("status", "error"))
+    log_message(f"📝 Step log: {run_log.csv_path}")
+
+    if engine.tracer.enabled:
+        trace_path, summary_path = engine.tracer.save()
+        log_message(f"📊 Trace saved: {trace_path} (summary: {summary_path})")
+    log_message(f"📈 {ENGINE_METRICS.summary_line()}")
+    if server:
+        server.stop()
+    return 0 if result.get("status") == "completed" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Input Backends
+Mouse/keyboard output used by the automation engine. The pyautogui backend is
+the portable default, the XTest backend talks to the X server directly and
+sends each action as one pre-batched event sequence, and the recording backend
+only records events (for tests and dry runs).
+"""
+
+import os
+import time
+
+# Event tuples understood by every backend:
+#   ("move", x, y)                 absolute pointer motion
+#   ("button", button, pressed)    1 = left, 2 = middle, 3 = right
+#   ("key", key, pressed)          a single character or an X keysym name ("Return")
+
+BUTTON_NAMES = {1: "left", 2: "middle", 3: "right"}
+
+
+def click_events(x, y, button=1):
+    return [("move", x, y), ("button", button, True), ("button", button, False)]
+
+
+def text_events(text):
+    events = []
+    for char in text:
+        events.append(("key", char, True))
+        events.append(("key", char, False))
+    return events
+
+
+class InputBackend:
+    """Base class: turns clicks and text into event batches and times them"""
+
+    name = "base"
+    # Delay the engine waits after each action (interruptibly)
+    pause = 0.0
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.last_ns = 0
+
+    def send(self, events):
+        """Deliver a batch of events"""
+        raise NotImplementedError
+
+    def _record(self, elapsed):
+        self.calls += 1
+        self.total_ns += elapsed
+        self.last_ns = elapsed
+        if elapsed > self.max_ns:
+            self.max_ns = elapsed
+
+    def _timed_send(self, events):
+        start = time.perf_counter_ns()
+        self.send(events)
+        self._record(time.perf_counter_ns() - start)
+
+    def click(self, x, y, button=1):
+        self._timed_send(click_events(x, y, button))
+
+    def type_text(self, text):
+        if text:
+            self._timed_send(text_events(text))
+
+    def press(self, key):
+        self._timed_send([("key", key, True), ("key", key, False)])
+
+    def missing_characters(self, text):
+        """Characters of `text` this backend cannot type (none by default)"""
+        return []
+
+    def stats(self):
+        """Latency summary in microseconds"""
+        average = self.total_ns / self.calls / 1000 if self.calls else 0.0
+        return {
+            "backend": self.name,
+            "calls": self.calls,
+            "avg_us": average,
+            "max_us": self.max_ns / 1000,
+            "last_us": self.last_ns / 1000,
+        }
+
+    def close(self):
+        pass
+
+
+class PyAutoGuiBackend(InputBackend):
+    """Portable backend on top of pyautogui (skips its per-call PAUSE sleep)"""
+
+    name = "pyautogui"
+
+    def __init__(self):
+        super().__init__()
+        import pyautogui
+        self.pyautogui = pyautogui
+        self.pause = pyautogui.PAUSE
+
+    def send(self, events):
+        gui = self.pyautogui
+        for event in events:
+            kind = event[0]
+            if kind == "move":
+                gui.moveTo(event[1], event[2], _pause=False)
+            elif kind == "button":
+                action = gui.mouseDown if event[2] else gui.mouseUp
+                action(button=BUTTON_NAMES.get(event[1], "left"), _pause=False)
+            elif kind == "key":
+                key = event[1] if len(event[1]) == 1 else event[1].lower()
+                action = gui.keyDown if event[2] else gui.keyUp
+                action(key, _pause=False)
+
+    def click(self, x, y, button=1):
+        start = time.perf_counter_ns()
+        self.pyautogui.click(x, y, button=BUTTON_NAMES.get(button, "left"), _pause=False)
+        self._record(time.perf_counter_ns() - start)
+
+    def type_text(self, text):
+        start = time.perf_counter_ns()
+        self.pyautogui.write(text, _pause=False)
+        self._record(time.perf_counter_ns() - start)
+
+
+class XTestBackend(InputBackend):
+    """Direct X11 backend using the XTest extension (python-xlib)
+
+    Events of one action are queued with fake_input and flushed together, so a
+    click or a chunk of text costs one round trip to the X server. Unlike
+    pyautogui there is no corner failsafe; use the Stop button instead.
+    """
+
+    name = "xtest"
+
+    def __init__(self, display_name=None):
+        super().__init__()
+        from Xlib import X, XK, display
+        from Xlib.ext import xtest
+        self.X = X
+        self.XK = XK
+        self.xtest = xtest
+        self.display = display.Display(display_name or os.environ.get("DISPLAY"))
+        if not self.display.has_extension("XTEST"):
+            self.display.close()
+            raise RuntimeError("X server does not support the XTEST extension")
+        self.root = self.display.screen().root
+        self._keycodes = {}
+        self._load_keymap()
+
+    def _load_keymap(self):
+        """Map keysyms to (keycode, needs_shift) once instead of per keystroke"""
+        first = self.display.display.info.min_keycode
+        count = self.display.display.info.max_keycode - first + 1
+        mapping = self.display.get_keyboard_mapping(first, count)
+        for offset, keysyms in enumerate(mapping):
+            for index, keysym in enumerate(keysyms[:2]):
+                if keysym and keysym not in self._keycodes:
+                    self._keycodes[keysym] = (first + offset, index == 1)
+        shift = self.XK.string_to_keysym("Shift_L")
+        self.shift_keycode = self._keycodes.get(shift, (50, False))[0]
+
+    def _keysym(self, key):
+        if len(key) == 1:
+            special = {"\n": "Return", "\t": "Tab", " ": "space"}
+            if key in special:
+                return self.XK.string_to_keysym(special[key])
+            code = ord(key)
+            # Latin-1 characters map directly, everything else via the Unicode range
+            return code if code < 0x100 else 0x01000000 | code
+        return self.XK.string_to_keysym(key)
+
+    def missing_characters(self, text):
+        return sorted({char for char in text if self._keysym(char) not in self._keycodes})
+
+    def _key_inputs(self, key, pressed):
+        keysym = self._keysym(key)
+        entry = self._keycodes.get(keysym)
+        if entry is None:
+            raise ValueError(f"No key on the current keyboard layout produces {key!r}")
+        keycode, shifted = entry
+        X = self.X
+        inputs = [(X.KeyPress if pressed else X.KeyRelease, keycode, {})]
+        if shifted:
+            shift = (X.KeyPress if pressed else X.KeyRelease, self.shift_keycode, {})
+            inputs.insert(0 if pressed else 1, shift)
+        return inputs
+
+    def send(self, events):
+        X = self.X
+        # Translate the whole batch first so a bad character can't leave keys held down
+        inputs = []
+        for event in events:
+            kind = event[0]
+            if kind == "move":
+                inputs.append((X.MotionNotify, 0, {"x": int(event[1]), "y": int(event[2])}))
+            elif kind == "button":
+                inputs.append((X.ButtonPress if event[2] else X.ButtonRelease, event[1], {}))
+            elif kind == "key":
+                inputs.extend(self._key_inputs(event[1], event[2]))
+        for event_type, detail, kwargs in inputs:
+            self.xtest.fake_input(self.display, event_type, detail, **kwargs)
+        # One round trip for the whole batch
+        self.display.sync()
+
+    def close(self):
+        self.display.close()
+
+
+class RecordingBackend(InputBackend):
+    """Backend that only records events, for tests and dry runs"""
+
+    name = "recording"
+
+    def __init__(self, clock=time.monotonic):
+        super().__init__()
+        self.clock = clock
+        self.events = []
+
+    def send(self, events):
+        now = self.clock()
+        self.events.extend((now,) + tuple(event) for event in events)
+
+    def clicks(self):
+        """(x, y) of every recorded button press"""
+        position = (None, None)
+        result = []
+        for event in self.events:
+            if event[1] == "move":
+                position = (event[2], event[3])
+            elif event[1] == "button" and event[3]:
+                result.append(position)
+        return result
+
+    def typed_text(self):
+        """Concatenation of every character that was pressed"""
+        return "".join(event[2] for event in self.events
+                       if event[1] == "key" and event[3] and len(event[2]) == 1)
+
+
+BACKENDS = {
+    "pyautogui": PyAutoGuiBackend,
+    "xtest": XTestBackend,
+    "recording": RecordingBackend,
+}
+
+DEFAULT_BACKEND = os.environ.get("SMART_AUTOMATION_INPUT", "pyautogui")
+
+
+def create_backend(name=None, **kwargs):
+    """Create an input backend by name (defaults to $SMART_AUTOMATION_INPUT or pyautogui)"""
+    name = name or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown input backend '{name}' (choose from: {', '.join(BACKENDS)})")
+    return BACKENDS[name](**kwargs)
+
+
+def available_backends():
+    """Names of backends whose dependencies are importable here"""
+    names = ["pyautogui"]
+    try:
+        import Xlib  # noqa: F401
+        if os.environ.get("DISPLAY"):
+            names.append("xtest")
+    except ImportError:
+        pass
+    names.append("recording")
+    return names
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Live Region Preview
+Shows what each Monitor step is looking at, rendered from frames the engine
+already put in the shared frame ring
+"""
+
+import time
+from PySide6.QtWidgets import QWidget, QHBoxLayout, QVBoxLayout, QLabel, QScrollArea, QFrame
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QImage, QPixmap, QPainter, QPen, QColor
+
+from frame_buffer import FrameRing
+
+
+def region_image(ring, seq, region):
+    """Wrap a region of a ring frame in a QImage without copying the pixels
+
+    The returned image points into shared memory, so it must be scaled (which
+    makes a small copy) before the frame slot can be reused by the producer.
+    """
+    frame = ring.get(seq)
+    if frame is None or ring.channels not in (3, 4):
+        return None
+    scale = ring.scale
+    x, y, width, height = region
+    x0 = max(0, int(round(x * scale)))
+    y0 = max(0, int(round(y * scale)))
+    x1 = min(ring.width, int(round((x + width) * scale)))
+    y1 = min(ring.height, int(round((y + height) * scale)))
+    if x1 <= x0 or y1 <= y0:
+        return None
+
+    # Start the buffer at the region origin and keep the full frame stride
+    stride = frame.strides[0]
+    offset = y0 * stride + x0 * ring.channels
+    buffer = frame.reshape(-1)[offset:]
+    fmt = QImage.Format_RGB888 if ring.channels == 3 else QImage.Format_RGBA8888
+    return QImage(buffer, x1 - x0, y1 - y0, stride, fmt)
+
+
+class RegionTile(QFrame):
+    """Thumbnail and last result for one monitored region"""
+
+    def __init__(self, title, parent=None):
+        super().__init__(parent)
+        self.setFrameShape(QFrame.StyledPanel)
+        self.setStyleSheet("""
+            QFrame {
+                border: 1px solid #bdc3c7;
+                border-radius: 5px;
+                background-color: #f8f9fa;
+            }
+        """)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(4, 4, 4, 4)
+
+        self.title = QLabel(title)
+        self.title.setStyleSheet("font-weight: bold; font-size: 11px; border: none;")
+        layout.addWidget(self.title)
+
+        self.image = QLabel("Waiting for frame...")
+        self.image.setAlignment(Qt.AlignCenter)
+        self.image.setStyleSheet("border: none; color: #7f8c8d;")
+        layout.addWidget(self.image)
+
+        self.caption = QLabel("")
+        self.caption.setWordWrap(True)
+        self.caption.setStyleSheet("font-size: 11px; font-family: monospace; border: none;")
+        layout.addWidget(self.caption)
+
+
+class RegionPreview(QWidget):
+    """Preview pane with one tile per monitored region
+
+    Observations from the automation thread are only recorded when they arrive;
+    rendering happens on a timer capped at `max_fps` and only for tiles that
+    changed, so a fast workflow costs at most one small scaled copy per tile
+    per refresh.
+    """
+
+    def __init__(self, parent=None, max_fps=4, thumb_width=240, thumb_height=120):
+        super().__init__(parent)
+        self.thumb_width = thumb_width
+        self.thumb_height = thumb_height
+        self.ring = None
+        self.tiles = {}
+        self.pending = {}
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.scroll = QScrollArea()
+        self.scroll.setWidgetResizable(True)
+        self.scroll.setFixedHeight(thumb_height + 80)
+        self.scroll.setStyleSheet("""
+            QScrollArea {
+                border: 2px solid #bdc3c7;
+                border-radius: 5px;
+            }
+        """)
+        container = QWidget()
+        self.tile_layout = QHBoxLayout(container)
+        self.tile_layout.setAlignment(Qt.AlignLeft)
+        self.empty_label = QLabel("No monitored regions yet")
+        self.empty_label.setStyleSheet("color: #7f8c8d; padding: 10px;")
+        self.tile_layout.addWidget(self.empty_label)
+        self.scroll.setWidget(container)
+        layout.addWidget(self.scroll)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.set_max_fps(max_fps)
+
+    def set_max_fps(self, max_fps):
+        """Cap how often tiles are redrawn"""
+        self.timer.setInterval(int(1000 / max(0.1, max_fps)))
+
+    def attach(self, ring_name):
+        """Attach to the engine's frame ring (a separate mapping owned by the GUI)"""
+        self.detach()
+        try:
+            self.ring = FrameRing.attach(ring_name)
+        except (FileNotFoundError, ValueError):
+            self.ring = None
+            return
+        self.timer.start()
+
+    def detach(self):
+        """Render anything still pending, then release the frame ring"""
+        if self.ring is not None:
+            self.refresh()
+            self.ring.close()
+            self.ring = None
+        self.timer.stop()
+
+    def clear(self):
+        """Remove all tiles"""
+        self.pending.clear()
+        for tile in self.tiles.values():
+            self.tile_layout.removeWidget(tile)
+            tile.deleteLater()
+        self.tiles.clear()
+        self.empty_label.show()
+
+    def observe(self, info):
+        """Record the latest observation of a monitored region (cheap, no rendering)"""
+        self.pending[info['index']] = info
+
+    def tile_for(self, info):
+        tile = self.tiles.get(info['index'])
+        if tile is None:
+            self.empty_label.hide()
+            tile = RegionTile(f"{info['index'] + 1}. {info['kind']}")
+            tile.image.setFixedSize(self.thumb_width, self.thumb_height)
+            self.tiles[info['index']] = tile
+            self.tile_layout.addWidget(tile)
+        return tile
+
+    def refresh(self):
+        """Redraw tiles whose region was observed since the last refresh"""
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, {}
+        for info in pending.values():
+            tile = self.tile_for(info)
+            pixmap = self.render(info)
+            if pixmap is not None:
+                tile.image.setPixmap(pixmap)
+            tile.caption.setText(self.describe(info))
+
+    def render(self, info):
+        if self.ring is None:
+            return None
+        image = region_image(self.ring, info['seq'], info['region'])
+        if image is None:
+            return None
+        scaled = image.scaled(self.thumb_width, self.thumb_height,
+                              Qt.KeepAspectRatio, Qt.FastTransformation)
+        # The scaled copy is only trustworthy if the slot was not reused meanwhile
+        if not self.ring.is_valid(info['seq']):
+            return None
+        if scaled.format() != QImage.Format_RGB32:
+            scaled = scaled.convertToFormat(QImage.Format_RGB32)
+
+        location = info.get('location')
+        size = info.get('size')
+        if location and size:
+            x, y, width, height = info['region']
+            factor = scaled.width() / max(1, width)
+            painter = QPainter(scaled)
+            color = QColor("#27ae60") if info.get('found') else QColor("#e74c3c")
+            painter.setPen(QPen(color, 2))
+            painter.drawRect(int((location[0] - x) * factor), int((location[1] - y) * factor),
+                             max(1, int(size[0] * factor)), max(1, int(size[1] * factor)))
+            painter.end()
+        return QPixmap.fromImage(scaled)
+
+    def describe(self, info):
+        stamp = time.strftime("%H:%M:%S", time.localtime(info.get('time', time.time())))
+        status = "✅" if info.get('found') else "❌"
+        if info.get('text') is not None:
+            text = " ".join(info['text'].split())
+            if len(text) > 60:
+                text = text[:57] + "..."
+            return f"[{stamp}] {status} '{text}'"
+        if info.get('confidence') is not None:
+            return f"[{stamp}] {status} confidence {info['confidence']:.2f}"
+        return f"[{stamp}] 📸 area captured"
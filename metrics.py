@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Run Metrics
+Counters, gauges and histograms updated by the automation engine, served on a
+localhost HTTP endpoint in Prometheus text format (and as JSON).
+
+ENGINE_METRICS is shared by every engine in the process, so the GUI, the
+scheduler and the control API can write to it from their own threads at the
+same time. Every collector guards its values with a lock; updates and scrapes
+only hold it for a dict update or copy, so the step loop never waits long.
+"""
+
+import json
+import time
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "smart_automation"
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONFIDENCE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.99, 1.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def get(self, *labels):
+        return self.values.get(labels, 0)
+
+    def items(self):
+        with self.lock:
+            return list(self.values.items())
+
+    def total(self):
+        return sum(value for labels, value in self.items())
+
+    def samples(self):
+        for labels, value in self.items():
+            yield self.name, _labels(self.label_names, labels), value
+
+    def snapshot(self):
+        if not self.label_names:
+            return self.values.get((), 0)
+        return {"/".join(map(str, k)): v for k, v in self.items()}
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        with self.lock:
+            self.values[labels] = value
+
+    def replace(self, value, *labels):
+        """Make `labels` the only series (e.g. the type of the current step)"""
+        with self.lock:
+            self.values.clear()
+            if labels:
+                self.values[labels] = value
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets, labels=()):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(labels)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                # [per-bucket counts (last one is +Inf), sum, count]
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def items(self):
+        """Consistent copy of every series"""
+        with self.lock:
+            return [(labels, (list(counts), total, count))
+                    for labels, (counts, total, count) in self.series.items()]
+
+    def samples(self):
+        for labels, (counts, total, count) in self.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield (f"{self.name}_bucket",
+                       _labels(self.label_names, labels, ("le", _number(float(bound)))), cumulative)
+            yield f"{self.name}_sum", _labels(self.label_names, labels), total
+            yield f"{self.name}_count", _labels(self.label_names, labels), count
+
+    def snapshot(self):
+        result = {}
+        for labels, (counts, total, count) in self.items():
+            key = "/".join(map(str, labels)) or "all"
+            result[key] = {"count": count, "sum": total, "mean": total / count if count else 0.0,
+                           "buckets": dict(zip(map(str, self.buckets + (float("inf"),)), counts))}
+        return result
+
+
+class EngineMetrics:
+    """All metrics reported by the automation engine"""
+
+    def __init__(self):
+        p = PREFIX
+        self.steps = Counter(f"{p}_steps_total", "Steps executed", ["type"])
+        self.failures = Counter(f"{p}_step_failures_total", "Steps that failed (target not found or error)", ["type"])
+        self.step_latency = Histogram(f"{p}_step_duration_seconds", "Step duration, not counting the delay after the step",
+                                      LATENCY_BUCKETS, ["type"])
+        self.confidence = Histogram(f"{p}_match_confidence", "Best template match confidence",
+                                    CONFIDENCE_BUCKETS)
+        self.ocr_cache = Counter(f"{p}_ocr_cache_requests_total", "OCR lookups by cache result", ["result"])
+        self.runs = Counter(f"{p}_runs_total", "Finished runs by status", ["status"])
+        self.running = Gauge(f"{p}_run_active", "Runs executing right now")
+        # With several runs at once these show the step that started last
+        self.current_step = Gauge(f"{p}_current_step", "Index (1-based) of the step being executed, 0 when idle")
+        self.current_type = Gauge(f"{p}_current_step_info", "Type of the step being executed", ["type"])
+        self.last_run_started = Gauge(f"{p}_last_run_start_timestamp_seconds", "Start time of the latest run")
+        self.collectors = [self.steps, self.failures, self.step_latency, self.confidence, self.ocr_cache,
+                           self.runs, self.running, self.current_step, self.current_type,
+                           self.last_run_started]
+
+    # Engine hooks ------------------------------------------------------
+
+    def run_started(self):
+        self.running.inc()
+        self.last_run_started.set(time.time())
+
+    def run_finished(self, status):
+        self.runs.inc(status)
+        self.running.inc(amount=-1)
+        self.current_step.set(0)
+        self.current_type.replace(1)
+
+    def step_started(self, index, kind):
+        self.current_step.set(index + 1)
+        self.current_type.replace(1, kind)
+
+    def step_finished(self, kind, seconds, ok):
+        self.steps.inc(kind)
+        self.step_latency.observe(seconds, kind)
+        if not ok:
+            self.failures.inc(kind)
+
+    def match_confidence(self, value):
+        self.confidence.observe(value)
+
+    def ocr_lookup(self, hit):
+        self.ocr_cache.inc("hit" if hit else "miss")
+
+    # Export ------------------------------------------------------------
+
+    def ocr_cache_hit_rate(self):
+        hits, misses = self.ocr_cache.get("hit"), self.ocr_cache.get("miss")
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    def prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for collector in self.collectors:
+            lines.append(f"# HELP {collector.name} {collector.help}")
+            lines.append(f"# TYPE {collector.name} {collector.kind}")
+            for name, labels, value in collector.samples():
+                lines.append(f"{name}{labels} {_number(value)}")
+        hit_rate = f"{PREFIX}_ocr_cache_hit_ratio"
+        lines.append(f"# HELP {hit_rate} Share of OCR lookups served from the cache")
+        lines.append(f"# TYPE {hit_rate} gauge")
+        lines.append(f"{hit_rate} {_number(self.ocr_cache_hit_rate())}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """Plain dict of the current values (for JSON and headless polling)"""
+        data = {collector.name[len(PREFIX) + 1:]: collector.snapshot() for collector in self.collectors}
+        data["ocr_cache_hit_ratio"] = self.ocr_cache_hit_rate()
+        return data
+
+    def summary_line(self):
+        """One-line status for periodic printing"""
+        steps = self.steps.total()
+        failures = self.failures.total()
+        current = self.current_step.get()
+        kind = next(iter(dict(self.current_type.items())), ("-",))[0]
+        return (f"steps={steps} failures={failures} current={current or '-'} ({kind}) "
+                f"ocr_cache_hit={self.ocr_cache_hit_rate():.0%}")
+
+
+# Shared by every engine in the process, so runs accumulate like Prometheus expects
+ENGINE_METRICS = EngineMetrics()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    metrics = None
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body = self.metrics.prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body = json.dumps(self.metrics.snapshot(), indent=2).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404, "Try /metrics or /metrics.json")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would flood the console
+        pass
+
+
+class MetricsServer:
+    """Serves /metrics (Prometheus) and /metrics.json on localhost in a daemon thread"""
+
+    def __init__(self, metrics=ENGINE_METRICS, port=9464, host="127.0.0.1"):
+        handler = type("MetricsHandler", (_MetricsHandler,), {"metrics": metrics})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}/metrics"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Monitor Worker Pool
+Runs template matching and OCR in worker processes that read screen regions
+straight out of the shared frame ring, so only small results cross processes
+"""
+
+import os
+import sys
+import signal
+from time import perf_counter_ns
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context
+
+from frame_buffer import FrameRing
+
+# Per-process caches (each worker attaches to the ring once)
+_rings = {}
+_templates = {}
+
+
+def _register_worker(pids):
+    """Executor initializer: report this worker's pid so the pool can kill it"""
+    pids.put(os.getpid())
+
+
+def _attach(ring_name):
+    ring = _rings.get(ring_name)
+    if ring is None:
+        ring = FrameRing.attach(ring_name)
+        _rings[ring_name] = ring
+    return ring
+
+
+def _load_template(path):
+    import cv2
+    key = (path, os.path.getmtime(path))
+    template = _templates.get(key)
+    if template is None:
+        template = cv2.imread(path)
+        if template is None:
+            raise ValueError(f"Could not load target image: {path}")
+        _templates[key] = template
+    return template
+
+
+def _region_bgr(ring, seq, region):
+    """Convert a region of a frame to BGR for OpenCV (the only copy that is made)"""
+    import cv2
+    view = ring.region(seq, *region)
+    if view is None or view.size == 0:
+        raise RuntimeError(f"Frame {seq} is no longer available")
+    if ring.channels == 4:
+        image = cv2.cvtColor(view, cv2.COLOR_RGBA2BGR)
+    elif ring.channels == 1:
+        image = cv2.cvtColor(view, cv2.COLOR_GRAY2BGR)
+    else:
+        image = cv2.cvtColor(view, cv2.COLOR_RGB2BGR)
+    if not ring.is_valid(seq):
+        raise RuntimeError(f"Frame {seq} was overwritten while reading")
+    return image
+
+
+def match_template_job(ring_name, seq, region, template_path, threshold=0.8):
+    """Match a template inside a region of frame `seq`"""
+    import cv2
+    start = perf_counter_ns()
+    ring = _attach(ring_name)
+    screenshot_cv = _region_bgr(ring, seq, region)
+    target_image = _load_template(template_path)
+    prepared = perf_counter_ns()
+
+    th, tw = target_image.shape[:2]
+    if th > screenshot_cv.shape[0] or tw > screenshot_cv.shape[1]:
+        return {"found": False, "confidence": 0.0, "location": None, "size": (tw, th),
+                "worker": os.getpid(), "spans": [("preprocess", start, prepared)]}
+
+    result = cv2.matchTemplate(screenshot_cv, target_image, cv2.TM_CCOEFF_NORMED)
+    min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+    matched = perf_counter_ns()
+
+    # Report the match position in logical screen coordinates
+    scale = ring.scale or 1.0
+    location = (region[0] + int(max_loc[0] / scale), region[1] + int(max_loc[1] / scale))
+    return {
+        "found": max_val > threshold,
+        "confidence": float(max_val),
+        "location": location,
+        "size": (int(tw / scale), int(th / scale)),
+        # Timings on the shared monotonic clock, for tracing
+        "worker": os.getpid(),
+        "spans": [("preprocess", start, prepared), ("matchTemplate", prepared, matched)],
+    }
+
+
+def ocr_job(ring_name, seq, region, lang='eng'):
+    """Extract text from a region of frame `seq` with Tesseract"""
+    import pytesseract
+    start = perf_counter_ns()
+    ring = _attach(ring_name)
+    view = ring.region(seq, *region)
+    if view is None or view.size == 0:
+        raise RuntimeError(f"Frame {seq} is no longer available")
+    image = view.copy() if ring.channels != 1 else view[:, :, 0].copy()
+    if not ring.is_valid(seq):
+        raise RuntimeError(f"Frame {seq} was overwritten while reading")
+    prepared = perf_counter_ns()
+    try:
+        text = pytesseract.image_to_string(image, lang=lang)
+    except pytesseract.TesseractNotFoundError as e:
+        raise RuntimeError(str(e)) from None
+    return {"text": text, "worker": os.getpid(),
+            "spans": [("preprocess", start, prepared), ("tesseract", prepared, perf_counter_ns())]}
+
+
+def warm_up_job(ring_name, template_paths, ocr):
+    """Attach to the ring, load templates and start Tesseract once in this worker"""
+    import cv2  # noqa: F401
+    _attach(ring_name)
+    for path in template_paths:
+        _load_template(path)
+    version = None
+    if ocr:
+        import pytesseract
+        try:
+            version = str(pytesseract.get_tesseract_version())
+        except pytesseract.TesseractNotFoundError as e:
+            # pytesseract's exception can't be unpickled in the parent process
+            raise RuntimeError(str(e)) from None
+    return {"pid": os.getpid(), "templates": len(template_paths), "tesseract": version}
+
+
+def default_workers():
+    return max(1, min(2, (os.cpu_count() or 2) - 1))
+
+
+class MonitorPool:
+    """Pool of monitor workers bound to one frame ring
+
+    With workers=0 jobs run inline in the calling thread against the caller's
+    own ring, which keeps the same code path available where spawning
+    processes is not possible.
+    """
+
+    def __init__(self, ring, workers=None):
+        self.ring_name = ring.name
+        self.workers = default_workers() if workers is None else workers
+        self.executor = None
+        self.pids = None
+        if self.workers == 0:
+            _rings[self.ring_name] = ring
+        else:
+            context = get_context("spawn")
+            self.pids = context.SimpleQueue()
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                                initializer=_register_worker, initargs=(self.pids,))
+
+    def submit(self, fn, *args):
+        if self.executor is not None:
+            return self.executor.submit(fn, self.ring_name, *args)
+        future = Future()
+        try:
+            future.set_result(fn(self.ring_name, *args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def match_template(self, seq, region, template_path, threshold=0.8):
+        return self.submit(match_template_job, seq, tuple(region), template_path, threshold)
+
+    def ocr(self, seq, region, lang='eng'):
+        return self.submit(ocr_job, seq, tuple(region), lang)
+
+    def terminate(self):
+        """Shut down and kill workers stuck in a long OCR/matching job (used when a run is stopped)"""
+        if self.executor is not None:
+            self.stop_executor()
+            # ProcessPoolExecutor has no way to interrupt running jobs, so the
+            # workers registered their pids when they started
+            while not self.pids.empty():
+                try:
+                    os.kill(self.pids.get(), signal.SIGTERM)
+                except OSError:
+                    pass  # already exited
+
+    def warm_up(self, template_paths=(), ocr=False):
+        """Start every worker and preload what the run needs, returns one future per worker
+
+        All jobs are submitted before any worker is idle, so the executor spawns
+        a separate process for each of them.
+        """
+        paths = list(template_paths)
+        return [self.submit(warm_up_job, paths, ocr) for _ in range(max(1, self.workers))]
+
+    def stop_executor(self):
+        if sys.version_info >= (3, 9):
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        else:
+            self.executor.shutdown(wait=False)
+        self.executor = None
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.stop_executor()
+        # The ring itself belongs to the capture producer
+        _rings.pop(self.ring_name, None)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Action Recorder
+Listens to global mouse clicks and keystrokes (pynput) and turns them into an
+element list: every left click becomes a Click step, or a Text Input step when
+text was typed before the next click. Pointer motion and keyboard shortcuts are
+not recorded.
+
+Each step keeps the pause that followed it as "delay", which the engine uses
+instead of its fixed step delay and divides by the playback speed. With
+templates enabled, the area around every click is saved from the frame captured
+just before it and checked by a Monitor Image step on playback.
+"""
+
+import os
+import time
+import queue
+import threading
+import cv2
+
+try:
+    from pynput import mouse, keyboard
+except ImportError:
+    mouse = keyboard = None
+
+from frame_buffer import CaptureProducer
+
+STOP_KEY = "f9"
+TEMPLATE_DIR = os.path.join("templates", "recorded")
+# Size of the template saved around a click, and of the area searched on playback
+TEMPLATE_SIZE = (48, 48)
+SEARCH_SIZE = (200, 100)
+
+CLICK_TYPE = "Button (Click)"
+TEXT_TYPE = "Input Box (Text Input)"
+MONITOR_IMAGE_TYPE = "Image Area (Monitor Image)"
+
+# pynput key names that produce text
+SPECIAL_KEYS = {"space": " ", "enter": "\n", "tab": "\t", "backspace": "\b"}
+
+
+def coalesce(events, screen=None):
+    """Turn recorded events into elements
+
+    Events are ("click", time, x, y, template_path) and ("key", time, char, x, y),
+    where char "\\b" deletes the previous character. `screen` (width, height)
+    keeps template search areas on screen.
+    """
+    steps = []
+    current = None
+    for event in events:
+        kind, t = event[0], event[1]
+        if kind == "click":
+            _, _, x, y, template = event
+            if template:
+                left, top = x - SEARCH_SIZE[0] // 2, y - SEARCH_SIZE[1] // 2
+                if screen:
+                    left = min(left, screen[0] - SEARCH_SIZE[0])
+                    top = min(top, screen[1] - SEARCH_SIZE[1])
+                left, top = max(0, left), max(0, top)
+                steps.append(({"type": MONITOR_IMAGE_TYPE, "x": left, "y": top,
+                               "width": SEARCH_SIZE[0], "height": SEARCH_SIZE[1],
+                               "parameter": template}, t, t))
+            current = [{"type": CLICK_TYPE, "x": x, "y": y, "parameter": ""}, t, t]
+            steps.append(current)
+        elif kind == "key":
+            _, _, char, x, y = event
+            if current is None:
+                # Typing into whatever had focus before recording started
+                current = [{"type": TEXT_TYPE, "x": x, "y": y, "parameter": ""}, t, t]
+                steps.append(current)
+            element = current[0]
+            if char == "\b":
+                element["parameter"] = element["parameter"][:-1]
+            else:
+                element["parameter"] += char
+            element["type"] = TEXT_TYPE if element["parameter"] else CLICK_TYPE
+            current[2] = t
+
+    elements = []
+    for i, (element, start, end) in enumerate(steps):
+        if i + 1 < len(steps):
+            # Pause between the end of this step and the start of the next
+            element["delay"] = round(max(0.0, steps[i + 1][1] - end), 2)
+        elements.append(element)
+    return elements
+
+
+class ActionRecorder:
+    """Records clicks and typing until the stop key (F9) is pressed"""
+
+    def __init__(self, templates=False, template_dir=TEMPLATE_DIR, stop_key=STOP_KEY,
+                 on_stopped=None, capture_factory=None):
+        self.templates = templates
+        self.template_dir = template_dir
+        self.stop_key = stop_key
+        self.on_stopped = on_stopped or (lambda: None)
+        # Frames are captured continuously so a click can use the one from just before it
+        self.capture_factory = capture_factory or (lambda: CaptureProducer.for_screen(interval=0.2))
+        self.events = []
+        self.pointer = (0, 0)
+        self.screen = None
+        self.capture = None
+        self.listeners = []
+        self.session = time.strftime("%Y%m%d_%H%M%S")
+        self.saved = queue.Queue()
+        self.writer = None
+        self.stopped = threading.Event()
+
+    def start(self):
+        if mouse is None:
+            raise ImportError("pynput not available. Please install: pip install pynput")
+        self.pointer = tuple(int(v) for v in mouse.Controller().position)
+        if self.templates:
+            os.makedirs(self.template_dir, exist_ok=True)
+            self.capture = self.capture_factory()
+            self.capture.start()
+            self.screen = (self.capture.ring.screen_width, self.capture.ring.screen_height)
+            self.writer = threading.Thread(target=self.write_templates, daemon=True)
+            self.writer.start()
+        self.listeners = [mouse.Listener(on_click=self.on_click),
+                          keyboard.Listener(on_press=self.on_press)]
+        for listener in self.listeners:
+            listener.start()
+        return self
+
+    # ------------------------------------------------------------------
+    # Listener callbacks (pynput threads, keep them short)
+    # ------------------------------------------------------------------
+
+    def on_click(self, x, y, button, pressed):
+        if not pressed or button != mouse.Button.left or self.stopped.is_set():
+            return
+        x, y = int(x), int(y)
+        self.pointer = (x, y)
+        self.events.append(("click", time.monotonic(), x, y, self.snapshot(x, y)))
+
+    def on_press(self, key):
+        name = getattr(key, "name", None)
+        if name == self.stop_key:
+            self.stop()
+            return False
+        char = getattr(key, "char", None) or SPECIAL_KEYS.get(name)
+        # Control characters come from shortcuts like Ctrl+C
+        if char and (char.isprintable() or char in "\n\t\b"):
+            self.events.append(("key", time.monotonic(), char, *self.pointer))
+
+    def snapshot(self, x, y):
+        """Copy the area around a click from the latest frame, returns the template path"""
+        if self.capture is None:
+            return None
+        width, height = TEMPLATE_SIZE
+        ring = self.capture.ring
+        left = min(max(0, x - width // 2), ring.screen_width - width)
+        top = min(max(0, y - height // 2), ring.screen_height - height)
+        patch = ring.copy_region(ring.latest_seq, left, top, width, height)
+        if patch is None:
+            return None
+        index = sum(1 for event in self.events if event[0] == "click") + 1
+        path = os.path.join(self.template_dir, f"{self.session}_{index:03d}.png")
+        # Writing the PNG happens off the listener thread
+        self.saved.put((path, patch))
+        return path
+
+    def write_templates(self):
+        while True:
+            item = self.saved.get()
+            if item is None:
+                return
+            path, patch = item
+            bgr = patch[:, :, 0] if patch.shape[2] == 1 else cv2.cvtColor(patch, cv2.COLOR_RGB2BGR)
+            cv2.imwrite(path, bgr)
+
+    # ------------------------------------------------------------------
+    # Control
+    # ------------------------------------------------------------------
+
+    def stop(self):
+        """Stop listening (also called by the stop key), flush templates, then report"""
+        if self.stopped.is_set():
+            return
+        self.stopped.set()
+        for listener in self.listeners:
+            if listener is not threading.current_thread():
+                listener.stop()
+        if self.writer:
+            self.saved.put(None)
+            self.writer.join(timeout=5)
+        if self.capture:
+            self.capture.stop()
+            self.capture = None
+        self.on_stopped()
+
+    def wait(self, timeout=None):
+        return self.stopped.wait(timeout)
+
+    def elements(self):
+        return coalesce(self.events, self.screen)
@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+"""
+Run History Analyzer
+Reads every run log in logs/automation and reports:
+- per-step latency percentiles (p50/p90/p99) and match confidence
+- failure hotspots, the steps that fail most often and why
+- trends, the change in a step's duration and confidence per run
+- with --compare, the steps that got slower, matched worse or started failing
+  between two runs
+
+Logs are streamed one line at a time into fixed-size histograms and running
+sums, so memory use does not grow with the number of runs. Percentiles come
+from logarithmic buckets and are accurate to about 5%.
+
+Step logs (automation_log_*.jsonl) have timings and confidence; a CSV without
+its JSONL counts successes and failures only. Batch results (--dir logs/batch)
+count every data row as one "row" step of the workflow.
+
+Usage:
+    python3 run_history.py
+    python3 run_history.py --workflow login --top 5
+    python3 run_history.py --compare -2 -1
+    python3 run_history.py --compare automation_log_20240501_091500 automation_log_20240502_091500
+"""
+
+import os
+import re
+import sys
+import csv
+import json
+import math
+import argparse
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime
+
+from run_log import LOG_DIR, BATCH_HEADER
+
+# Bucket edges from 1 ms to about 2 hours, 10% apart
+LATENCY_EDGES = [1.1 ** i for i in range(166)]
+MAX_DETAILS = 20
+UNSAVED = "(unsaved)"
+BATCH_STEP = "row"
+# automation_log_20240501_091500 or, for the second run in that second, ..._091500_2
+LOG_STAMP = re.compile(r"_(\d{8}_\d{6})(?:_(\d+))?$")
+
+
+class StreamingHistogram:
+    """Fixed logarithmic buckets with interpolated percentiles"""
+
+    def __init__(self, edges=LATENCY_EDGES):
+        self.edges = edges
+        self.counts = [0] * (len(edges) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.counts[bisect_left(self.edges, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        """Value below which q (0..1) of the samples fall"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, bucket in enumerate(self.counts):
+            if bucket and seen + bucket >= target:
+                low = self.edges[i - 1] if i > 0 else 0.0
+                high = self.edges[i] if i < len(self.edges) else self.max
+                value = low + (high - low) * (target - seen) / bucket
+                return min(max(value, self.min), self.max)
+            seen += bucket
+        return self.max
+
+
+class Trend:
+    """Online least-squares line through (run number, value) points"""
+
+    def __init__(self):
+        self.n = 0
+        self.sx = self.sy = self.sxx = self.sxy = 0.0
+
+    def add(self, x, y):
+        self.n += 1
+        self.sx += x
+        self.sy += y
+        self.sxx += x * x
+        self.sxy += x * y
+
+    @property
+    def slope(self):
+        """Change per run, None with fewer than two runs"""
+        denominator = self.n * self.sxx - self.sx * self.sx
+        if self.n < 2 or denominator == 0:
+            return None
+        return (self.n * self.sxy - self.sx * self.sy) / denominator
+
+
+class StepStats:
+    """Everything collected about one step of one workflow"""
+
+    def __init__(self, workflow, step, step_type):
+        self.workflow = workflow
+        self.step = step
+        self.type = step_type
+        self.runs = 0
+        self.failures = 0
+        self.latency = StreamingHistogram()
+        self.confidence = StreamingHistogram([i / 100 for i in range(101)])
+        self.latency_trend = Trend()
+        self.confidence_trend = Trend()
+        self.details = Counter()
+
+    def add(self, record, run_number):
+        self.runs += 1
+        if not record["ok"]:
+            self.failures += 1
+            details = record.get("details")
+            # Keep a bounded set of messages, new ones beyond it are dropped
+            if details and (details in self.details or len(self.details) < MAX_DETAILS):
+                self.details[details] += 1
+        duration = record.get("duration_ms")
+        if duration is not None:
+            self.latency.add(duration)
+            self.latency_trend.add(run_number, duration)
+        confidence = record.get("confidence")
+        if confidence is not None:
+            self.confidence.add(confidence)
+            self.confidence_trend.add(run_number, confidence)
+
+    @property
+    def label(self):
+        return f"{self.workflow} #{self.step} {self.type}"
+
+    def to_dict(self):
+        data = {"workflow": self.workflow, "step": self.step, "type": self.type,
+                "runs": self.runs, "failures": self.failures,
+                "failure_rate": self.failures / self.runs if self.runs else 0.0}
+        if self.latency.count:
+            data["latency_ms"] = {"count": self.latency.count, "mean": self.latency.mean,
+                                  "p50": self.latency.percentile(0.5),
+                                  "p90": self.latency.percentile(0.9),
+                                  "p99": self.latency.percentile(0.99),
+                                  "max": self.latency.max,
+                                  "trend_per_run": self.latency_trend.slope}
+        if self.confidence.count:
+            data["confidence"] = {"count": self.confidence.count, "mean": self.confidence.mean,
+                                  "min": self.confidence.min,
+                                  "trend_per_run": self.confidence_trend.slope}
+        if self.details:
+            data["top_failures"] = self.details.most_common(3)
+        return data
+
+
+def parse_time(text):
+    try:
+        return datetime.strptime(text, "%Y-%m-%d %H:%M:%S").timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def run_order(path):
+    """Sort key of a log: the time stamped in its name, else its modification time
+
+    The stamp is when the run started, which copying or touching the file does
+    not change.
+    """
+    match = LOG_STAMP.search(run_name(path))
+    if match:
+        try:
+            started = datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").timestamp()
+            return started, int(match.group(2) or 1), path
+        except ValueError:
+            pass
+    return os.path.getmtime(path), 0, path
+
+
+def log_files(directory=LOG_DIR):
+    """Run logs in the directory, oldest first; a CSV is skipped when its JSONL exists"""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    paths = []
+    for name in names:
+        stem, ext = os.path.splitext(name)
+        if ext == ".jsonl" or (ext == ".csv" and stem + ".jsonl" not in names):
+            paths.append(os.path.join(directory, name))
+    return sorted(paths, key=run_order)
+
+
+def run_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+class RunReader:
+    """Streams the records of one log file
+
+    Iterating yields one record per step (or batch row) with workflow, step,
+    type, ok, time, details and, when the log has them, duration_ms and
+    confidence. Afterwards `status` and `error` hold how the run ended (None
+    when the log doesn't say, e.g. a CSV or a run that is still going) and
+    `skipped` the number of lines that could not be read, such as the last
+    line of a log cut off by a crash.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.status = None
+        self.error = None
+        self.skipped = 0
+
+    def __iter__(self):
+        with open(self.path, encoding="utf-8-sig", newline="") as f:
+            if self.path.endswith(".jsonl"):
+                yield from self.read_jsonl(f)
+            else:
+                yield from self.read_csv(f)
+
+    def read_jsonl(self, f):
+        workflow = UNSAVED
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                self.skipped += 1
+                continue
+            if not isinstance(record, dict):
+                self.skipped += 1
+                continue
+            kind = record.get("record")
+            if kind == "run":
+                workflow = record.get("workflow") or UNSAVED
+            elif kind == "step":
+                yield dict(record, workflow=workflow)
+            elif kind == "end":
+                self.status = record.get("status")
+                self.error = record.get("error")
+            elif "row" in record:
+                # Batch results: one record per data row
+                confidence = record.get("confidence") or None
+                if confidence:
+                    confidence = sum(confidence) / len(confidence)
+                yield {"workflow": record.get("workflow") or UNSAVED, "step": BATCH_STEP,
+                       "type": "batch row", "ok": record.get("ok", False),
+                       "time": record.get("time"), "duration_ms": record.get("duration_ms"),
+                       "confidence": confidence, "details": record.get("details", "")}
+
+    def read_csv(self, f):
+        reader = csv.reader(f)
+        header = next(reader, None)
+        batch = header == BATCH_HEADER
+        for row in reader:
+            if batch and len(row) >= 7:
+                stamp, number, workflow, status, duration, details, result = row[:7]
+                try:
+                    duration = float(duration)
+                except ValueError:
+                    duration = None
+                yield {"workflow": workflow or UNSAVED, "step": BATCH_STEP, "type": "batch row",
+                       "ok": result == "Success", "time": parse_time(stamp),
+                       "duration_ms": duration, "details": details}
+            elif not batch and len(row) >= 6:
+                stamp, number, step_type, status, details, result = row[:6]
+                yield {"workflow": UNSAVED, "step": number, "type": step_type,
+                       "ok": result == "Success", "time": parse_time(stamp), "details": details}
+            elif row:
+                self.skipped += 1
+
+
+def iter_records(path):
+    """Yield one record per step (or batch row) of a log file, streaming it"""
+    return iter(RunReader(path))
+
+
+class HistoryAnalyzer:
+    """Aggregates run logs one record at a time"""
+
+    def __init__(self, workflow=None):
+        self.workflow = workflow
+        self.steps = {}
+        self.runs = []
+        self.skipped = 0
+
+    def add_file(self, path):
+        run_number = len(self.runs) + 1
+        run = {"run": run_name(path), "workflow": None, "started": None,
+               "steps": 0, "failures": 0, "duration_ms": 0.0}
+        reader = RunReader(path)
+        for record in reader:
+            if self.workflow and record["workflow"] != self.workflow:
+                continue
+            key = (record["workflow"], str(record["step"]), record["type"])
+            stats = self.steps.get(key)
+            if stats is None:
+                stats = self.steps[key] = StepStats(*key)
+            stats.add(record, run_number)
+            run["workflow"] = run["workflow"] or record["workflow"]
+            run["started"] = run["started"] or record.get("time")
+            run["steps"] += 1
+            run["failures"] += 0 if record["ok"] else 1
+            run["duration_ms"] += record.get("duration_ms") or 0.0
+        self.skipped += reader.skipped
+        if run["steps"]:
+            run["status"] = reader.status
+            run["error"] = reader.error
+            self.runs.append(run)
+
+    def add_directory(self, directory=LOG_DIR):
+        for path in log_files(directory):
+            self.add_file(path)
+        return self
+
+    def hotspots(self, top=10):
+        failing = [stats for stats in self.steps.values() if stats.failures]
+        failing.sort(key=lambda stats: (stats.failures, stats.failures / stats.runs), reverse=True)
+        return failing[:top]
+
+    def trends(self, top=10):
+        """Steps whose duration grows fastest per run"""
+        rising = [stats for stats in self.steps.values()
+                  if stats.latency_trend.slope is not None and stats.latency_trend.slope > 0]
+        rising.sort(key=lambda stats: stats.latency_trend.slope, reverse=True)
+        return rising[:top]
+
+    def report(self, top=10):
+        return {
+            "runs": self.runs,
+            "steps": [stats.to_dict() for stats in sorted(
+                self.steps.values(), key=lambda stats: (stats.workflow, step_order(stats.step)))],
+            "hotspots": [stats.to_dict() for stats in self.hotspots(top)],
+            "errors": [run for run in self.runs if run["error"]],
+            "trends": [stats.to_dict() for stats in self.trends(top)],
+            "skipped_lines": self.skipped,
+        }
+
+    def summary_lines(self, top=10):
+        failures = sum(run["failures"] for run in self.runs)
+        steps = sum(run["steps"] for run in self.runs)
+        lines = [f"📚 {len(self.runs)} runs, {steps} steps, {failures} failed"]
+        statuses = Counter(run["status"] for run in self.runs if run["status"])
+        if statuses:
+            lines[0] += " (runs: " + ", ".join(f"{count} {status}"
+                                               for status, count in statuses.most_common()) + ")"
+        if self.skipped:
+            lines.append(f"⚠️ {self.skipped} unreadable log lines skipped")
+        if not self.runs:
+            return lines
+        lines.append("")
+        lines.append(f"⏱️ {'Step latency (ms)':<35} runs   p50    p90    p99   conf")
+        for stats in sorted(self.steps.values(), key=lambda stats: (stats.workflow, step_order(stats.step))):
+            latency = stats.latency
+            confidence = f"{stats.confidence.mean:5.2f}" if stats.confidence.count else "    -"
+            if latency.count:
+                timing = (f"{latency.percentile(0.5):6.0f} {latency.percentile(0.9):6.0f} "
+                          f"{latency.percentile(0.99):6.0f}")
+            else:
+                timing = f"{'-':>6} {'-':>6} {'-':>6}"
+            lines.append(f"  {stats.label[:36]:<36} {stats.runs:4d} {timing}  {confidence}")
+        hotspots = self.hotspots(top)
+        if hotspots:
+            lines.append("")
+            lines.append("🔥 Failure hotspots")
+            for stats in hotspots:
+                line = f"  {stats.label}: {stats.failures}/{stats.runs} failed"
+                if stats.details:
+                    line += f" (most often: {stats.details.most_common(1)[0][0]})"
+                lines.append(line)
+        errors = [run for run in self.runs if run["error"]][-top:]
+        if errors:
+            lines.append("")
+            lines.append("💥 Runs ended by an error")
+            for run in errors:
+                lines.append(f"  {run['run']}: step {run['error']['step']}, {run['error']['message']}")
+        trends = self.trends(top)
+        if trends:
+            lines.append("")
+            lines.append("📈 Getting slower")
+            for stats in trends:
+                line = f"  {stats.label}: {stats.latency_trend.slope:+.1f} ms per run"
+                slope = stats.confidence_trend.slope
+                if slope is not None and abs(slope) >= 0.0001:
+                    line += f", confidence {slope:+.4f} per run"
+                lines.append(line)
+        return lines
+
+
+def step_order(step):
+    return (0, int(step), "") if str(step).isdigit() else (1, 0, str(step))
+
+
+def resolve_run(run, directory=LOG_DIR):
+    """Log file for a path, a file name or stem in the directory, or an index like -1 (latest)"""
+    if os.path.exists(run):
+        return run
+    paths = log_files(directory)
+    try:
+        return paths[int(run)]
+    except ValueError:
+        pass
+    except IndexError:
+        raise ValueError(f"there are only {len(paths)} runs in {directory}")
+    for path in paths:
+        if run in (os.path.basename(path), run_name(path)):
+            return path
+    raise ValueError(f"no run log {run} in {directory}")
+
+
+def step_means(records):
+    """Per-step mean duration, mean confidence and failures of one run's records"""
+    steps = {}
+    for record in records:
+        key = (record["workflow"], str(record["step"]), record["type"])
+        entry = steps.setdefault(key, {"count": 0, "failures": 0, "duration": [0.0, 0],
+                                       "confidence": [0.0, 0]})
+        entry["count"] += 1
+        entry["failures"] += 0 if record["ok"] else 1
+        for field, value in (("duration", record.get("duration_ms")), ("confidence", record.get("confidence"))):
+            if value is not None:
+                entry[field][0] += value
+                entry[field][1] += 1
+    for entry in steps.values():
+        for field in ("duration", "confidence"):
+            total, count = entry[field]
+            entry[field] = total / count if count else None
+    return steps
+
+
+def run_outcome(reader):
+    """How a run ended, e.g. "completed" or "error at step 3 (element not found)" """
+    if reader.error:
+        return f"{reader.status} at step {reader.error['step']} ({reader.error['message']})"
+    return reader.status or "unknown"
+
+
+def compare_runs(path_a, path_b, slower=0.2, min_delta_ms=50.0, confidence_drop=0.05):
+    """Steps of run B that regressed against run A
+
+    A step regressed when it is `slower` (a fraction) and at least
+    `min_delta_ms` slower, matched with `confidence_drop` less confidence, or
+    failed in B but not in A. A run B that did not complete while run A did
+    is listed first, with step None.
+    """
+    reader_a, reader_b = RunReader(path_a), RunReader(path_b)
+    before, after = step_means(reader_a), step_means(reader_b)
+    regressions = []
+    if reader_a.status == "completed" and reader_b.status not in (None, "completed"):
+        workflow = next(iter(after), (UNSAVED,))[0]
+        regressions.append({"workflow": workflow, "step": None, "type": "run",
+                            "before": {"status": reader_a.status},
+                            "after": {"status": reader_b.status, "error": reader_b.error},
+                            "reasons": [f"{run_outcome(reader_a)} → {run_outcome(reader_b)}"]})
+    for key in sorted(after, key=lambda key: (key[0], step_order(key[1]))):
+        if key not in before:
+            continue
+        a, b = before[key], after[key]
+        reasons = []
+        if a["duration"] is not None and b["duration"] is not None:
+            delta = b["duration"] - a["duration"]
+            if delta >= min_delta_ms and b["duration"] > a["duration"] * (1 + slower):
+                reasons.append(f"duration {a['duration']:.0f} → {b['duration']:.0f} ms")
+        if a["confidence"] is not None and b["confidence"] is not None:
+            if a["confidence"] - b["confidence"] >= confidence_drop:
+                reasons.append(f"confidence {a['confidence']:.2f} → {b['confidence']:.2f}")
+        if b["failures"] and not a["failures"]:
+            reasons.append("failing")
+        if reasons:
+            regressions.append({"workflow": key[0], "step": key[1], "type": key[2],
+                                "before": a, "after": b, "reasons": reasons})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze the run logs in logs/automation")
+    parser.add_argument("--dir", default=LOG_DIR, help="log directory (default: logs/automation)")
+    parser.add_argument("--workflow", help="only analyze this workflow")
+    parser.add_argument("--top", type=int, default=10, help="number of hotspots and trends to list")
+    parser.add_argument("--compare", nargs=2, metavar=("RUN_A", "RUN_B"),
+                        help="list steps of RUN_B that regressed against RUN_A "
+                             "(log file, its name, or an index such as -1 for the latest run)")
+    parser.add_argument("--slower", type=float, default=0.2,
+                        help="relative slowdown that counts as a regression (default 0.2 = 20%%)")
+    parser.add_argument("--min-delta", type=float, default=50.0, help="ignore slowdowns below this many ms")
+    parser.add_argument("--confidence-drop", type=float, default=0.05,
+                        help="confidence loss that counts as a regression")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        # Exit codes: 0 no regressions, 1 regressions, 2 the runs could not be compared
+        try:
+            path_a, path_b = (resolve_run(run, args.dir) for run in args.compare)
+            regressions = compare_runs(path_a, path_b, args.slower, args.min_delta, args.confidence_drop)
+        except (ValueError, OSError) as e:
+            print(f"❌ {str(e)}")
+            return 2
+        print(f"🔍 {run_name(path_b)} against {run_name(path_a)}: {len(regressions)} regressions")
+        for regression in regressions:
+            if regression["step"] is None:
+                print(f"  ⚠️ {regression['workflow']} run: " + ", ".join(regression["reasons"]))
+            else:
+                print(f"  ⚠️ {regression['workflow']} #{regression['step']} {regression['type']}: "
+                      + ", ".join(regression["reasons"]))
+        report = {"before": path_a, "after": path_b, "regressions": regressions}
+        status = 1 if regressions else 0
+    else:
+        analyzer = HistoryAnalyzer(args.workflow).add_directory(args.dir)
+        print("\n".join(analyzer.summary_lines(args.top)))
+        report = analyzer.report(args.top)
+        status = 0
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Run Logs
+Every run writes its steps to logs/automation:
+- automation_log_<time>.csv   one line per step (time, number, operation type,
+                              status, details, result), readable in Excel
+- automation_log_<time>.jsonl the same steps with duration (without the
+                              pause after the step, kept as delay_ms) and
+                              match confidence, for run_history.py
+"""
+
+import os
+import csv
+import json
+import time
+
+LOG_DIR = os.path.join("logs", "automation")
+# Columns of the automation logs: time, number, operation type, status, details, result
+LOG_HEADER = ["時間", "操作編號", "操作類型", "狀態", "詳細資訊", "結果"]
+
+# Batch results (batch.py), one line per data row: time, data row, workflow,
+# status, duration (ms), details, result
+BATCH_DIR = os.path.join("logs", "batch")
+BATCH_HEADER = ["時間", "資料列", "工作流程", "狀態", "耗時(ms)", "詳細資訊", "結果"]
+
+
+def open_csv_log(path, header=LOG_HEADER):
+    """Open a log CSV for appending, writing the BOM and header if it is new"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    new = not os.path.exists(path) or os.path.getsize(path) == 0
+    f = open(path, "a", encoding="utf-8-sig" if new else "utf-8", newline="")
+    writer = csv.writer(f)
+    if new:
+        writer.writerow(header)
+        f.flush()
+    return f, writer
+
+
+class RunLog:
+    """Step log of one run; attach() it to an engine, then finish() with the run status"""
+
+    def __init__(self, workflow=None, directory=LOG_DIR):
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        base = os.path.join(directory, f"automation_log_{stamp}")
+        # Two runs in the same second (e.g. from the scheduler's threads) get
+        # separate files: the JSONL is created exclusively, so only one of them
+        # can claim a name
+        suffix = 1
+        while True:
+            try:
+                self.jsonl = open(base + ".jsonl", "x", encoding="utf-8")
+                break
+            except FileExistsError:
+                suffix += 1
+                base = os.path.join(directory, f"automation_log_{stamp}_{suffix}")
+        self.csv_path = base + ".csv"
+        self.jsonl_path = base + ".jsonl"
+        self.workflow = workflow
+        self.started = time.time()
+        self.csv_file, self.writer = open_csv_log(self.csv_path)
+        self.confidence = {}
+        self.failures = []
+        self.failed_steps = []
+        self.error = None
+        self.write_json({"record": "run", "workflow": workflow, "started": self.started})
+
+    def attach(self, engine):
+        """Chain the log into the engine's message, observation and step callbacks"""
+        for name, hook in (("on_message", self.message), ("on_observation", self.observe),
+                           ("on_step", self.step)):
+            previous = getattr(engine, name)
+            setattr(engine, name, lambda arg, hook=hook, previous=previous: (hook(arg), previous(arg)))
+        return self
+
+    def write_json(self, record):
+        self.jsonl.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.jsonl.flush()
+
+    def message(self, message):
+        if message.startswith("❌"):
+            self.failures.append(message[1:].strip())
+
+    def observe(self, info):
+        if "confidence" in info:
+            self.confidence[info["index"]] = info["confidence"]
+
+    def step(self, step):
+        now = time.time()
+        ok = step["ok"]
+        if "error" in step:
+            # The step raised and ended the run
+            self.failures.append(step["error"])
+            self.error = {"step": step["index"] + 1, "message": step["error"]}
+        if not ok:
+            self.failed_steps.append(step["index"] + 1)
+        details = "" if ok else "; ".join(self.failures)
+        confidence = self.confidence.pop(step["index"], None)
+        self.failures = []
+        self.writer.writerow([
+            time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)),
+            step["index"] + 1,
+            step["type"],
+            "completed" if ok else "failed",
+            details,
+            "Success" if ok else "Failure",
+        ])
+        self.csv_file.flush()
+        self.write_json({"record": "step", "time": now, "step": step["index"] + 1, "type": step["type"],
+                         "kind": step["kind"], "ok": ok, "duration_ms": round(step["seconds"] * 1000, 2),
+                         "delay_ms": round(step.get("delay", 0.0) * 1000, 2),
+                         "confidence": None if confidence is None else round(confidence, 4),
+                         "details": details})
+
+    def finish(self, status):
+        self.write_json({"record": "end", "status": status, "seconds": time.time() - self.started,
+                         "failed_steps": self.failed_steps, "error": self.error})
+        self.csv_file.close()
+        self.jsonl.close()
@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+Workflow Scheduler
+Keeps a set of saved workflows and runs them on cron-style schedules, fixed
+intervals or when something appears on screen.
+
+Runs go through a single queue because there is only one mouse and keyboard.
+All runs share one EngineResources, so the capture producer, monitor workers
+(with their loaded templates and Tesseract) and the input backend stay warm and
+a scheduled run only costs its steps.
+
+Schedule file (JSON):
+    {"jobs": [
+        {"workflow": "workflows/report.json", "cron": "0 9 * * 1-5"},
+        {"workflow": "workflows/refresh.json", "every": 300},
+        {"workflow": "workflows/dismiss.json",
+         "when": {"image": "targets/dialog.png", "region": [100, 100, 400, 200], "poll": 5}}
+    ]}
+
+Usage:
+    python3 scheduler.py schedule.json [--input-backend xtest] [--metrics-port 9464]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import TimeoutError as JobTimeout
+from datetime import datetime, timedelta
+
+from automation_engine import AutomationEngine, EngineResources
+from input_backend import BACKENDS
+from metrics import ENGINE_METRICS, MetricsServer
+from run_log import RunLog
+from tracing import Tracer, tracer_from_env
+from workflow import load_workflow
+
+# name, lowest and highest value of each cron field
+CRON_FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7))
+
+
+def _parse_cron_field(text, name, low, high):
+    """Values matched by one cron field ("*", "5", "1-5", "*/15", "1,15,30", "9-17/2")"""
+    values = set()
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"cron {name}: step must be at least 1")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(value) for value in part.split("-", 1))
+        else:
+            start = int(part)
+            # "5/10" means every 10 starting at 5
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"cron {name}: '{text}' is outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+    if name == "weekday":
+        # Both 0 and 7 mean Sunday
+        values = {value % 7 for value in values}
+    return values
+
+
+class CronTrigger:
+    """Fires at the minutes matching a 5-field cron expression (local time)
+
+    minute hour day-of-month month day-of-week, e.g. "*/10 9-17 * * 1-5".
+    Like cron, when both day fields are restricted a day matches either of them.
+    """
+
+    kind = "cron"
+
+    def __init__(self, expression, now=None):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression needs 5 fields, got {len(fields)}: '{expression}'")
+        self.expression = expression
+        (self.minutes, self.hours, self.days, self.months, self.weekdays) = (
+            _parse_cron_field(text, name, low, high) for text, (name, low, high) in zip(fields, CRON_FIELDS))
+        # "*", "*/1" and "1-31" all leave the field unrestricted
+        self.any_day = self.days == set(range(1, 32))
+        self.any_weekday = self.weekdays == set(range(7))
+        self.next_run = self.next_after(time.time() if now is None else now)
+
+    def day_matches(self, dt):
+        weekday = (dt.weekday() + 1) % 7  # cron counts from Sunday
+        if self.any_day or self.any_weekday:
+            return dt.day in self.days and weekday in self.weekdays
+        return dt.day in self.days or weekday in self.weekdays
+
+    def next_after(self, timestamp):
+        """First matching minute strictly after `timestamp`"""
+        dt = datetime.fromtimestamp(timestamp).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Every valid expression matches within four years (Feb 29)
+        limit = dt + timedelta(days=4 * 366)
+        while dt < limit:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self.day_matches(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+            elif dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt.timestamp()
+        raise ValueError(f"cron expression never fires: '{self.expression}'")
+
+    def due(self, now):
+        """True once per matching minute (missed minutes collapse into one run)"""
+        if now < self.next_run:
+            return False
+        self.next_run = self.next_after(now)
+        return True
+
+    def describe(self):
+        return f"cron '{self.expression}'"
+
+
+class IntervalTrigger:
+    """Fires every `seconds`, the first time one interval after start"""
+
+    kind = "interval"
+
+    def __init__(self, seconds, now=None):
+        if seconds <= 0:
+            raise ValueError("interval must be positive")
+        self.seconds = seconds
+        self.next_run = (time.time() if now is None else now) + seconds
+
+    def due(self, now):
+        if now < self.next_run:
+            return False
+        # Keep the original phase, skip intervals missed while busy
+        missed = int((now - self.next_run) // self.seconds) + 1
+        self.next_run += missed * self.seconds
+        return True
+
+    def describe(self):
+        return f"every {self.seconds:g}s"
+
+
+class ScreenTrigger:
+    """Fires when a target image or text appears in a screen region
+
+    Checked every `poll` seconds while nothing is running, using the warm
+    capture producer and monitor workers. It fires when the condition becomes
+    true, and again only after it was false in between.
+    """
+
+    kind = "screen"
+    next_run = None
+    # Longest a single check may take, and how often it looks at `cancel` meanwhile
+    CHECK_TIMEOUT = 30.0
+    POLL = 0.05
+
+    def __init__(self, region, image=None, text=None, threshold=0.8, poll=5.0):
+        if bool(image) == bool(text):
+            raise ValueError("screen trigger needs exactly one of 'image' or 'text'")
+        if len(region) != 4:
+            raise ValueError("screen trigger region must be [x, y, width, height]")
+        self.region = tuple(int(value) for value in region)
+        self.image = image
+        self.text = text
+        self.threshold = threshold
+        self.poll = poll
+        self.next_check = 0.0
+        self.present = False
+
+    def due(self, now):
+        # Not time based, see check_due() and evaluate()
+        return False
+
+    def check_due(self, now):
+        if now < self.next_check:
+            return False
+        self.next_check = now + self.poll
+        return True
+
+    def evaluate(self, resources, cancel):
+        """Capture a frame and test the condition, returns True on a rising edge"""
+        capture = resources.ensure_capture()
+        seq = capture.request_frame(cancel=cancel)
+        if seq is None:
+            return False
+        if self.image:
+            result = self.wait(resources.monitor_pool.match_template(seq, self.region, self.image,
+                                                                     self.threshold), cancel)
+            if result is None:
+                return False
+            present = result['found']
+        else:
+            result = self.wait(resources.monitor_pool.ocr(seq, self.region), cancel)
+            if result is None:
+                return False
+            present = self.text.lower() in result['text'].lower()
+        fired = present and not self.present
+        self.present = present
+        return fired
+
+    def wait(self, future, cancel):
+        """Result of a monitor job, None if `cancel` got set while waiting"""
+        deadline = time.monotonic() + self.CHECK_TIMEOUT
+        while True:
+            try:
+                return future.result(timeout=self.POLL)
+            except JobTimeout:
+                if cancel.is_set():
+                    future.cancel()
+                    return None
+                if time.monotonic() > deadline:
+                    future.cancel()
+                    raise RuntimeError(f"no result within {self.CHECK_TIMEOUT:g}s") from None
+
+    def describe(self):
+        target = f"image {self.image}" if self.image else f"text '{self.text}'"
+        return f"when {target} appears in {self.region}"
+
+
+def trigger_from_spec(spec):
+    """Build the trigger of a schedule entry ("cron", "every" or "when")"""
+    if "cron" in spec:
+        return CronTrigger(spec["cron"])
+    if "every" in spec:
+        return IntervalTrigger(float(spec["every"]))
+    if "when" in spec:
+        when = spec["when"]
+        return ScreenTrigger(when.get("region", ()), image=when.get("image"), text=when.get("text"),
+                             threshold=float(when.get("threshold", 0.8)), poll=float(when.get("poll", 5.0)))
+    raise ValueError("schedule entry needs one of 'cron', 'every' or 'when'")
+
+
+class ScheduledJob:
+    """A workflow file and the trigger that runs it"""
+
+    def __init__(self, workflow, trigger, name=None, enabled=True):
+        self.workflow = workflow
+        self.trigger = trigger
+        self.name = name or os.path.splitext(os.path.basename(workflow))[0]
+        self.enabled = enabled
+        self.runs = 0
+        self.last_status = None
+
+
+def load_schedule(path):
+    """Read a schedule file, returns a list of ScheduledJob"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    entries = data["jobs"] if isinstance(data, dict) else data
+    jobs = []
+    for i, entry in enumerate(entries):
+        if "workflow" not in entry:
+            raise ValueError(f"{path}: job {i+1} has no 'workflow'")
+        try:
+            trigger = trigger_from_spec(entry)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"{path}: job {i+1}: {str(e)}") from None
+        jobs.append(ScheduledJob(entry["workflow"], trigger, entry.get("name"), entry.get("enabled", True)))
+    return jobs
+
+
+class Scheduler:
+    """Triggers scheduled workflows and runs them one at a time from a queue"""
+
+    # How often triggers are checked
+    TICK = 1.0
+    # Finished runs remembered for status displays
+    HISTORY = 100
+    # How long stop() waits for the threads to finish
+    STOP_TIMEOUT = 10.0
+
+    def __init__(self, jobs=(), input_backend=None, on_message=None, on_status=None,
+                 on_run_finished=None, step_delay=1.0, resources=None, trace=False):
+        self.jobs = {}
+        for job in jobs:
+            self.add(job)
+        self.on_message = on_message or (lambda message: None)
+        self.on_status = on_status or (lambda status: None)
+        self.on_run_finished = on_run_finished or (lambda job, status, seconds: None)
+        self.step_delay = step_delay
+        self.trace = trace
+        self.resources = resources or EngineResources(input_backend)
+        self.queue = deque()
+        self.cond = threading.Condition()
+        # Held while a run or a screen check uses the shared resources
+        self.busy = threading.Lock()
+        self.current = None
+        self.history = deque(maxlen=self.HISTORY)
+        self.stop_event = threading.Event()
+        self.threads = []
+
+    # ------------------------------------------------------------------
+    # Jobs and queue
+    # ------------------------------------------------------------------
+
+    def add(self, job):
+        if job.name in self.jobs:
+            raise ValueError(f"a job named '{job.name}' is already scheduled")
+        self.jobs[job.name] = job
+
+    def remove(self, name):
+        with self.cond:
+            self.jobs.pop(name, None)
+            self.queue = deque(entry for entry in self.queue if entry[0].name != name)
+
+    def enqueue(self, name, reason="manual"):
+        """Queue a run of a job, returns False if it is already waiting"""
+        job = self.jobs[name]
+        with self.cond:
+            if any(queued.name == name for queued, _ in self.queue):
+                self.on_message(f"⏭️ {name}: already queued, skipping trigger ({reason})")
+                return False
+            self.queue.append((job, reason))
+            self.cond.notify()
+        self.on_message(f"🗓️ {name}: queued ({reason}), {len(self.queue)} waiting")
+        return True
+
+    def queued(self):
+        with self.cond:
+            return [job.name for job, _ in self.queue]
+
+    def idle(self):
+        return self.current is None and not self.queue
+
+    # ------------------------------------------------------------------
+    # Threads
+    # ------------------------------------------------------------------
+
+    def start(self):
+        for target, name in ((self.trigger_loop, "scheduler-triggers"), (self.run_loop, "scheduler-runner")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def trigger_loop(self):
+        while not self.stop_event.wait(self.TICK):
+            now = time.time()
+            for job in list(self.jobs.values()):
+                if not job.enabled:
+                    continue
+                if job.trigger.due(now):
+                    self.enqueue(job.name, job.trigger.describe())
+                elif job.trigger.kind == "screen" and self.idle() and job.trigger.check_due(now):
+                    self.check_screen(job)
+
+    def check_screen(self, job):
+        """Evaluate a screen trigger unless a run grabbed the resources meanwhile"""
+        if not self.busy.acquire(blocking=False):
+            return
+        try:
+            if job.trigger.evaluate(self.resources, self.stop_event):
+                self.enqueue(job.name, job.trigger.describe())
+        except Exception as e:
+            self.on_message(f"⚠️ {job.name}: screen check failed: {str(e)}")
+        finally:
+            self.busy.release()
+
+    def run_loop(self):
+        while True:
+            with self.cond:
+                while not self.queue and not self.stop_event.is_set():
+                    self.cond.wait()
+                if self.stop_event.is_set():
+                    return
+                job, reason = self.queue.popleft()
+            with self.busy:
+                try:
+                    self.run_job(job, reason)
+                except Exception as e:
+                    # A broken run (e.g. a full disk) must not end the runner thread
+                    job.last_status = "error"
+                    self.on_message(f"❌ {job.name}: run failed: {str(e)}")
+
+    def run_job(self, job, reason="manual"):
+        """Run one job to completion on the shared resources, returns its status"""
+        try:
+            name, elements = load_workflow(job.workflow)
+        except (OSError, ValueError) as e:
+            self.on_message(f"❌ {job.name}: could not load {job.workflow}: {str(e)}")
+            job.last_status = "failed"
+            return job.last_status
+
+        self.on_message(f"🚀 {job.name}: starting ({reason})")
+        tracer = Tracer(name) if self.trace else tracer_from_env()
+        engine = AutomationEngine(
+            elements,
+            on_status=self.on_status,
+            on_message=lambda message: self.on_message(f"{job.name}: {message}"),
+            step_delay=self.step_delay,
+            tracer=tracer,
+            resources=self.resources)
+        with self.cond:
+            # stop() reads current under the same lock, so it either sees this
+            # engine or has already set stop_event
+            if self.stop_event.is_set():
+                return "stopped"
+            self.current = engine
+        start = time.perf_counter()
+        status = "error"
+        run_log = None
+        try:
+            run_log = RunLog(name).attach(engine)
+            status = engine.run()
+        finally:
+            self.current = None
+            if run_log:
+                run_log.finish(status)
+        seconds = time.perf_counter() - start
+
+        if tracer.enabled:
+            try:
+                trace_path, summary_path = tracer.save()
+                self.on_message(f"📊 {job.name}: trace saved to {trace_path}")
+            except OSError as e:
+                self.on_message(f"⚠️ {job.name}: could not save the trace: {str(e)}")
+        job.runs += 1
+        job.last_status = status
+        self.history.append({"job": job.name, "status": status, "reason": reason,
+                             "finished": time.time(), "seconds": seconds})
+        self.on_message(f"🏁 {job.name}: {status} in {seconds:.1f}s")
+        self.on_run_finished(job, status, seconds)
+        return status
+
+    def stop(self):
+        """Stop the current run, drop the queue and release the warm resources"""
+        self.stop_event.set()
+        with self.cond:
+            engine = self.current
+            self.queue.clear()
+            self.cond.notify_all()
+        if engine:
+            engine.stop()
+        # Runs and screen checks both give up promptly once stop_event is set; the
+        # resources are only released after nothing can be using them any more
+        deadline = time.monotonic() + self.STOP_TIMEOUT
+        stuck = []
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join(max(0.0, deadline - time.monotonic()))
+                if thread.is_alive():
+                    stuck.append(thread.name)
+        self.threads = []
+        if stuck:
+            self.on_message(f"⚠️ {', '.join(stuck)} still busy after {self.STOP_TIMEOUT:g}s, "
+                            f"leaving the shared resources open")
+            return
+        self.resources.close()
+
+    def describe(self):
+        """One line per job with its trigger and next run"""
+        lines = []
+        for job in self.jobs.values():
+            line = f"{job.name}: {job.trigger.describe()}"
+            if job.trigger.next_run:
+                line += f", next {time.strftime('%Y-%m-%d %H:%M', time.localtime(job.trigger.next_run))}"
+            if not job.enabled:
+                line += " (disabled)"
+            lines.append(line)
+        return lines
+
+
+def log_message(message):
+    timestamp = time.strftime("%H:%M:%S")
+    print(f"[{timestamp}] {message}", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Smart Automation workflows on a schedule")
+    parser.add_argument("schedule", help="schedule JSON file")
+    parser.add_argument("--input-backend", choices=list(BACKENDS), help="input backend for all runs")
+    parser.add_argument("--step-delay", type=float, default=1.0, help="pause after every element (seconds)")
+    parser.add_argument("--trace", action="store_true", help="write a trace of every run to logs/traces")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on localhost:PORT")
+    parser.add_argument("--list", action="store_true", help="print the jobs and their next run, then exit")
+    args = parser.parse_args(argv)
+
+    scheduler = Scheduler(load_schedule(args.schedule), args.input_backend, on_message=log_message,
+                          step_delay=args.step_delay, trace=args.trace)
+    for line in scheduler.describe():
+        log_message(f"🗓️ {line}")
+    if args.list:
+        return 0
+
+    server = None
+    if args.metrics_port is not None:
+        server = MetricsServer(ENGINE_METRICS, port=args.metrics_port).start()
+        log_message(f"📈 Metrics available at {server.url}")
+
+    scheduler.start()
+    log_message("⏰ Scheduler running, press Ctrl+C to quit")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        log_message("⏹️ Stopping scheduler...")
+    finally:
+        scheduler.stop()
+        if server:
+            server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Dry-Run Simulator
+Runs a workflow through the real step engine without touching the desktop:
+- a virtual clock, so every wait (step delays, "wait:" clicks, typing pauses)
+  advances time instantly
+- a scripted fake screen that serves a frame per step through the normal
+  capture ring, so template matching runs on real pixels
+- the recording input backend, so clicks and typed text can be checked
+
+Screen script (JSON, paths relative to the script, steps numbered like the GUI):
+    {"size": [1920, 1080],
+     "background": "shots/desktop.png",
+     "steps": {
+        "3": {"frame": "shots/login.png",
+              "images": [{"image": "targets/ok.png", "x": 500, "y": 300}],
+              "text": "Welcome back"}}}
+
+A step's screen stays until a later step changes it. "text" is what OCR reads
+on that step (Tesseract is not needed); without it OCR runs on the fake frame.
+
+Usage:
+    python3 simulator.py workflows/login.json --script sim/login_screen.json --strict
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import Future
+import numpy as np
+import cv2
+
+from automation_engine import AutomationEngine, EngineResources
+from frame_buffer import CaptureProducer
+from input_backend import RecordingBackend
+from metrics import EngineMetrics
+from monitor_pool import MonitorPool
+from workflow import load_workflow
+
+DEFAULT_SIZE = (1920, 1080)
+BACKGROUND_COLOR = 236
+
+
+class VirtualClock:
+    """Time that only moves when the engine waits"""
+
+    def __init__(self, start=None):
+        self.start = time.time() if start is None else start
+        self.now = self.start
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    @property
+    def elapsed(self):
+        return self.now - self.start
+
+    def advance(self, seconds):
+        self.now += seconds
+
+    def wait(self, event, seconds):
+        if event.is_set():
+            return True
+        self.advance(seconds)
+        return event.is_set()
+
+
+def load_image(path, size=None):
+    """Image file as an RGB array, resized to `size` (width, height) if given"""
+    image = cv2.imread(path)
+    if image is None:
+        raise ValueError(f"could not load image: {path}")
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    if size and (image.shape[1], image.shape[0]) != tuple(size):
+        image = cv2.resize(image, tuple(size))
+    return image
+
+
+class FakeScreen:
+    """Serves scripted frames, switching whenever the engine starts a step"""
+
+    def __init__(self, size=DEFAULT_SIZE, background=None, steps=None, base_dir=""):
+        self.size = tuple(size)
+        self.base_dir = base_dir
+        width, height = self.size
+        if background is None:
+            self.background = np.full((height, width, 3), BACKGROUND_COLOR, dtype=np.uint8)
+        elif isinstance(background, str):
+            self.background = load_image(self.path(background), self.size)
+        else:
+            self.background = background
+        # Keys are 0-based element indexes
+        self.steps = {int(key) - 1: entry for key, entry in (steps or {}).items()}
+        self.frame = self.background
+        self.text = None
+        self.scripted_text = any("text" in entry for entry in self.steps.values())
+        # Load every image up front so a bad path fails before the run
+        self.images = {}
+        for entry in self.steps.values():
+            if "frame" in entry:
+                self.images[entry["frame"]] = load_image(self.path(entry["frame"]), self.size)
+            for overlay in entry.get("images", ()):
+                self.images[overlay["image"]] = load_image(self.path(overlay["image"]))
+
+    @classmethod
+    def from_script(cls, path):
+        with open(path, encoding="utf-8") as f:
+            script = json.load(f)
+        return cls(script.get("size", DEFAULT_SIZE), script.get("background"), script.get("steps"),
+                   base_dir=os.path.dirname(path))
+
+    def path(self, path):
+        return path if os.path.isabs(path) else os.path.join(self.base_dir, path)
+
+    def set_step(self, index):
+        """Show the screen scripted for element `index` (0-based), if any"""
+        self.text = None
+        entry = self.steps.get(index)
+        if entry is None:
+            return
+        frame = self.images[entry["frame"]] if "frame" in entry else self.frame
+        overlays = entry.get("images", ())
+        if overlays:
+            frame = frame.copy()
+            for overlay in overlays:
+                image = self.images[overlay["image"]]
+                x, y = int(overlay["x"]), int(overlay["y"])
+                patch = frame[y:y + image.shape[0], x:x + image.shape[1]]
+                patch[...] = image[:patch.shape[0], :patch.shape[1]]
+        self.frame = frame
+        self.text = entry.get("text")
+
+    def grab(self):
+        return self.frame
+
+
+class ScriptedMonitorPool(MonitorPool):
+    """Inline monitor pool that answers OCR from the screen script when it has text"""
+
+    def __init__(self, ring, screen):
+        super().__init__(ring, workers=0)
+        self.screen = screen
+
+    def warm_up(self, template_paths=(), ocr=False):
+        return super().warm_up(template_paths, ocr and not self.screen.scripted_text)
+
+    def ocr(self, seq, region, lang='eng'):
+        if self.screen.text is None:
+            return super().ocr(seq, region, lang)
+        future = Future()
+        future.set_result({"text": self.screen.text, "worker": "simulated", "spans": []})
+        return future
+
+
+class SimulatedResources(EngineResources):
+    """Fake screen capture, inline scripted monitoring and a recording backend"""
+
+    def __init__(self, screen, clock):
+        super().__init__(RecordingBackend(clock=clock.monotonic),
+                         lambda: CaptureProducer.for_screen(interval=0, grab=screen.grab, size=screen.size))
+        self.screen = screen
+        # The engine's cache is keyed on pixels, but scripted text can differ on the same frame
+        self.ocr_cache = None
+
+    def start_pool(self):
+        self.monitor_pool = ScriptedMonitorPool(self.capture.ring, self.screen)
+
+
+class SimulationMetrics(EngineMetrics):
+    """Per-step records in virtual time"""
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+        self.records = []
+
+    def step_started(self, index, kind):
+        super().step_started(index, kind)
+        self.records.append({"index": index + 1, "kind": kind, "start": self.clock.elapsed})
+
+    def step_finished(self, kind, seconds, ok):
+        super().step_finished(kind, seconds, ok)
+        # The engine times steps on the virtual clock, without the pause after them
+        record = self.records[-1]
+        record["seconds"] = seconds
+        record["ok"] = ok
+
+
+class SimulationResult:
+    """Outcome of a simulated run"""
+
+    def __init__(self, status, steps, messages, backend, virtual_seconds, wall_seconds):
+        self.status = status
+        self.steps = steps
+        self.messages = messages
+        self.events = backend.events
+        self.clicks = backend.clicks()
+        self.typed_text = backend.typed_text()
+        self.virtual_seconds = virtual_seconds
+        self.wall_seconds = wall_seconds
+
+    @property
+    def speedup(self):
+        return self.virtual_seconds / self.wall_seconds if self.wall_seconds else 0.0
+
+    def failed_steps(self):
+        return [step for step in self.steps if not step.get("ok", False)]
+
+    def to_dict(self):
+        return {
+            "status": self.status,
+            "virtual_seconds": self.virtual_seconds,
+            "wall_seconds": self.wall_seconds,
+            "speedup": self.speedup,
+            "steps": self.steps,
+            "clicks": self.clicks,
+            "typed_text": self.typed_text,
+            "messages": self.messages,
+        }
+
+    def summary_lines(self):
+        lines = [f"{self.status}: {len(self.steps)} steps, {len(self.failed_steps())} failed, "
+                 f"{self.virtual_seconds:.1f}s simulated in {self.wall_seconds:.2f}s "
+                 f"({self.speedup:.0f}x)"]
+        for step in self.steps:
+            mark = "✅" if step.get("ok") else "❌"
+            lines.append(f"  {mark} {step['index']}. {step['kind']} at {step['start']:.1f}s "
+                         f"({step.get('seconds', 0.0):.1f}s)")
+        return lines
+
+
+def simulate(elements, screen=None, step_delay=1.0, type_delay=0.5, speed=1.0, tracer=None):
+    """Run elements against a fake screen on a virtual clock, returns a SimulationResult"""
+    clock = VirtualClock()
+    screen = screen or FakeScreen()
+    resources = SimulatedResources(screen, clock)
+    metrics = SimulationMetrics(clock)
+    messages = []
+    engine = AutomationEngine(
+        elements,
+        on_message=messages.append,
+        on_step_started=screen.set_step,
+        screen=screen.size,
+        step_delay=step_delay,
+        type_delay=type_delay,
+        tracer=tracer,
+        metrics=metrics,
+        resources=resources,
+        speed=speed,
+        clock=clock)
+    wall_start = time.perf_counter()
+    try:
+        status = engine.run()
+    finally:
+        backend = resources.input
+        resources.close()
+    return SimulationResult(status, metrics.records, messages, backend,
+                            clock.elapsed, time.perf_counter() - wall_start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dry-run a workflow on a virtual clock and fake screen")
+    parser.add_argument("workflow", help="workflow JSON file")
+    parser.add_argument("--script", help="screen script JSON (default: blank screen)")
+    parser.add_argument("--step-delay", type=float, default=1.0, help="pause after every element (seconds)")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed factor")
+    parser.add_argument("--json", help="write the result to this file")
+    parser.add_argument("--strict", action="store_true", help="exit with status 1 if any step failed")
+    parser.add_argument("--verbose", action="store_true", help="print the execution log")
+    args = parser.parse_args(argv)
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    name, elements = load_workflow(args.workflow)
+    screen = FakeScreen.from_script(args.script) if args.script else FakeScreen()
+    result = simulate(elements, screen, step_delay=args.step_delay, speed=args.speed)
+
+    if args.verbose:
+        for message in result.messages:
+            print(message)
+    print(f"🧪 {name}: " + "\n".join(result.summary_lines()))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result.to_dict(), f, indent=2, ensure_ascii=False)
+    if result.status != "completed" or (args.strict and result.failed_steps()):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
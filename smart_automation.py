@@ -11,12 +11,22 @@ import time
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QLabel, QListWidget, 
                              QListWidgetItem, QDialog, QComboBox, QLineEdit,
-                             QMessageBox, QFrame, QTextEdit, QSpinBox)
-from PySide6.QtCore import Qt, QTimer, QThread, Signal
+                             QMessageBox, QFrame, QTextEdit, QSpinBox, QCheckBox, QFileDialog,
+                             QDoubleSpinBox)
+from PySide6.QtCore import Qt, QTimer, QThread, QObject, Signal
 from PySide6.QtGui import QPixmap, QPainter, QPen, QColor
 import pyautogui
 import cv2
 import numpy as np
+from automation_engine import AutomationEngine
+from tracing import Tracer
+from metrics import MetricsServer
+from control_api import ControlServer, EventHub, observation_event, step_event, DEFAULT_PORT as API_PORT
+from live_preview import RegionPreview
+from input_backend import available_backends, DEFAULT_BACKEND
+from run_log import RunLog
+from workflow import WORKFLOW_DIR, save_workflow, load_workflow
+from recorder import ActionRecorder, STOP_KEY
 
 class ElementSelector(QDialog):
     """Element Selector - Let users select elements on screen"""
@@ -239,149 +249,102 @@ class AutomationThread(QThread):
     """Automation execution thread"""
     status_updated = Signal(str)
     element_processed = Signal(str)
+    capture_started = Signal(str)
+    region_observed = Signal(object)
+    stopped = Signal(float)
+    step_finished = Signal(object)
     
-    def __init__(self, elements):
+    def __init__(self, elements, input_backend=None, trace=False, speed=1.0, name=None):
         super().__init__()
         self.elements = elements
-        self.running = True
+        self.result = None
+        self.engine = AutomationEngine(
+            elements, input_backend,
+            tracer=Tracer() if trace else None,
+            speed=speed,
+            on_status=self.status_updated.emit,
+            on_message=self.element_processed.emit,
+            on_capture=self.capture_started.emit,
+            on_observation=self.region_observed.emit,
+            on_stopped=self.stopped.emit,
+            on_step=self.step_finished.emit)
+        # Step log in logs/automation for run_history.py
+        self.run_log = RunLog(name).attach(self.engine)
         
     def run(self):
         """Execute automation"""
-        try:
-            for i, element in enumerate(self.elements):
-                if not self.running:
-                    break
-                    
-                self.status_updated.emit(f"Executing element {i+1}: {element['type']}")
-                
-                # Execute operations based on element type
-                if "Click" in element['type']:
-                    # Check if it's custom area click with parameters
-                    if "Custom Area" in element['type'] and element['parameter']:
-                        try:
-                            # Parse custom parameters (e.g., "100,200" for x,y or "wait:2" for delay)
-                            params = element['parameter'].split(',')
-                            if len(params) >= 2:
-                                # Custom coordinates
-                                x = int(params[0].strip())
-                                y = int(params[1].strip())
-                                pyautogui.click(x, y)
-                                self.element_processed.emit(f"Custom click at ({x}, {y})")
-                            else:
-                                # Regular click with potential delay
-                                if "wait:" in element['parameter']:
-                                    wait_time = float(element['parameter'].split(':')[1])
-                                    time.sleep(wait_time)
-                                pyautogui.click(element['x'], element['y'])
-                                self.element_processed.emit(f"Custom area click at ({element['x']}, {element['y']})")
-                        except:
-                            # Fallback to regular click
-                            pyautogui.click(element['x'], element['y'])
-                            self.element_processed.emit(f"Clicked position ({element['x']}, {element['y']})")
-                    else:
-                        # Regular button click
-                        pyautogui.click(element['x'], element['y'])
-                        self.element_processed.emit(f"Clicked position ({element['x']}, {element['y']})")
-                    
-                elif "Text Input" in element['type']:
-                    pyautogui.click(element['x'], element['y'])
-                    time.sleep(0.5)
-                    pyautogui.write(element['parameter'])
-                    self.element_processed.emit(f"Input text: {element['parameter']}")
-                    
-                elif "Monitor Text" in element['type']:
-                    # Text monitoring implementation
-                    try:
-                        import pytesseract
-                        from PIL import Image
-                        
-                        # Use area dimensions if available, otherwise use default area
-                        if 'width' in element and 'height' in element:
-                            x, y, width, height = element['x'], element['y'], element['width'], element['height']
-                            self.element_processed.emit(f"📸 Monitoring text area: ({x}, {y}) {width}x{height}")
-                        else:
-                            # Fallback to default area around point
-                            x, y = element['x'], element['y']
-                            width, height = 200, 100
-                            x = x - 100
-                            y = y - 50
-                            self.element_processed.emit(f"📸 Monitoring text area (default): ({x}, {y}) {width}x{height}")
-                        
-                        # Take screenshot of the area
-                        screenshot = pyautogui.screenshot(region=(x, y, width, height))
-                        
-                        # Extract text using OCR
-                        text = pytesseract.image_to_string(screenshot, lang='eng')
-                        text = text.strip()
-                        
-                        target_text = element['parameter']
-                        if target_text.lower() in text.lower():
-                            self.element_processed.emit(f"✅ Target text '{target_text}' found in area")
-                        else:
-                            self.element_processed.emit(f"❌ Target text '{target_text}' not found. Found: '{text[:50]}...'")
-                            
-                    except ImportError:
-                        self.element_processed.emit(f"⚠️ OCR not available. Please install: pip install pytesseract")
-                    except Exception as e:
-                        self.element_processed.emit(f"❌ Text monitoring failed: {str(e)}")
-                    
-                elif "Monitor Image" in element['type']:
-                    # Image monitoring implementation
-                    try:
-                        import cv2
-                        import numpy as np
-                        
-                        # Use area dimensions if available, otherwise use default area
-                        if 'width' in element and 'height' in element:
-                            x, y, width, height = element['x'], element['y'], element['width'], element['height']
-                            self.element_processed.emit(f"📸 Monitoring image area: ({x}, {y}) {width}x{height}")
-                        else:
-                            # Fallback to default area around point
-                            x, y = element['x'], element['y']
-                            width, height = 200, 100
-                            x = x - 100
-                            y = y - 50
-                            self.element_processed.emit(f"📸 Monitoring image area (default): ({x}, {y}) {width}x{height}")
-                        
-                        # Take screenshot of the area
-                        screenshot = pyautogui.screenshot(region=(x, y, width, height))
-                        screenshot_np = np.array(screenshot)
-                        screenshot_cv = cv2.cvtColor(screenshot_np, cv2.COLOR_RGB2BGR)
-                        
-                        # If target image is provided
-                        if element['parameter'] and os.path.exists(element['parameter']):
-                            target_image = cv2.imread(element['parameter'])
-                            if target_image is not None:
-                                # Template matching
-                                result = cv2.matchTemplate(screenshot_cv, target_image, cv2.TM_CCOEFF_NORMED)
-                                min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-                                
-                                if max_val > 0.8:  # Threshold for matching
-                                    self.element_processed.emit(f"✅ Target image found with confidence: {max_val:.2f}")
-                                else:
-                                    self.element_processed.emit(f"❌ Target image not found. Best match: {max_val:.2f}")
-                            else:
-                                self.element_processed.emit(f"❌ Could not load target image: {element['parameter']}")
-                        else:
-                            # Just monitor area for changes
-                            self.element_processed.emit(f"📸 Monitoring image area at ({x}, {y}) {width}x{height}")
-                            
-                    except ImportError:
-                        self.element_processed.emit(f"⚠️ OpenCV not available. Please install: pip install opencv-python")
-                    except Exception as e:
-                        self.element_processed.emit(f"❌ Image monitoring failed: {str(e)}")
-                    
-                # Wait a bit
-                time.sleep(1)
-                
-            self.status_updated.emit("Automation completed!")
+        self.result = self.engine.run()
+        self.run_log.finish(self.result)
+        
+        # Export spans of this run (enabled from the GUI or $SMART_AUTOMATION_TRACE)
+        if self.engine.tracer.enabled:
+            try:
+                trace_path, summary_path = self.engine.tracer.save()
+                self.element_processed.emit(f"📊 Trace saved: {trace_path} (summary: {summary_path})")
+            except OSError as e:
+                self.element_processed.emit(f"❌ Could not save trace: {str(e)}")
             
+    def stop(self):
+        """Request a stop (returns immediately, acknowledged via the stopped signal)"""
+        self.engine.stop()
+
+class RecorderBridge(QObject):
+    """Delivers the recorder's stop (from a pynput thread) to the GUI thread"""
+    finished = Signal()
+
+class GuiInvoker(QObject):
+    """Runs calls from other threads (control API) on the GUI thread and waits for the result"""
+    invoke = Signal(object)
+    
+    def __init__(self):
+        super().__init__()
+        self.invoke.connect(self._run, Qt.BlockingQueuedConnection)
+        
+    def _run(self, call):
+        try:
+            call["result"] = call["fn"](*call["args"])
         except Exception as e:
-            self.status_updated.emit(f"Execution error: {str(e)}")
+            call["error"] = e
             
+    def call(self, fn, *args):
+        # A blocking queued call from the GUI thread itself would wait for itself forever
+        if QThread.currentThread() == self.thread():
+            return fn(*args)
+        call = {"fn": fn, "args": args}
+        self.invoke.emit(call)
+        if "error" in call:
+            raise call["error"]
+        return call.get("result")
+
+class GuiController:
+    """Control API adapter for the main window (same interface as control_api.EngineController)"""
+    
+    def __init__(self, window):
+        self.window = window
+        self.events = window.events
+        self.invoker = GuiInvoker()
+        
+    @property
+    def name(self):
+        return self.invoker.call(lambda: self.window.workflow_name)
+        
+    @property
+    def elements(self):
+        # Copied on the GUI thread, the list may change while the response is encoded
+        return self.invoker.call(lambda: [dict(element) for element in self.window.elements])
+        
+    def load(self, name, elements):
+        self.invoker.call(self.window.api_load, name, elements)
+        
+    def start(self, speed=1.0, workflow=None):
+        # Loading and starting happen in one GUI call, so nothing can get in between
+        return self.invoker.call(self.window.api_start, speed, workflow)
+        
     def stop(self):
-        """Stop execution"""
-        self.running = False
+        return self.invoker.call(self.window.api_stop)
+        
+    def status(self):
+        return self.invoker.call(self.window.api_status)
 
 class SmartAutomation(QMainWindow):
     """Smart Automation Assistant main interface"""
@@ -392,8 +355,47 @@ class SmartAutomation(QMainWindow):
         self.setMinimumSize(600, 500)
         self.elements = []
         self.automation_thread = None
+        # Set while closing waits for a stuck run to finish
+        self.close_pending = False
+        self.recorder = None
+        self.recorder_bridge = RecorderBridge()
+        self.recorder_bridge.finished.connect(self.recording_finished)
+        self.metrics_server = None
+        self.control_server = None
+        # Run events for the control API
+        self.events = EventHub()
+        self.workflow_name = None
+        self.run_id = 0
+        self.run_started_at = None
+        self.last_result = None
         self.initUI()
+        self.start_metrics_server()
+        self.start_control_api()
         
+    def start_metrics_server(self):
+        """Serve run metrics on localhost if $SMART_AUTOMATION_METRICS_PORT is set"""
+        port = os.environ.get("SMART_AUTOMATION_METRICS_PORT")
+        if not port:
+            return
+        try:
+            self.metrics_server = MetricsServer(port=int(port)).start()
+            self.log_message(f"📈 Metrics available at {self.metrics_server.url}")
+        except (OSError, ValueError) as e:
+            self.log_message(f"⚠️ Could not start metrics endpoint on port {port}: {str(e)}")
+        
+    def start_control_api(self):
+        """Serve the control API on localhost if $SMART_AUTOMATION_API_PORT is set"""
+        port = os.environ.get("SMART_AUTOMATION_API_PORT")
+        if not port:
+            return
+        try:
+            self.control_server = ControlServer(GuiController(self), int(port) or API_PORT).start()
+            self.log_message(f"🔌 Control API available at {self.control_server.url}")
+            if self.control_server.token_file:
+                self.log_message(f"🔑 API token written to {self.control_server.token_file}")
+        except (OSError, ValueError) as e:
+            self.log_message(f"⚠️ Could not start control API on port {port}: {str(e)}")
+            
     def initUI(self):
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -493,11 +495,76 @@ class SmartAutomation(QMainWindow):
             }
         """)
         
+        self.record_btn = QPushButton("⏺️ Record")
+        self.record_btn.clicked.connect(self.start_recording)
+        self.record_btn.setToolTip(f"Record clicks and typing as elements, press {STOP_KEY.upper()} to stop")
+        self.record_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #8e44ad;
+                color: white;
+                border: none;
+                padding: 12px 20px;
+                border-radius: 8px;
+                font-size: 14px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #7d3c98;
+            }
+            QPushButton:disabled {
+                background-color: #bdc3c7;
+            }
+        """)
+        
         button_layout.addWidget(self.add_btn)
+        button_layout.addWidget(self.record_btn)
         button_layout.addWidget(self.start_btn)
         button_layout.addWidget(self.stop_btn)
         main_layout.addLayout(button_layout)
         
+        # Input backend used for the next run
+        backend_layout = QHBoxLayout()
+        backend_label = QLabel("Input backend:")
+        backend_label.setStyleSheet("font-weight: bold; padding: 5px;")
+        backend_layout.addWidget(backend_label)
+        
+        self.backend_combo = QComboBox()
+        self.backend_combo.addItems([name for name in available_backends() if name != "recording"])
+        if self.backend_combo.findText(DEFAULT_BACKEND) >= 0:
+            self.backend_combo.setCurrentText(DEFAULT_BACKEND)
+        self.backend_combo.setToolTip("xtest sends events straight to the X server (Linux, needs python-xlib)")
+        backend_layout.addWidget(self.backend_combo)
+        
+        self.trace_check = QCheckBox("📊 Trace run")
+        self.trace_check.setToolTip("Record per-step timing spans to logs/traces (Chrome trace format + JSON summary)")
+        backend_layout.addWidget(self.trace_check)
+        
+        speed_label = QLabel("Speed:")
+        backend_layout.addWidget(speed_label)
+        self.speed_spin = QDoubleSpinBox()
+        self.speed_spin.setRange(0.25, 20.0)
+        self.speed_spin.setSingleStep(0.5)
+        self.speed_spin.setValue(1.0)
+        self.speed_spin.setSuffix("x")
+        self.speed_spin.setToolTip("Playback speed, divides every pause (including recorded timing)")
+        backend_layout.addWidget(self.speed_spin)
+        
+        self.template_check = QCheckBox("📸 Record templates")
+        self.template_check.setToolTip("Save the area around every recorded click and check it on playback")
+        backend_layout.addWidget(self.template_check)
+        backend_layout.addStretch()
+        
+        # Workflow files (also used by headless.py and scheduler.py)
+        self.save_btn = QPushButton("💾 Save Workflow")
+        self.save_btn.clicked.connect(self.save_workflow)
+        self.save_btn.setEnabled(False)
+        backend_layout.addWidget(self.save_btn)
+        
+        self.load_btn = QPushButton("📂 Load Workflow")
+        self.load_btn.clicked.connect(self.load_workflow)
+        backend_layout.addWidget(self.load_btn)
+        main_layout.addLayout(backend_layout)
+        
         # Element list
         list_label = QLabel("📋 Automation Elements List:")
         list_label.setStyleSheet("font-weight: bold; font-size: 14px; padding: 10px;")
@@ -514,6 +581,14 @@ class SmartAutomation(QMainWindow):
         """)
         main_layout.addWidget(self.element_list)
         
+        # Live preview of monitored regions
+        preview_label = QLabel("👁️ Live Preview:")
+        preview_label.setStyleSheet("font-weight: bold; font-size: 14px; padding: 10px;")
+        main_layout.addWidget(preview_label)
+        
+        self.region_preview = RegionPreview(self)
+        main_layout.addWidget(self.region_preview)
+        
         # Log display
         log_label = QLabel("📝 Execution Log:")
         log_label.setStyleSheet("font-weight: bold; font-size: 14px; padding: 10px;")
@@ -552,6 +627,7 @@ class SmartAutomation(QMainWindow):
                 # If there are elements, enable start button
                 if len(self.elements) > 0:
                     self.start_btn.setEnabled(True)
+                    self.save_btn.setEnabled(True)
                     
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Failed to add element: {str(e)}")
@@ -573,10 +649,121 @@ class SmartAutomation(QMainWindow):
             # Add parameter information
             if element['parameter']:
                 item_text += f" - Param: {element['parameter']}"
+            
+            # Recorded pause before the next element
+            if 'delay' in element:
+                item_text += f" - Wait: {element['delay']:g}s"
                 
             item = QListWidgetItem(item_text)
             self.element_list.addItem(item)
             
+    def save_workflow(self):
+        """Save the element list to a workflow file"""
+        os.makedirs(WORKFLOW_DIR, exist_ok=True)
+        path, _ = QFileDialog.getSaveFileName(self, "Save Workflow", WORKFLOW_DIR, "Workflow (*.json)")
+        if not path:
+            return
+        if not path.endswith(".json"):
+            path += ".json"
+        try:
+            save_workflow(path, self.elements, compact=True)
+            self.log_message(f"💾 Workflow saved: {path} ({len(self.elements)} elements)")
+        except OSError as e:
+            QMessageBox.warning(self, "Error", f"Failed to save workflow: {str(e)}")
+            
+    def load_workflow(self):
+        """Replace the element list with a saved workflow"""
+        path, _ = QFileDialog.getOpenFileName(self, "Load Workflow", WORKFLOW_DIR, "Workflow (*.json)")
+        if not path:
+            return
+        try:
+            name, elements = load_workflow(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Error", f"Failed to load workflow: {str(e)}")
+            return
+        self.set_workflow(name, elements)
+        
+    def set_workflow(self, name, elements):
+        """Replace the element list"""
+        self.workflow_name = name
+        self.elements = elements
+        self.update_element_list()
+        self.start_btn.setEnabled(bool(self.elements))
+        self.save_btn.setEnabled(bool(self.elements))
+        self.log_message(f"📂 Workflow '{name}' loaded with {len(self.elements)} elements")
+        self.events.publish("workflow_loaded", name=name, elements=len(elements))
+        
+    def is_running(self):
+        return bool(self.automation_thread and self.automation_thread.isRunning())
+        
+    # Control API (called on the GUI thread through GuiController); errors go
+    # back to the API client as exceptions, never as dialogs
+    
+    def api_load(self, name, elements):
+        if self.is_running() or self.recorder:
+            raise RuntimeError("a run or recording is in progress")
+        self.set_workflow(name, elements)
+        
+    def api_start(self, speed, workflow=None):
+        if self.is_running() or self.recorder:
+            raise RuntimeError("a run or recording is in progress")
+        if workflow is not None:
+            self.set_workflow(*workflow)
+        if not self.elements:
+            raise ValueError("no workflow loaded")
+        # The run gets the requested speed, the GUI keeps its own setting
+        self.launch_automation(speed)
+        return self.run_id
+        
+    def api_stop(self):
+        if not self.is_running():
+            return False
+        self.stop_automation()
+        return True
+        
+    def api_status(self):
+        return {
+            "state": "running" if self.is_running() else "idle",
+            "workflow": self.workflow_name,
+            "elements": len(self.elements),
+            "run": self.run_id,
+            "status": self.status_label.text(),
+            "last_result": self.last_result,
+        }
+        
+    def start_recording(self):
+        """Record clicks and typing into new elements until the stop key is pressed"""
+        QMessageBox.information(self, "Record Actions",
+            "The window will minimize and every left click and typed text is recorded.\n\n"
+            f"Press {STOP_KEY.upper()} to stop recording.\n\n"
+            "💡 Tip: Keyboard shortcuts and mouse movement are not recorded")
+        try:
+            self.recorder = ActionRecorder(templates=self.template_check.isChecked(),
+                                           on_stopped=self.recorder_bridge.finished.emit)
+            self.recorder.start()
+        except Exception as e:
+            self.recorder = None
+            QMessageBox.warning(self, "Error", f"Failed to start recording: {str(e)}")
+            return
+        self.record_btn.setEnabled(False)
+        self.start_btn.setEnabled(False)
+        self.update_status(f"Recording... press {STOP_KEY.upper()} to stop")
+        self.showMinimized()
+        
+    def recording_finished(self):
+        """Append the recorded steps to the element list"""
+        recorded = self.recorder.elements() if self.recorder else []
+        self.recorder = None
+        self.showNormal()
+        self.activateWindow()
+        self.elements.extend(recorded)
+        self.update_element_list()
+        self.record_btn.setEnabled(True)
+        self.start_btn.setEnabled(bool(self.elements))
+        self.save_btn.setEnabled(bool(self.elements))
+        self.update_status("Ready")
+        self.log_message(f"⏺️ Recorded {len(recorded)} elements")
+        
     def start_automation(self):
         """Start automation"""
         if not self.elements:
@@ -584,39 +771,78 @@ class SmartAutomation(QMainWindow):
             return
             
         try:
-            self.automation_thread = AutomationThread(self.elements)
-            self.automation_thread.status_updated.connect(self.update_status)
-            self.automation_thread.element_processed.connect(self.log_message)
-            self.automation_thread.finished.connect(self.automation_finished)
-            
-            self.automation_thread.start()
-            
-            self.start_btn.setEnabled(False)
-            self.stop_btn.setEnabled(True)
-            self.add_btn.setEnabled(False)
-            
-            self.log_message("🚀 Starting automation...")
-            
+            self.launch_automation()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to start automation: {str(e)}")
             
+    def launch_automation(self, speed=None):
+        """Start the automation thread for the current elements (raises instead of showing dialogs)"""
+        self.automation_thread = AutomationThread(self.elements, self.backend_combo.currentText(),
+                                                  trace=self.trace_check.isChecked(),
+                                                  speed=self.speed_spin.value() if speed is None else speed,
+                                                  name=self.workflow_name)
+        self.automation_thread.status_updated.connect(self.update_status)
+        self.automation_thread.element_processed.connect(self.log_message)
+        self.automation_thread.capture_started.connect(self.region_preview.attach)
+        self.automation_thread.region_observed.connect(self.region_preview.observe)
+        self.automation_thread.stopped.connect(self.automation_stopped)
+        self.automation_thread.finished.connect(self.automation_finished)
+        
+        # Stream the run to control API clients
+        self.run_id += 1
+        run_id, events = self.run_id, self.events
+        self.automation_thread.status_updated.connect(
+            lambda status: events.publish("status", run=run_id, status=status))
+        self.automation_thread.element_processed.connect(
+            lambda message: events.publish("message", run=run_id, message=message))
+        self.automation_thread.region_observed.connect(
+            lambda info: events.publish("observation", run=run_id, **observation_event(info)))
+        self.automation_thread.step_finished.connect(
+            lambda step: events.publish("step", run=run_id, **step_event(step)))
+        self.automation_thread.stopped.connect(
+            lambda ms: events.publish("stopped", run=run_id, latency_ms=ms))
+        self.run_started_at = time.perf_counter()
+        events.publish("run_started", run=run_id, workflow=self.workflow_name,
+                       elements=len(self.elements))
+        
+        self.region_preview.clear()
+        
+        self.automation_thread.start()
+        
+        self.start_btn.setEnabled(False)
+        self.stop_btn.setEnabled(True)
+        self.add_btn.setEnabled(False)
+        self.record_btn.setEnabled(False)
+        self.load_btn.setEnabled(False)
+        self.backend_combo.setEnabled(False)
+        
+        self.log_message("🚀 Starting automation...")
+            
     def stop_automation(self):
-        """Stop automation"""
-        if self.automation_thread:
+        """Stop automation (the thread acknowledges asynchronously)"""
+        if self.automation_thread and self.automation_thread.isRunning():
             self.automation_thread.stop()
-            self.automation_thread.wait()
-            
-        self.start_btn.setEnabled(True)
-        self.stop_btn.setEnabled(False)
-        self.add_btn.setEnabled(True)
+            self.stop_btn.setEnabled(False)
+            self.update_status("Stopping...")
         
-        self.log_message("⏹️ Automation stopped")
+    def automation_stopped(self, latency_ms):
+        """Stop acknowledged by the automation thread"""
+        self.log_message(f"⏹️ Automation stopped ({latency_ms:.0f} ms)")
         
     def automation_finished(self):
         """Automation completed"""
+        thread = self.automation_thread
+        self.last_result = {"run": self.run_id, "workflow": self.workflow_name, "status": thread.result,
+                            "failed_steps": [i + 1 for i in thread.engine.failed_steps],
+                            "seconds": time.perf_counter() - self.run_started_at}
+        self.events.publish("run_finished", **self.last_result)
+        self.region_preview.detach()
         self.start_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
         self.add_btn.setEnabled(True)
+        self.record_btn.setEnabled(True)
+        self.load_btn.setEnabled(True)
+        self.backend_combo.setEnabled(True)
         
     def update_status(self, status):
         """Update status"""
@@ -631,7 +857,22 @@ class SmartAutomation(QMainWindow):
         """Close event"""
         if self.automation_thread and self.automation_thread.isRunning():
             self.automation_thread.stop()
-            self.automation_thread.wait()
+            if not self.automation_thread.wait(2000):
+                # A step is stuck in a screenshot or OCR call. Destroying a running
+                # QThread aborts the process, so close again once it has finished.
+                if not self.close_pending:
+                    self.close_pending = True
+                    self.automation_thread.finished.connect(self.close)
+                    self.status_label.setText("Closing after the current step finishes...")
+                event.ignore()
+                return
+        if self.recorder:
+            self.recorder.on_stopped = lambda: None
+            self.recorder.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        if self.control_server:
+            self.control_server.stop()
         super().closeEvent(event)
 
 def main():
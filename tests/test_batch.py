@@ -0,0 +1,51 @@
+import pytest
+
+from batch import BatchRunner, bind, iter_rows, placeholders
+
+ELEMENTS = [
+    {"type": "Input Field (Text Input)", "x": 1, "y": 1, "parameter": "{email}"},
+    {"type": "Input Field (Text Input)", "x": 1, "y": 2, "parameter": "{{not a column}} { name }"},
+    {"type": "Button (Click)", "x": 1, "y": 3, "parameter": ""},
+]
+
+
+def test_placeholders_skip_escaped_braces():
+    assert placeholders(ELEMENTS) == {"email", "name"}
+
+
+def test_bind_fills_in_the_row():
+    bound = bind(ELEMENTS, {"email": "a@example.com", "name": None})
+
+    assert [element["parameter"] for element in bound] == ["a@example.com", "{not a column} ", ""]
+    # The workflow itself is left alone
+    assert ELEMENTS[0]["parameter"] == "{email}"
+
+
+def test_bind_reports_a_missing_column():
+    with pytest.raises(KeyError):
+        bind(ELEMENTS, {"email": "a@example.com"})
+
+
+def test_csv_rows_are_numbered_from_the_first_data_row(tmp_path):
+    path = tmp_path / "users.csv"
+    path.write_text("email,name\na@example.com,A\nb@example.com,B\nc@example.com,C\n", encoding="utf-8")
+
+    rows = list(iter_rows(str(path), start=2))
+
+    assert [(number, row["email"]) for number, row in rows] == [(2, "b@example.com"), (3, "c@example.com")]
+
+
+def test_jsonl_rows_skip_blank_lines_and_reject_non_objects(tmp_path):
+    path = tmp_path / "users.jsonl"
+    path.write_text('{"email": "a@example.com"}\n\n{"email": "b@example.com"}\n[1, 2]\n', encoding="utf-8")
+    rows = iter_rows(str(path))
+
+    assert next(rows) == (1, {"email": "a@example.com"})
+    assert next(rows) == (2, {"email": "b@example.com"})
+    with pytest.raises(ValueError, match="row 3"):
+        next(rows)
+
+
+def test_speed_must_be_positive(tmp_path):
+    with pytest.raises(ValueError, match="speed"):
+        BatchRunner(ELEMENTS, str(tmp_path / "rows.csv"), log=None, speed=0, resources=object())
@@ -0,0 +1,138 @@
+import http.client
+import json
+import os
+import stat
+
+import pytest
+
+from control_api import ControlServer, EventHub
+
+TOKEN = "test-token"
+CLICK = {"type": "Button (Click)", "x": 1, "y": 1, "parameter": ""}
+
+
+class FakeController:
+    """The controller interface the handler uses, recording what it was asked to do"""
+
+    def __init__(self):
+        self.events = EventHub()
+        self.name = None
+        self.elements = []
+        self.started = []
+
+    def load(self, name, elements):
+        self.name, self.elements = name, elements
+
+    def start(self, speed=1.0, workflow=None):
+        self.started.append((speed, workflow))
+        return len(self.started)
+
+    def stop(self):
+        return False
+
+    def status(self):
+        return {"state": "idle", "workflow": self.name, "elements": len(self.elements)}
+
+
+@pytest.fixture
+def api():
+    controller = FakeController()
+    server = ControlServer(controller, port=0, token=TOKEN).start()
+
+    def request(method, path, body=None, headers=None, token=TOKEN, content_type="application/json"):
+        all_headers = {}
+        if token:
+            all_headers["Authorization"] = f"Bearer {token}"
+        if body is not None:
+            all_headers["Content-Type"] = content_type
+            if not isinstance(body, str):
+                body = json.dumps(body)
+        all_headers.update(headers or {})
+        connection = http.client.HTTPConnection("127.0.0.1", server.port, timeout=10)
+        try:
+            connection.request(method, path, body=body, headers=all_headers)
+            response = connection.getresponse()
+            data = response.read()
+            return response.status, json.loads(data) if data else None
+        finally:
+            connection.close()
+
+    request.controller = controller
+    request.port = server.port
+    yield request
+    server.stop()
+
+
+def test_requests_need_the_token(api):
+    assert api("GET", "/status", token=None)[0] == 401
+    assert api("GET", "/status", token="wrong")[0] == 401
+    assert api("GET", "/status")[0] == 200
+    assert api("GET", f"/status?token={TOKEN}", token=None)[0] == 200
+
+
+def test_foreign_origins_and_hosts_are_refused(api):
+    assert api("GET", "/status", headers={"Origin": "http://evil.example"})[0] == 403
+    assert api("POST", "/runs", {}, headers={"Origin": "http://evil.example"}, token=None)[0] == 403
+    assert api("GET", "/status", headers={"Host": "evil.example"})[0] == 403
+    assert api("GET", "/status", headers={"Origin": f"http://127.0.0.1:{api.port}"})[0] == 200
+    assert api.controller.started == []
+
+
+def test_posts_must_be_json(api):
+    status, body = api("POST", "/runs", json.dumps({"elements": [CLICK]}), content_type="text/plain")
+
+    assert status == 415
+    assert "application/json" in body["error"]
+    assert api.controller.started == []
+
+
+def test_a_run_loads_and_starts_in_one_call(api):
+    status, body = api("POST", "/runs", {"name": "quick", "elements": [CLICK], "speed": 2})
+
+    assert (status, body) == (202, {"run": 1})
+    assert api.controller.started == [(2.0, ("quick", [CLICK]))]
+
+
+@pytest.mark.parametrize("body", [
+    {"speed": None}, {"speed": [2]}, {"speed": "fast"}, {"speed": 0}, {"speed": -1}, {"speed": True},
+    '{"speed": NaN}', '{"speed": Infinity}', {"elements": "click"}, {"elements": [CLICK, 5]}, "[1]", "{",
+])
+def test_bad_run_requests_get_400(api, body):
+    status, response = api("POST", "/runs", body)
+
+    assert status == 400
+    assert response["error"]
+    assert api.controller.started == []
+
+
+@pytest.mark.parametrize("query", ["since=abc", "timeout=abc", "timeout=nan", "since=1.5"])
+def test_bad_event_queries_get_400(api, query):
+    assert api("GET", f"/events?{query}")[0] == 400
+
+
+def test_bad_websocket_cursor_gets_400(api):
+    headers = {"Upgrade": "websocket", "Connection": "Upgrade",
+               "Sec-WebSocket-Key": "dGhlIHNhbXBsZSBub25jZQ==", "Sec-WebSocket-Version": "13"}
+
+    assert api("GET", "/events?since=abc", headers=headers)[0] == 400
+
+
+def test_event_long_poll(api):
+    api.controller.events.publish("status", status="Ready")
+
+    status, body = api("GET", "/events?since=0&timeout=-5")
+
+    assert status == 200
+    assert [event["type"] for event in body["events"]] == ["status"]
+    assert body["next"] == 1
+
+
+@pytest.mark.skipif(os.name != "posix", reason="file modes are POSIX")
+def test_generated_token_is_private(tmp_path):
+    path = tmp_path / "api" / "api_token"
+    server = ControlServer(FakeController(), port=0, token_file=str(path))
+    try:
+        assert path.read_text(encoding="utf-8").strip() == server.token
+        assert stat.S_IMODE(path.stat().st_mode) == 0o600
+    finally:
+        server.httpd.server_close()
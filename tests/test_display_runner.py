@@ -0,0 +1,103 @@
+import os
+import time
+
+import pytest
+
+from display_runner import DisplayRunner, VirtualDisplay
+
+
+def fake_worker(display_name, screen, input_backend, step_delay, jobs, events, stop):
+    """Stands in for display_worker: the workflow name says what the run does
+
+    "ok" completes, "fail" fails, "crash" dies mid-run without reporting back.
+    """
+    events.put((display_name, "ready", None, os.getpid()))
+    while not stop.is_set():
+        item = jobs.get()
+        if item is None:
+            break
+        run_id, path = item
+        events.put((display_name, "started", run_id, path))
+        if path == "crash":
+            # Make sure "started" got out, then die like a segfault would
+            events.close()
+            events.join_thread()
+            os._exit(3)
+        time.sleep(0.05)
+        events.put((display_name, "message", run_id, "working"))
+        events.put((display_name, "finished", run_id,
+                    {"workflow": path, "status": "completed" if path == "ok" else "failed", "seconds": 0.05}))
+    events.put((display_name, "exited", None, None))
+
+
+@pytest.fixture
+def make_runner():
+    runners = []
+
+    def make(count):
+        messages = []
+        runner = DisplayRunner([VirtualDisplay.attach(f":{90 + i}") for i in range(count)],
+                               on_message=messages.append, worker=fake_worker)
+        runner.LIVENESS_INTERVAL = 0.1
+        runner.messages = messages
+        runners.append(runner)
+        return runner.start()
+
+    yield make
+    for runner in runners:
+        runner.stop(graceful=False)
+
+
+def test_runs_are_spread_over_the_displays_and_counted(make_runner):
+    runner = make_runner(2)
+    run_ids = [runner.submit(path) for path in ("ok", "ok", "fail", "ok", "ok")]
+
+    assert runner.wait(timeout=30)
+    summary = runner.summary()
+
+    assert run_ids == [1, 2, 3, 4, 5]
+    assert sorted(result["run_id"] for result in runner.results) == run_ids
+    assert (summary["runs"], summary["completed"], summary["failed"], summary["queued"]) == (5, 4, 1, 0)
+    assert sum(status["runs"] for status in summary["displays"].values()) == 5
+    assert all(status["state"] == "idle" and status["workflow"] is None
+               for status in summary["displays"].values())
+    assert any("working" in message for message in runner.messages)
+
+
+def test_graceful_stop_lets_the_workers_exit(make_runner):
+    runner = make_runner(2)
+    runner.submit("ok")
+    assert runner.wait(timeout=30)
+
+    runner.stop()
+
+    assert not runner.collector.is_alive()
+    assert {status["state"] for status in runner.summary()["displays"].values()} == {"exited"}
+
+
+def test_a_crashed_worker_fails_its_run_and_the_rest_continue(make_runner):
+    runner = make_runner(2)
+    runner.submit("crash")
+    runner.submit("ok")
+    runner.submit("ok")
+
+    assert runner.wait(timeout=30)
+    summary = runner.summary()
+
+    crashed = next(result for result in runner.results if result["workflow"] == "crash")
+    assert crashed["status"] == "failed"
+    assert crashed["error"] == "worker exited with code 3"
+    assert summary["displays"][crashed["display"]]["state"] == "crashed"
+    assert (summary["completed"], summary["failed"], summary["queued"]) == (2, 1, 0)
+    assert any("💥" in message for message in runner.messages)
+
+
+def test_wait_returns_when_every_worker_died(make_runner):
+    runner = make_runner(1)
+    runner.submit("crash")
+    runner.submit("ok")
+
+    assert not runner.wait(timeout=30)
+    # The run that never started is still queued
+    assert runner.summary()["queued"] == 1
+    assert not runner.collector.is_alive()
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from frame_buffer import FrameRing, crop_region
+
+
+@pytest.fixture
+def ring():
+    # 2 slots of 4x6 pixels for a 3x2 logical screen, i.e. HiDPI with scale 2
+    ring = FrameRing.create(4, 6, slots=2, screen_width=3, screen_height=2)
+    yield ring
+    ring.close()
+
+
+def frame(value):
+    return np.full((4, 6, 3), value, dtype=np.uint8)
+
+
+def test_crop_region_clamps_to_the_frame():
+    image = np.arange(5 * 8).reshape(5, 8)
+
+    assert crop_region(image, (6, 3, 10, 10)).shape == (2, 2)
+    assert crop_region(image, (-2, -2, 4, 4)).tolist() == image[0:2, 0:2].tolist()
+    assert crop_region(image, (20, 20, 5, 5)).size == 0
+
+
+def test_crop_region_scales_logical_coordinates():
+    image = np.zeros((10, 10))
+
+    assert crop_region(image, (1, 1, 2, 3), scale=2.0).shape == (6, 4)
+
+
+def test_write_then_get(ring):
+    assert ring.read_latest() == (-1, None)
+
+    seq = ring.write(frame(7), timestamp=12.5)
+
+    assert seq == 0
+    assert ring.latest_seq == 0
+    assert (ring.get(seq) == 7).all()
+    assert ring.timestamp(seq) == 12.5
+
+
+def test_recycled_slots_invalidate_old_frames(ring):
+    first = ring.write(frame(1))
+    view = ring.get(first)
+    ring.write(frame(2))
+    assert ring.is_valid(first)
+
+    ring.write(frame(3))
+
+    # The slot of the first frame now holds the third one
+    assert not ring.is_valid(first)
+    assert ring.get(first) is None
+    assert ring.copy_region(first, 0, 0, 1, 1) is None
+    assert (view == 3).all()
+
+
+def test_regions_use_logical_coordinates(ring):
+    image = frame(0)
+    image[2:4, 4:6] = 9
+    seq = ring.write(image)
+
+    assert ring.scale == 2.0
+    region = ring.copy_region(seq, 2, 1, 1, 1)
+    assert region.shape == (2, 2, 3)
+    assert (region == 9).all()
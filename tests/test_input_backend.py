@@ -0,0 +1,101 @@
+import pytest
+
+pytest.importorskip("Xlib")
+from Xlib import X, XK
+import Xlib.display
+import Xlib.ext.xtest
+
+from input_backend import RecordingBackend, XTestBackend
+
+SHIFT_L = XK.string_to_keysym("Shift_L")
+RETURN = XK.string_to_keysym("Return")
+
+
+class FakeInfo:
+    min_keycode = 10
+    max_keycode = 14
+
+
+class FakeDisplay:
+    """Keycodes 10-14: a/A, b/B, Shift_L, Return, and 1/! (as on a US layout)"""
+
+    def __init__(self, name=None):
+        self.display = self
+        self.info = FakeInfo()
+        self.root = None
+        self.syncs = 0
+        self.closed = False
+
+    def has_extension(self, name):
+        return name == "XTEST"
+
+    def screen(self):
+        return self
+
+    def get_keyboard_mapping(self, first, count):
+        return [[ord("a"), ord("A")], [ord("b"), ord("B")], [SHIFT_L, 0], [RETURN, 0], [ord("1"), ord("!")]]
+
+    def sync(self):
+        self.syncs += 1
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    sent = []
+    monkeypatch.setattr(Xlib.display, "Display", FakeDisplay)
+    monkeypatch.setattr(Xlib.ext.xtest, "fake_input",
+                        lambda display, event_type, detail, **kwargs: sent.append((event_type, detail, kwargs)))
+    backend = XTestBackend(":99")
+    backend.sent = sent
+    return backend
+
+
+def test_keymap_maps_keysyms_to_keycodes_and_shift(backend):
+    assert backend._keycodes[ord("a")] == (10, False)
+    assert backend._keycodes[ord("B")] == (11, True)
+    assert backend.shift_keycode == 12
+
+
+def test_shifted_characters_wrap_the_key_in_shift(backend):
+    backend.type_text("aB\n")
+
+    assert backend.sent == [
+        (X.KeyPress, 10, {}), (X.KeyRelease, 10, {}),
+        (X.KeyPress, 12, {}), (X.KeyPress, 11, {}), (X.KeyRelease, 11, {}), (X.KeyRelease, 12, {}),
+        (X.KeyPress, 13, {}), (X.KeyRelease, 13, {}),
+    ]
+    # The whole text is one round trip
+    assert backend.display.syncs == 1
+    assert backend.stats()["calls"] == 1
+
+
+def test_click_moves_then_presses(backend):
+    backend.click(40, 50, button=3)
+
+    assert backend.sent == [(X.MotionNotify, 0, {"x": 40, "y": 50}),
+                            (X.ButtonPress, 3, {}), (X.ButtonRelease, 3, {})]
+
+
+def test_missing_characters_are_reported_before_typing(backend):
+    assert backend.missing_characters("ab!1") == []
+    assert backend.missing_characters("abc é€") == [" ", "c", "é", "€"]
+
+
+def test_untypeable_text_sends_nothing(backend):
+    with pytest.raises(ValueError, match="'c'"):
+        backend.type_text("abc")
+
+    # No key is left pressed
+    assert backend.sent == []
+
+
+def test_recording_backend_reconstructs_clicks_and_text():
+    recorder = RecordingBackend(clock=lambda: 0.0)
+    recorder.click(3, 4)
+    recorder.type_text("hi")
+
+    assert recorder.clicks() == [(3, 4)]
+    assert recorder.typed_text() == "hi"
@@ -0,0 +1,108 @@
+import json
+import threading
+import urllib.request
+
+import pytest
+
+from metrics import PREFIX, EngineMetrics, MetricsServer
+
+
+@pytest.fixture
+def metrics():
+    metrics = EngineMetrics()
+    metrics.run_started()
+    metrics.step_started(0, "click")
+    metrics.step_finished("click", 0.02, True)
+    metrics.step_finished("image", 0.3, False)
+    metrics.step_finished("image", 40.0, True)
+    metrics.match_confidence(0.92)
+    metrics.ocr_lookup(True)
+    metrics.ocr_lookup(False)
+    metrics.ocr_lookup(True)
+    return metrics
+
+
+def samples(text):
+    """{metric{labels}: value} of the non-comment lines"""
+    result = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            result[name] = value
+    return result
+
+
+def test_every_metric_has_help_and_type(metrics):
+    text = metrics.prometheus()
+    lines = text.splitlines()
+
+    assert text.endswith("\n")
+    for collector in metrics.collectors:
+        help_index = lines.index(f"# HELP {collector.name} {collector.help}")
+        assert lines[help_index + 1] == f"# TYPE {collector.name} {collector.kind}"
+
+
+def test_counters_and_gauges(metrics):
+    values = samples(metrics.prometheus())
+
+    assert values[f'{PREFIX}_steps_total{{type="image"}}'] == "2"
+    assert values[f'{PREFIX}_step_failures_total{{type="image"}}'] == "1"
+    assert values[f"{PREFIX}_run_active"] == "1"
+    assert values[f"{PREFIX}_current_step"] == "1"
+    assert values[f'{PREFIX}_current_step_info{{type="click"}}'] == "1"
+    assert values[f"{PREFIX}_ocr_cache_hit_ratio"] == repr(2 / 3)
+
+    metrics.run_finished("completed")
+    values = samples(metrics.prometheus())
+    assert values[f"{PREFIX}_run_active"] == "0"
+    assert values[f'{PREFIX}_runs_total{{status="completed"}}'] == "1"
+    assert not any(name.startswith(f"{PREFIX}_current_step_info") for name in values)
+
+
+def test_histogram_buckets_are_cumulative(metrics):
+    values = samples(metrics.prometheus())
+    name = f"{PREFIX}_step_duration_seconds"
+
+    assert values[f'{name}_bucket{{type="image",le="0.25"}}'] == "0"
+    assert values[f'{name}_bucket{{type="image",le="0.5"}}'] == "1"
+    assert values[f'{name}_bucket{{type="image",le="30"}}'] == "1"
+    assert values[f'{name}_bucket{{type="image",le="+Inf"}}'] == "2"
+    assert values[f'{name}_count{{type="image"}}'] == "2"
+    assert float(values[f'{name}_sum{{type="image"}}']) == pytest.approx(40.3)
+
+
+def test_label_values_are_escaped():
+    metrics = EngineMetrics()
+    metrics.runs.inc('say "hi"\\\n')
+
+    assert f'{PREFIX}_runs_total{{status="say \\"hi\\"\\\\\\n"}} 1' in metrics.prometheus()
+
+
+def test_concurrent_updates_are_not_lost():
+    metrics = EngineMetrics()
+
+    def work():
+        for _ in range(2000):
+            metrics.step_finished("click", 0.01, False)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert metrics.steps.get("click") == 8000
+    assert metrics.failures.total() == 8000
+    assert metrics.snapshot()["step_duration_seconds"]["click"]["count"] == 8000
+
+
+def test_server_serves_text_and_json(metrics):
+    server = MetricsServer(metrics, port=0).start()
+    try:
+        with urllib.request.urlopen(server.url, timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert response.read().decode("utf-8") == metrics.prometheus()
+        with urllib.request.urlopen(server.url + ".json", timeout=5) as response:
+            assert json.load(response)["steps_total"] == {"click": 1, "image": 2}
+    finally:
+        server.stop()
@@ -0,0 +1,92 @@
+import json
+import os
+
+import pytest
+
+from run_history import (HistoryAnalyzer, StreamingHistogram, Trend, compare_runs, iter_records,
+                         log_files, main)
+
+
+def write_run(path, steps, status="completed", error=None, tail=""):
+    records = [{"record": "run", "workflow": "login", "started": 0}]
+    for number, (duration, confidence, ok) in enumerate(steps, 1):
+        records.append({"record": "step", "step": number, "type": "Image (Monitor Image)", "kind": "image",
+                        "ok": ok, "duration_ms": duration, "confidence": confidence,
+                        "details": "" if ok else "not found"})
+    records.append({"record": "end", "status": status, "error": error})
+    path.write_text("".join(json.dumps(record) + "\n" for record in records) + tail, encoding="utf-8")
+    return str(path)
+
+
+def test_histogram_percentiles_are_within_the_bucket_error():
+    histogram = StreamingHistogram()
+    for value in range(1, 1001):
+        histogram.add(value)
+
+    assert histogram.mean == pytest.approx(500.5)
+    for q in (0.5, 0.9, 0.99):
+        assert histogram.percentile(q) == pytest.approx(q * 1000, rel=0.05)
+    assert histogram.percentile(1.0) == 1000
+
+
+def test_histogram_of_one_value():
+    histogram = StreamingHistogram()
+    histogram.add(42)
+
+    assert histogram.percentile(0.5) == 42
+    assert StreamingHistogram().percentile(0.5) == 0.0
+
+
+def test_trend_slope():
+    trend = Trend()
+    trend.add(1, 3)
+    assert trend.slope is None
+
+    for x in range(2, 6):
+        trend.add(x, 2 * x + 1)
+
+    assert trend.slope == pytest.approx(2.0)
+
+
+def test_truncated_lines_are_skipped_and_counted(tmp_path):
+    path = write_run(tmp_path / "automation_log_20240501_091500.jsonl", [(100, 0.9, True)],
+                     tail='{"record": "step", "ste')
+
+    assert len(list(iter_records(str(path)))) == 1
+    analyzer = HistoryAnalyzer().add_directory(str(tmp_path))
+    assert analyzer.skipped == 1
+    assert analyzer.runs[0]["status"] == "completed"
+
+
+def test_runs_are_ordered_by_their_stamp_not_mtime(tmp_path):
+    older = write_run(tmp_path / "automation_log_20240501_091500_2.jsonl", [])
+    newer = write_run(tmp_path / "automation_log_20240502_080000.jsonl", [])
+    oldest = write_run(tmp_path / "automation_log_20240501_091500.jsonl", [])
+    os.utime(older, (0, 0))
+
+    assert log_files(str(tmp_path)) == [oldest, older, newer]
+
+
+def test_compare_flags_slower_worse_and_failing_steps(tmp_path):
+    before = write_run(tmp_path / "a.jsonl", [(100, 0.95, True), (100, 0.95, True), (100, 0.95, True)])
+    after = write_run(tmp_path / "b.jsonl", [(110, 0.94, True), (300, 0.80, True), (100, 0.95, False)],
+                      status="failed")
+
+    regressions = compare_runs(before, after)
+
+    assert [(r["step"], r["reasons"]) for r in regressions] == [
+        (None, ["completed → failed"]),
+        ("2", ["duration 100 → 300 ms", "confidence 0.95 → 0.80"]),
+        ("3", ["failing"]),
+    ]
+
+
+def test_compare_exit_codes(tmp_path, capsys):
+    a = write_run(tmp_path / "automation_log_20240501_091500.jsonl", [(100, 0.9, True)])
+    b = write_run(tmp_path / "automation_log_20240501_091600.jsonl", [(100, 0.9, True)])
+    write_run(tmp_path / "automation_log_20240501_091700.jsonl", [(100, 0.9, False)])
+
+    assert main(["--dir", str(tmp_path), "--compare", a, b]) == 0
+    assert main(["--dir", str(tmp_path), "--compare", "-2", "-1"]) == 1
+    assert main(["--dir", str(tmp_path), "--compare", "-9", "-1"]) == 2
+    assert "only 3 runs" in capsys.readouterr().out
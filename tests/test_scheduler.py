@@ -0,0 +1,162 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+import scheduler as scheduler_module
+from run_log import RunLog
+from scheduler import CronTrigger, IntervalTrigger, ScheduledJob, Scheduler
+from workflow import save_workflow
+
+
+def at(*args):
+    return datetime(*args).timestamp()
+
+
+def next_run(expression, *start):
+    trigger = CronTrigger(expression, now=at(*start))
+    return datetime.fromtimestamp(trigger.next_run)
+
+
+def test_next_matching_minute_rolls_over_to_the_next_day():
+    assert next_run("*/15 9 * * *", 2024, 5, 1, 9, 50) == datetime(2024, 5, 2, 9, 0)
+    assert next_run("*/15 9 * * *", 2024, 5, 1, 9, 14, 59) == datetime(2024, 5, 1, 9, 15)
+
+
+def test_restricted_day_fields_match_either_one():
+    # 2024-05-01 is a Wednesday: the 1st or a Friday
+    assert next_run("0 12 1 * 5", 2024, 4, 30, 13, 0) == datetime(2024, 5, 1, 12, 0)
+    assert next_run("0 12 1 * 5", 2024, 5, 1, 12, 0) == datetime(2024, 5, 3, 12, 0)
+
+
+@pytest.mark.parametrize("days", ["*", "*/1", "1-31"])
+def test_unrestricted_day_of_month_leaves_only_the_weekday(days):
+    trigger = CronTrigger(f"0 12 {days} * 5", now=at(2024, 5, 1))
+
+    assert trigger.any_day
+    assert datetime.fromtimestamp(trigger.next_run) == datetime(2024, 5, 3, 12, 0)
+
+
+def test_weekday_seven_is_sunday():
+    assert CronTrigger("0 0 * * 7").weekdays == {0}
+    assert CronTrigger("0 0 * * 0-7").any_weekday
+
+
+def test_leap_day_is_found():
+    assert next_run("0 0 29 2 *", 2025, 3, 1) == datetime(2028, 2, 29, 0, 0)
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "61 * * * *", "* 5-2 * * *", "*/0 * * * *", "0 0 31 2 *"])
+def test_invalid_expressions_are_rejected(expression):
+    with pytest.raises(ValueError):
+        CronTrigger(expression)
+
+
+def test_due_fires_once_per_minute():
+    trigger = CronTrigger("* * * * *", now=at(2024, 5, 1, 9, 0, 30))
+
+    assert not trigger.due(at(2024, 5, 1, 9, 0, 59))
+    assert trigger.due(at(2024, 5, 1, 9, 1, 0))
+    assert not trigger.due(at(2024, 5, 1, 9, 1, 30))
+
+
+def test_interval_skips_missed_runs_and_keeps_its_phase():
+    trigger = IntervalTrigger(10, now=100)
+
+    assert trigger.due(135)
+    assert trigger.next_run == 140
+
+
+class FakeResources:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeEngine:
+    """Stands in for AutomationEngine, run() blocks until `release` is set or it is stopped"""
+
+    release = None
+    started = []
+
+    def __init__(self, elements, **kwargs):
+        self.stopped = threading.Event()
+        self.on_message = kwargs.get("on_message")
+        self.on_status = self.on_observation = self.on_step = lambda arg: None
+
+    def run(self):
+        FakeEngine.started.append(self)
+        if FakeEngine.release is not None:
+            while not (FakeEngine.release.is_set() or self.stopped.is_set()):
+                time.sleep(0.01)
+        return "stopped" if self.stopped.is_set() else "completed"
+
+    def stop(self):
+        self.stopped.set()
+
+
+@pytest.fixture
+def scheduler(tmp_path, monkeypatch):
+    monkeypatch.setattr(scheduler_module, "AutomationEngine", FakeEngine)
+    monkeypatch.setattr(scheduler_module, "RunLog",
+                        lambda name: RunLog(name, str(tmp_path / "logs")))
+    FakeEngine.started = []
+    FakeEngine.release = None
+    path = tmp_path / "flow.json"
+    save_workflow(str(path), [{"type": "Button (Click)", "x": 1, "y": 1, "parameter": ""}])
+    messages = []
+    jobs = [ScheduledJob(str(path), IntervalTrigger(3600), name=name) for name in ("first", "second")]
+    scheduler = Scheduler(jobs, on_message=messages.append, resources=FakeResources())
+    scheduler.messages = messages
+    yield scheduler
+    if scheduler.threads:
+        scheduler.stop()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_a_failing_run_does_not_end_the_runner(scheduler, monkeypatch):
+    def broken_log(name):
+        raise OSError("No space left on device")
+
+    run_log = scheduler_module.RunLog
+    monkeypatch.setattr(scheduler_module, "RunLog", broken_log)
+    scheduler.start()
+    scheduler.enqueue("first")
+    wait_for(lambda: scheduler.jobs["first"].last_status == "error")
+    monkeypatch.setattr(scheduler_module, "RunLog", run_log)
+
+    scheduler.enqueue("second")
+
+    wait_for(lambda: scheduler.jobs["second"].runs == 1)
+    assert scheduler.jobs["second"].last_status == "completed"
+    assert any("No space left on device" in message for message in scheduler.messages)
+    assert scheduler.current is None
+
+
+def test_a_job_popped_while_stopping_does_not_run(scheduler):
+    scheduler.stop_event.set()
+
+    assert scheduler.run_job(scheduler.jobs["first"]) == "stopped"
+    assert FakeEngine.started == []
+
+
+def test_stop_interrupts_the_current_run(scheduler):
+    FakeEngine.release = threading.Event()
+    scheduler.start()
+    scheduler.enqueue("first")
+    scheduler.enqueue("second")
+    wait_for(lambda: scheduler.current is not None)
+
+    scheduler.stop()
+
+    assert scheduler.resources.closed
+    assert scheduler.jobs["first"].last_status == "stopped"
+    assert scheduler.jobs["second"].runs == 0
@@ -0,0 +1,55 @@
+import pytest
+
+from simulator import FakeScreen, main as simulator_main, simulate
+from workflow import save_workflow
+
+MONITOR_TEXT = "Text Area (Monitor Text)"
+
+
+def monitor_text(target):
+    return {"type": MONITOR_TEXT, "x": 10, "y": 10, "width": 100, "height": 40, "parameter": target}
+
+
+def test_scripted_text_changes_on_an_unchanged_frame():
+    # Both steps see the same blank frame, only the scripted OCR text differs
+    screen = FakeScreen((320, 200), steps={"1": {"text": "Loading"}, "2": {"text": "Welcome back"}})
+    result = simulate([monitor_text("Loading"), monitor_text("Welcome")], screen, step_delay=0.5)
+
+    assert result.status == "completed"
+    assert result.failed_steps() == []
+
+
+def test_missing_scripted_text_fails_the_step():
+    screen = FakeScreen((320, 200), steps={"1": {"text": "Loading"}, "2": {"text": "Error"}})
+    result = simulate([monitor_text("Loading"), monitor_text("Welcome")], screen, step_delay=0.5)
+
+    assert [step["index"] for step in result.failed_steps()] == [2]
+
+
+def test_waits_advance_the_virtual_clock_only():
+    click = {"type": "Button (Click)", "x": 5, "y": 5, "parameter": "", "delay": 120}
+    result = simulate([click, dict(click, x=6)], FakeScreen((320, 200)))
+
+    assert result.virtual_seconds >= 240
+    assert result.wall_seconds < 30
+    assert result.clicks == [(5, 5), (6, 5)]
+
+
+def test_step_durations_leave_out_the_pause_after_them():
+    click = {"type": "Button (Click)", "x": 5, "y": 5, "parameter": "", "delay": 120}
+    result = simulate([click, dict(click, x=6)], FakeScreen((320, 200)), type_delay=0)
+
+    first, second = result.steps
+    assert first["seconds"] < 1
+    assert second["start"] - first["start"] >= 120
+
+
+def test_speed_must_be_positive(tmp_path):
+    click = {"type": "Button (Click)", "x": 5, "y": 5, "parameter": ""}
+    path = tmp_path / "flow.json"
+    save_workflow(str(path), [click])
+
+    with pytest.raises(ValueError, match="speed"):
+        simulate([click], FakeScreen((320, 200)), speed=0)
+    with pytest.raises(SystemExit):
+        simulator_main([str(path), "--speed", "0"])
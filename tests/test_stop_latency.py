@@ -0,0 +1,70 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from automation_engine import AutomationEngine, AutomationStopped
+from frame_buffer import CaptureProducer, FrameRing
+
+
+def stop_later(stop, seconds=0.1):
+    timer = threading.Timer(seconds, stop)
+    timer.start()
+    return timer
+
+
+def test_stop_interrupts_a_long_wait():
+    engine = AutomationEngine([])
+    stop_later(engine.stop)
+    start = time.perf_counter()
+
+    with pytest.raises(AutomationStopped):
+        engine.sleep(30)
+
+    assert time.perf_counter() - start < 2
+
+
+def test_stop_during_the_pause_between_steps_ends_the_run():
+    click = {"type": "Button (Click)", "x": 1, "y": 1, "parameter": "", "delay": 30}
+    stopped = []
+    engine = AutomationEngine([click, click], on_stopped=stopped.append)
+    engine.prepare = lambda: []
+    engine.execute_element = lambda index, element: True
+    stop_later(engine.stop)
+    start = time.perf_counter()
+
+    assert engine.run() == "stopped"
+    assert time.perf_counter() - start < 2
+    assert stopped and stopped[0] < 2000
+
+
+@pytest.fixture
+def stalled_producer():
+    # Periodic capture disabled and a grab that never finishes in time
+    ring = FrameRing.create(2, 2, slots=2)
+    release = threading.Event()
+
+    def grab():
+        release.wait(30)
+        return np.zeros((2, 2, 3), dtype=np.uint8)
+
+    producer = CaptureProducer(ring, grab=grab, interval=0)
+    producer.start()
+    yield producer
+    release.set()
+    producer.stop()
+
+
+def test_request_frame_returns_none_when_cancelled(stalled_producer):
+    cancel = threading.Event()
+    stop_later(cancel.set)
+    start = time.perf_counter()
+
+    assert stalled_producer.request_frame(timeout=30, cancel=cancel) is None
+    assert time.perf_counter() - start < 2
+
+
+def test_request_frame_times_out(stalled_producer):
+    with pytest.raises(TimeoutError):
+        stalled_producer.request_frame(timeout=0.1)
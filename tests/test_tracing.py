@@ -0,0 +1,76 @@
+import json
+import os
+
+import pytest
+
+from tracing import NULL_SPAN, NULL_TRACER, Tracer, tracer_from_env
+
+
+@pytest.fixture
+def tracer():
+    tracer = Tracer("login")
+    with tracer.span("step", index=0, type="Button (Click)"):
+        with tracer.span("click"):
+            pass
+    with tracer.span("step", index=1, type="Text Area (Monitor Text)"):
+        tracer.record("ocr", tracer.started_ns, tracer.started_ns + 2_000_000, thread="worker 7")
+    return tracer
+
+
+def test_chrome_trace_has_complete_events_and_thread_names(tracer):
+    trace = tracer.chrome_trace()
+    events = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    names = {event["tid"]: event["args"]["name"] for event in trace["traceEvents"] if event["ph"] == "M"}
+
+    assert [event["name"] for event in events] == ["click", "step 1", "ocr", "step 2"]
+    assert all(event["ts"] >= 0 and event["dur"] >= 0 for event in events)
+    # Spans inside a step carry its index, the worker span has its own track
+    click, ocr = events[0], events[2]
+    assert click["args"]["step"] == 0
+    assert ocr["args"]["step"] == 1
+    assert ocr["dur"] == 2000
+    assert names[ocr["tid"]] == "worker 7"
+    assert trace["otherData"]["run"] == "login"
+    json.dumps(trace)
+
+
+def test_summary_breaks_steps_down(tracer):
+    summary = tracer.summary()
+
+    assert summary["steps_executed"] == 2
+    assert summary["spans"]["step"]["count"] == 2
+    assert [step["index"] for step in summary["steps"]] == [0, 1]
+    assert summary["steps"][1]["breakdown"]["ocr"] == pytest.approx(2.0)
+
+
+def test_errors_are_recorded_on_the_span():
+    tracer = Tracer()
+    with pytest.raises(KeyError):
+        with tracer.span("step", index=0):
+            raise KeyError("x")
+
+    assert tracer.events[0][5]["error"] == "KeyError"
+
+
+def test_saves_in_the_same_second_get_their_own_files(tmp_path):
+    first, second = Tracer("a"), Tracer("b")
+    second.started_at = first.started_at
+
+    paths = [tracer.save(str(tmp_path)) for tracer in (first, second, first)]
+
+    names = [os.path.basename(path) for pair in paths for path in pair]
+    assert len(set(names)) == 6
+    assert names[2].startswith("trace_") and names[2].endswith("_2.json")
+    assert names[3] == names[2].replace("trace_", "summary_")
+    assert names[4].endswith("_3.json")
+    with open(paths[1][0], encoding="utf-8") as f:
+        assert json.load(f)["otherData"]["run"] == "b"
+
+
+def test_disabled_tracer(monkeypatch):
+    monkeypatch.delenv("SMART_AUTOMATION_TRACE", raising=False)
+    assert tracer_from_env() is NULL_TRACER
+    assert NULL_TRACER.span("step", index=0) is NULL_SPAN
+
+    monkeypatch.setenv("SMART_AUTOMATION_TRACE", "on")
+    assert tracer_from_env().enabled
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from recorder import CLICK_TYPE, MONITOR_IMAGE_TYPE, SEARCH_SIZE, TEXT_TYPE, coalesce
+from workflow import compact_element, list_workflows, load_workflow, save_workflow, validate_elements
+
+ELEMENTS = [
+    {"type": "Button (Click)", "x": 10, "y": 20, "parameter": "", "timestamp": "09:15:00"},
+    {"type": "Input Field (Text Input)", "x": 30, "y": 40, "parameter": "hello"},
+]
+
+
+def test_compact_drops_restorable_keys():
+    assert compact_element(ELEMENTS[0]) == {"type": "Button (Click)", "x": 10, "y": 20}
+    assert compact_element(ELEMENTS[1]) == ELEMENTS[1]
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_save_and_load_round_trip(tmp_path, compact):
+    path = tmp_path / "flows" / "login.json"
+    save_workflow(str(path), [dict(element) for element in ELEMENTS], compact=compact)
+
+    name, elements = load_workflow(str(path))
+
+    assert name == "login"
+    assert [(e["type"], e["x"], e["y"], e["parameter"]) for e in elements] == \
+        [(e["type"], e["x"], e["y"], e["parameter"]) for e in ELEMENTS]
+    assert list_workflows(str(tmp_path / "flows")) == [str(path)]
+
+
+def test_load_accepts_a_bare_element_list(tmp_path):
+    path = tmp_path / "quick.json"
+    path.write_text(json.dumps([{"type": "Button (Click)", "x": 1, "y": 2}]), encoding="utf-8")
+
+    name, elements = load_workflow(str(path))
+
+    assert name == "quick"
+    assert elements[0]["parameter"] == ""
+
+
+@pytest.mark.parametrize("elements, message", [
+    ({"type": "Button (Click)"}, "must be a list"),
+    (["click"], "element 1 is not an object"),
+    ([{"type": "Button (Click)", "x": 1}], "element 1 is missing y"),
+])
+def test_validate_rejects_malformed_elements(elements, message):
+    with pytest.raises(ValueError, match=message):
+        validate_elements(elements)
+
+
+def test_coalesce_turns_typing_after_a_click_into_text_input():
+    events = [("click", 0.0, 10, 20, None),
+              ("key", 1.0, "h", 10, 20), ("key", 1.2, "x", 10, 20), ("key", 1.3, "\b", 10, 20),
+              ("key", 1.4, "i", 10, 20),
+              ("click", 3.4, 50, 60, None)]
+
+    elements = coalesce(events)
+
+    assert [(e["type"], e["parameter"]) for e in elements] == [(TEXT_TYPE, "hi"), (CLICK_TYPE, "")]
+    # The pause runs from the last keystroke to the next click
+    assert elements[0]["delay"] == 2.0
+    assert "delay" not in elements[1]
+
+
+def test_coalesce_erased_text_falls_back_to_a_click():
+    events = [("key", 0.0, "a", 5, 5), ("key", 0.1, "\b", 5, 5), ("click", 0.5, 7, 7, None),
+              ("key", 0.6, "b", 7, 7)]
+
+    elements = coalesce(events)
+
+    assert [(e["type"], e["x"], e["parameter"]) for e in elements] == [(CLICK_TYPE, 5, ""), (TEXT_TYPE, 7, "b")]
+
+
+def test_coalesce_keeps_template_search_areas_on_screen():
+    monitor, click = coalesce([("click", 0.0, 1910, 5, "templates/recorded/a.png")], screen=(1920, 1080))
+
+    assert monitor["type"] == MONITOR_IMAGE_TYPE
+    assert (monitor["x"], monitor["y"]) == (1920 - SEARCH_SIZE[0], 0)
+    assert monitor["parameter"] == "templates/recorded/a.png"
+    assert (click["x"], click["y"]) == (1910, 5)
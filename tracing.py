@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Run Tracing
+Nested timing spans for automation runs, exportable as a Chrome trace
+(chrome://tracing, Perfetto) and as a per-run JSON summary. The disabled
+tracer hands out one shared no-op span, so instrumentation costs almost
+nothing when tracing is off.
+"""
+
+import os
+import json
+import time
+import threading
+from time import perf_counter_ns
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class NullTracer:
+    """Tracer used when tracing is disabled"""
+
+    enabled = False
+
+    def span(self, name, **args):
+        return NULL_SPAN
+
+    def record(self, name, start_ns, end_ns, thread=None, **args):
+        pass
+
+
+NULL_TRACER = NullTracer()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        local = self.tracer._local
+        if self.name == "step":
+            local.step = self.args.get("index")
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = perf_counter_ns()
+        local = self.tracer._local
+        if exc[0] is not None:
+            self.args["error"] = exc[0].__name__
+        self.tracer._add(self.name, self.start, end, self.tracer._thread_id(),
+                         getattr(local, "step", None), self.args)
+        if self.name == "step":
+            local.step = None
+        return False
+
+
+class Tracer:
+    """Collects spans of one run
+
+    Spans named "step" (with an `index` argument) group everything recorded
+    inside them, which is what the per-step breakdown of the summary is built
+    from. Spans timed elsewhere (e.g. in monitor worker processes, using the
+    same monotonic clock) can be added with record().
+    """
+
+    enabled = True
+
+    def __init__(self, name="automation"):
+        self.name = name
+        self.events = []
+        self.thread_names = {}
+        self.started_ns = perf_counter_ns()
+        self.started_at = time.time()
+        self._local = threading.local()
+
+    def span(self, name, **args):
+        return _Span(self, name, args)
+
+    def record(self, name, start_ns, end_ns, thread=None, **args):
+        """Add a span timed elsewhere, optionally on a named track (e.g. "worker 1234")"""
+        step = getattr(self._local, "step", None)
+        if thread is None:
+            tid = self._thread_id()
+        else:
+            tid = next((t for t, label in self.thread_names.items() if label == thread), None)
+            if tid is None:
+                tid = len(self.thread_names) + 1
+                self.thread_names[tid] = thread
+        self._add(name, start_ns, end_ns, tid, step, args)
+
+    def _thread_id(self):
+        local = self._local
+        tid = getattr(local, "tid", None)
+        if tid is None:
+            tid = local.tid = len(self.thread_names) + 1
+            self.thread_names[tid] = threading.current_thread().name
+        return tid
+
+    def _add(self, name, start, end, tid, step, args):
+        # list.append is atomic, spans may come from several threads
+        self.events.append((name, start, end - start, tid, step, args))
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    def chrome_trace(self):
+        """Trace in Chrome trace-event format (complete "X" events, µs)"""
+        pid = os.getpid()
+        trace = []
+        for name, start, duration, tid, step, args in self.events:
+            event_args = dict(args)
+            if step is not None and name != "step":
+                event_args["step"] = step
+            trace.append({
+                "name": f"{name} {args['index'] + 1}" if name == "step" and "index" in args else name,
+                "cat": name,
+                "ph": "X",
+                "ts": (start - self.started_ns) / 1000,
+                "dur": duration / 1000,
+                "pid": pid,
+                "tid": tid,
+                "args": event_args,
+            })
+        for tid, label in self.thread_names.items():
+            trace.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                          "args": {"name": label}})
+        return {"traceEvents": trace, "displayTimeUnit": "ms",
+                "otherData": {"run": self.name, "started_at": self.started_at}}
+
+    def summary(self, slowest=10):
+        """Per-run summary: totals per span name and a breakdown per step"""
+        spans = {}
+        steps = {}
+        end_ns = self.started_ns
+        for name, start, duration, tid, step, args in self.events:
+            end_ns = max(end_ns, start + duration)
+            total = spans.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            ms = duration / 1e6
+            total["count"] += 1
+            total["total_ms"] += ms
+            total["max_ms"] = max(total["max_ms"], ms)
+            if name == "step":
+                entry = steps.setdefault(args.get("index"), {"breakdown": {}})
+                entry.update({"index": args.get("index"), "type": args.get("type"),
+                              "duration_ms": ms})
+            elif step is not None:
+                entry = steps.setdefault(step, {"breakdown": {}})
+                entry["breakdown"][name] = entry["breakdown"].get(name, 0.0) + ms
+        for total in spans.values():
+            total["mean_ms"] = total["total_ms"] / total["count"]
+
+        step_list = [steps[key] for key in sorted(steps, key=lambda k: (k is None, k))]
+        ranked = sorted((s for s in step_list if "duration_ms" in s),
+                        key=lambda s: s["duration_ms"], reverse=True)
+        return {
+            "run": self.name,
+            "started_at": self.started_at,
+            "duration_ms": (end_ns - self.started_ns) / 1e6,
+            "steps_executed": sum(1 for s in step_list if "duration_ms" in s),
+            "spans": spans,
+            "slowest_steps": [{"index": s["index"], "type": s["type"],
+                               "duration_ms": s["duration_ms"]} for s in ranked[:slowest]],
+            "steps": step_list,
+        }
+
+    def save(self, directory=os.path.join("logs", "traces")):
+        """Write trace_<time>.json (Chrome format) and summary_<time>.json, returns both paths"""
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(self.started_at))
+        # Runs that started in the same second (e.g. scheduler jobs) get a suffix;
+        # creating the trace file exclusively claims the name
+        suffix = 1
+        while True:
+            name = stamp if suffix == 1 else f"{stamp}_{suffix}"
+            trace_path = os.path.join(directory, f"trace_{name}.json")
+            try:
+                f = open(trace_path, "x", encoding="utf-8")
+                break
+            except FileExistsError:
+                suffix += 1
+        summary_path = os.path.join(directory, f"summary_{name}.json")
+        with f:
+            json.dump(self.chrome_trace(), f)
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+        return trace_path, summary_path
+
+
+def tracer_from_env(name="automation"):
+    """Enabled tracer if $SMART_AUTOMATION_TRACE is set, the no-op tracer otherwise"""
+    if os.environ.get("SMART_AUTOMATION_TRACE", "").lower() in ("1", "true", "yes", "on"):
+        return Tracer(name)
+    return NULL_TRACER
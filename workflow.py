@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Workflow Files
+Saves and loads automation element lists as JSON so they can be run again
+without re-selecting every element
+"""
+
+import os
+import json
+import time
+
+WORKFLOW_DIR = "workflows"
+WORKFLOW_VERSION = 1
+
+
+def compact_element(element):
+    """Element without the keys load_workflow can restore (selection time, empty parameter)"""
+    return {key: value for key, value in element.items()
+            if key != "timestamp" and not (key == "parameter" and value == "")}
+
+
+def save_workflow(path, elements, name=None, compact=False):
+    """Write an element list to a workflow file
+
+    compact=True drops redundant keys and whitespace, which keeps long recorded
+    workflows small.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    data = {
+        "version": WORKFLOW_VERSION,
+        "name": name or os.path.splitext(os.path.basename(path))[0],
+        "saved_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "elements": [compact_element(element) for element in elements] if compact else elements,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        if compact:
+            json.dump(data, f, separators=(",", ":"), ensure_ascii=False)
+        else:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def load_workflow(path):
+    """Read a workflow file, returns (name, elements)
+
+    Accepts the format written by save_workflow as well as a bare element list.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        name, elements = os.path.splitext(os.path.basename(path))[0], data
+    else:
+        name = data.get("name") or os.path.splitext(os.path.basename(path))[0]
+        elements = data.get("elements", [])
+    return name, validate_elements(elements, path)
+
+
+def validate_elements(elements, source="workflow"):
+    """Check that every element has a type and position, fills in the default parameter"""
+    if not isinstance(elements, list):
+        raise ValueError(f"{source}: elements must be a list")
+    for i, element in enumerate(elements):
+        if not isinstance(element, dict):
+            raise ValueError(f"{source}: element {i+1} is not an object")
+        missing = [key for key in ("type", "x", "y") if key not in element]
+        if missing:
+            raise ValueError(f"{source}: element {i+1} is missing {', '.join(missing)}")
+        element.setdefault("parameter", "")
+    return elements
+
+
+def list_workflows(directory=WORKFLOW_DIR):
+    """Paths of all workflow files in a directory"""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.endswith(".json"))